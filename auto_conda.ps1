@@ -14,7 +14,6 @@ Copy-Item -r gvasp $CondaDir
 Copy-Item LICENSE, pytest.ini, README.md, requirements.txt, setup.py $CondaDir
 
 # delete the lib files
-Remove-Item $CondaDir/extension/dos_cython.cpp
 Remove-Item $CondaDir/extension/path_cython.c
 Remove-Item $CondaDir/gvasp/lib/*.so
 Remove-Item $CondaDir/gvasp/lib/*.pyd
@@ -23,7 +23,6 @@ cp -r gvasp $CondaDir
 cp LICENSE pytest.ini README.md requirements.txt setup.py $CondaDir
 
 # delete the lib files
-rm -rf $CondaDir/extension/dos_cython.cpp
 rm -rf $CondaDir/extension/path_cython.c
 rm -rf $CondaDir/gvasp/lib/*.so
 rm -rf $CondaDir/gvasp/lib/*.pyd
@@ -1,27 +1,11 @@
 #include "file_lib.h"
-#define PI 3.14159265358979323846
-
-#include <iomanip>
-#include <sstream>
-#include <chrono>
+#include "grid_lib.h"
 
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
 #include <pybind11/stl.h>
 namespace py = pybind11;
 
-using namespace std::chrono;
-
-struct CHGInfo
-{
-    int NGX;
-    int NGY;
-    int NGZ;
-    array<double, 3> length;
-    array<double, 3> angle;
-    vector<double> density;
-};
-
 #pragma GCC visibility push(hidden)
 struct PyCHGInfo
 {
@@ -30,162 +14,295 @@ struct PyCHGInfo
     int NGZ;
     py::array_t<double> density;
 };
+
+struct PyGridIndex
+{
+    size_t head;
+    vector<tuple<size_t, size_t, size_t, int, int, int>> blocks; // (header, begin, end, NGX, NGY, NGZ)
+    vector<pair<size_t, size_t>> augmentation;
+};
 #pragma GCC visibility pop
 
-inline double dot_product(array<double, 3> A, array<double, 3> B)
+PyGridIndex build_index(string name)
 {
-    return A[0] * B[0] + A[1] * B[1] + A[2] * B[2];
+    MappedFile file(name);
+    GridIndex grid;
+    {
+        py::gil_scoped_release release;
+        grid = index_grid(file.data(), file.size());
+    }
+
+    PyGridIndex pyindex;
+    pyindex.head = grid.head;
+    pyindex.augmentation = grid.augmentation;
+    for (auto &block : grid.blocks)
+    {
+        pyindex.blocks.emplace_back(block.header, block.begin, block.end, block.NGX, block.NGY, block.NGZ);
+    }
+    return pyindex;
 }
 
-void read_chg(string name, CHGInfo &info)
+py::array_t<double> read_block(string name, size_t begin, size_t end, int NGX, int NGY, int NGZ, int threads)
 {
-    ifstream chgfile;
-    string line;
-    int lineno = 0;
-    vector<double> double_v;
-    vector<int> int_v;
-    array<array<double, 3>, 3> lattice;
-    array<double, 3> length = {0};
-    array<double, 3> angle = {0};
-    int sum_elements = 0;
-    int NGX = -1, NGY = -1, NGZ = -1;
-    vector<double> density;
-
-    chgfile.open(name, ios::in);
-    if (!chgfile.is_open())
+    MappedFile file(name);
+    if (begin > end || end > file.size())
+    {
+        throw runtime_error("grid block is out of the file, the index may be outdated");
+    }
+    GridBlock grid = {begin, begin, end, NGX, NGY, NGZ};
+    py::array_t<double> density((size_t)NGX * NGY * NGZ);
+    double *ptr_density = density.mutable_data();
     {
-        throw runtime_error("file open failure");
+        py::gil_scoped_release release;
+        parse_block(file.data(), file.size(), grid, ptr_density, threads);
     }
+    return density;
+}
 
-    while (getline(chgfile, line))
+template <typename T>
+static vector<py::array> read_blocks_typed(const string &name, const vector<tuple<size_t, size_t, int, int, int>> &blocks,
+                                          int threads)
+{
+    MappedFile file(name);
+    vector<GridBlock> grids;
+    vector<py::array> densities;
+    vector<T *> outs;
+    for (auto &block : blocks)
     {
-        lineno += 1;
-        if (lineno >= 3 && lineno <= 5)
-        {
-            double_v.clear();
-            split_string(line, " ", double_v);
-            for (size_t j = 0; j < double_v.size(); j++)
-            {
-                lattice[lineno - 3][j] = double_v[j];
-                length[lineno - 3] += pow(lattice[lineno - 3][j], 2);
-            }
-            length[lineno - 3] = pow(length[lineno - 3], 0.5);
-        }
-        else if (lineno == 6)
-        {
-            angle[0] = acos(dot_product(lattice[1], lattice[2]) / (length[1] * length[2])) * 180 / PI;
-            angle[1] = acos(dot_product(lattice[0], lattice[2]) / (length[0] * length[2])) * 180 / PI;
-            angle[2] = acos(dot_product(lattice[0], lattice[1]) / (length[1] * length[0])) * 180 / PI;
-        }
-        else if (lineno == 7)
-        {
-            int_v.clear();
-            split_string(line, " ", int_v);
-            sum_elements = accumulate(int_v.begin(), int_v.end(), 0);
-        }
-        else if (lineno == sum_elements + 10)
-        {
-            int_v.clear();
-            split_string(line, " ", int_v);
-            NGX = int_v[0];
-            NGY = int_v[1];
-            NGZ = int_v[2];
-        }
-        else if (lineno > sum_elements + 10)
+        size_t begin = get<0>(block), end = get<1>(block);
+        if (begin > end || end > file.size())
         {
-            double_v.clear();
-            split_string(line, " ", double_v);
-            density.insert(density.end(), double_v.begin(), double_v.end());
+            throw runtime_error("grid block is out of the file, the index may be outdated");
         }
+        grids.push_back({begin, begin, end, get<2>(block), get<3>(block), get<4>(block)});
+        py::array_t<T> density((size_t)get<2>(block) * get<3>(block) * get<4>(block));
+        outs.push_back(density.mutable_data());
+        densities.push_back(density);
     }
-    chgfile.close();
-    info.NGX = NGX;
-    info.NGY = NGY;
-    info.NGZ = NGZ;
-    info.length = length;
-    info.angle = angle;
-    info.density.assign(density.begin(), density.end());
-}
-
-void to_grd(const char *name, double DenCut)
-{
-    ofstream grdfile;
-    vector<double> density;
-    const int offset = 100;
-    FILE *fp;
-    const size_t Maxlen = 100 * 1024;
-    char *buffer = new char[Maxlen];
-    char tempcs[50];
-
-    CHGInfo info;
-    read_chg("CHGCAR_mag", info);
-    density.assign(info.density.begin(), info.density.end());
-
-    grdfile.open(name, ios::out);
-    if (!grdfile.is_open())
-    {
-        cout << "Open the .grd file failure!" << endl;
-    }
-    grdfile << "VASP charge density" << endl;
-    grdfile << "(1p,e12.5)" << endl;
-    grdfile << fixed << setprecision(3)
-            << "  " << info.length[0] << "  " << info.length[1] << "  " << info.length[2]
-            << "  " << info.angle[0] << "  " << info.angle[1] << "  " << info.angle[2] << endl;
-    grdfile << "  " << info.NGX - 1 << "  " << info.NGY - 1 << "  " << info.NGZ - 1 << endl;
-    grdfile << setw(5) << 1 << setw(5) << 0 << setw(5) << info.NGX - 1
-            << setw(5) << 0 << setw(5) << info.NGY - 1 << setw(5) << 0 << setw(5) << info.NGZ - 1 << endl;
-    grdfile.close();
-    if (DenCut != -1)
-    {
-        for (size_t i = 0; i < density.size(); i++)
-        {
-            if (abs(density[i]) < DenCut - offset)
-            {
-                density[i] = 0.0;
-            }
-        }
+    {
+        py::gil_scoped_release release;
+        parse_blocks(file.data(), file.size(), grids, outs, threads);
     }
-    fp = fopen(name, "a");
-    strcpy(buffer, "");
-    for (size_t i = 0; i < density.size(); i++)
+    return densities;
+}
+
+vector<py::array> read_blocks(string name, vector<tuple<size_t, size_t, int, int, int>> blocks, int threads,
+                              bool single)
+{
+    return single ? read_blocks_typed<float>(name, blocks, threads) : read_blocks_typed<double>(name, blocks, threads);
+}
+
+template <typename T>
+static void read_into_typed(const string &name, GridBlock grid, py::array out, int threads)
+{
+    MappedFile file(name);
+    if (grid.begin > grid.end || grid.end > file.size())
     {
-        if (abs(density[i]) > 1e-5)
-        {
-            snprintf(tempcs, 13, "%12.5E", density[i]);
-        }
-        else
-        {
-            snprintf(tempcs, sizeof(density[i]) + 1, "%1.0f", density[i]);
-        }
-        strcat(buffer, tempcs);
-        strcat(buffer, "\n");
-        if (i % 1000 == 0)
+        throw runtime_error("grid block is out of the file, the index may be outdated");
+    }
+    T *ptr_out = static_cast<T *>(out.mutable_data());
+    {
+        py::gil_scoped_release release;
+        parse_block(file.data(), file.size(), grid, ptr_out, threads);
+    }
+}
+
+// parse one grid block into a preallocated buffer (e.g., np.memmap of a raw binary file)
+void read_into(string name, tuple<size_t, size_t, int, int, int> block, py::array out, int threads)
+{
+    GridBlock grid = {get<0>(block), get<0>(block), get<1>(block), get<2>(block), get<3>(block), get<4>(block)};
+    if (out.ndim() != 1 || out.shape(0) != (py::ssize_t)grid.NGX * grid.NGY * grid.NGZ ||
+        !(out.flags() & py::array::c_style) || !out.writeable())
+    {
+        throw runtime_error("output should be a writable contiguous 1-dimensional array of NGX * NGY * NGZ values");
+    }
+    if (py::isinstance<py::array_t<double>>(out))
+    {
+        read_into_typed<double>(name, grid, out, threads);
+    }
+    else if (py::isinstance<py::array_t<float>>(out))
+    {
+        read_into_typed<float>(name, grid, out, threads);
+    }
+    else
+    {
+        throw runtime_error("output should be a float64 or float32 array");
+    }
+}
+
+template <typename T>
+static py::array read_box_typed(const string &name, const tuple<size_t, size_t, int, int, int> &block,
+                                const array<size_t, 3> &lo, const array<size_t, 3> &hi, const array<size_t, 3> &step,
+                                int threads)
+{
+    MappedFile file(name);
+    size_t begin = get<0>(block), end = get<1>(block);
+    if (begin > end || end > file.size())
+    {
+        throw runtime_error("grid block is out of the file, the index may be outdated");
+    }
+    GridBlock grid = {begin, begin, end, get<2>(block), get<3>(block), get<4>(block)};
+    int NGrid[3] = {grid.NGX, grid.NGY, grid.NGZ};
+    size_t count = 1;
+    for (int i = 0; i < 3; i++)
+    {
+        if (step[i] == 0 || lo[i] >= hi[i] || hi[i] > (size_t)NGrid[i])
         {
-            fwrite(buffer, strlen(buffer), 1, fp);
-            strcpy(buffer, "");
+            throw runtime_error("invalid box of the grid block");
         }
+        count *= (hi[i] - lo[i] + step[i] - 1) / step[i];
     }
-    fwrite(buffer, strlen(buffer), 1, fp);
-    fclose(fp);
-    delete[] buffer;
+    py::array_t<T> box(count);
+    T *ptr_box = box.mutable_data();
+    {
+        py::gil_scoped_release release;
+        parse_box(file.data(), file.size(), grid, lo.data(), hi.data(), step.data(), ptr_box, threads);
+    }
+    return box;
 }
 
-PyCHGInfo load(string name)
+py::array read_box(string name, tuple<size_t, size_t, int, int, int> block, array<size_t, 3> lo, array<size_t, 3> hi,
+                   array<size_t, 3> step, int threads, bool single)
 {
-    CHGInfo info;
-    PyCHGInfo pyinfo;
+    return single ? read_box_typed<float>(name, block, lo, hi, step, threads)
+                  : read_box_typed<double>(name, block, lo, hi, step, threads);
+}
 
-    read_chg(name, info);
-    pyinfo.NGX = info.NGX;
-    pyinfo.NGY = info.NGY;
-    pyinfo.NGZ = info.NGZ;
+void write_ranges(string name, string output, vector<pair<size_t, size_t>> ranges)
+{
+    MappedFile file(name);
+    py::gil_scoped_release release;
+    copy_ranges(file.data(), file.size(), ranges, output);
+}
 
-    pyinfo.density = py::array_t<double>(pyinfo.NGX * pyinfo.NGY * pyinfo.NGZ);
-    py::buffer_info buf_density = pyinfo.density.request();
-    double *ptr_density = (double *)buf_density.ptr;
-    for (size_t i = 0; i < info.density.size(); i++)
+// shape and strides (unit: element) of a 3-dimensional grid
+template <typename T>
+static const T *grid_layout(const py::array_t<T, py::array::forcecast> &grid, size_t shape[3], ptrdiff_t strides[3])
+{
+    if (grid.ndim() != 3)
     {
-        ptr_density[i] = info.density[i];
+        throw runtime_error("grid should be a 3-dimensional array");
+    }
+    for (int i = 0; i < 3; i++)
+    {
+        shape[i] = (size_t)grid.shape(i);
+        strides[i] = grid.strides(i) / (ptrdiff_t)sizeof(T);
+    }
+    return grid.data();
+}
+
+// the grid in place if float32 or float64, other types are converted to float64
+template <typename T>
+static py::array_t<T, py::array::forcecast> grid_array(const py::array &grid)
+{
+    auto array = py::array_t<T, py::array::forcecast>::ensure(grid);
+    if (!array)
+    {
+        throw py::error_already_set();
+    }
+    return array;
+}
+
+template <typename T>
+static void write_grid_typed(const string &name, const py::array &grid, const string &head, bool append, int threads)
+{
+    size_t shape[3];
+    ptrdiff_t strides[3];
+    auto array = grid_array<T>(grid);
+    const T *data = grid_layout(array, shape, strides);
+    py::gil_scoped_release release;
+    write_grid(name, head, data, shape, strides, append, threads);
+}
+
+void write_grid_array(string name, py::array grid, string head, bool append, int threads)
+{
+    py::isinstance<py::array_t<float>>(grid) ? write_grid_typed<float>(name, grid, head, append, threads)
+                                             : write_grid_typed<double>(name, grid, head, append, threads);
+}
+
+template <typename T>
+static void to_grd_typed(const string &name, const py::array &grid, const string &head, double cutoff, int threads)
+{
+    size_t shape[3];
+    ptrdiff_t strides[3];
+    auto array = grid_array<T>(grid);
+    const T *data = grid_layout(array, shape, strides);
+    py::gil_scoped_release release;
+    write_grd(name, head, data, shape, strides, cutoff, threads);
+}
+
+void to_grd(string name, py::array grid, string head, double cutoff, int threads)
+{
+    py::isinstance<py::array_t<float>>(grid) ? to_grd_typed<float>(name, grid, head, cutoff, threads)
+                                             : to_grd_typed<double>(name, grid, head, cutoff, threads);
+}
+
+template <typename T>
+static void format_grid_typed(const py::array &grid, const py::function &write, bool grd, double cutoff, int threads)
+{
+    size_t shape[3];
+    ptrdiff_t strides[3];
+    auto array = grid_array<T>(grid);
+    const T *data = grid_layout(array, shape, strides);
+    py::gil_scoped_release release;
+    format_grid(data, shape, strides, grd, cutoff, threads,
+                [&write](const char *buffer, size_t size)
+                {
+                    py::gil_scoped_acquire acquire;
+                    write(py::bytes(buffer, size));
+                });
+}
+
+void format_grid_array(py::array grid, py::function write, bool grd, double cutoff, int threads)
+{
+    py::isinstance<py::array_t<float>>(grid) ? format_grid_typed<float>(grid, write, grd, cutoff, threads)
+                                             : format_grid_typed<double>(grid, write, grd, cutoff, threads);
+}
+
+py::object combine(vector<tuple<string, size_t, size_t>> inputs, vector<double> coefficients,
+                   tuple<int, int, int> NGrid, string output, string head, bool planar, int threads)
+{
+    if (inputs.size() != coefficients.size())
+    {
+        throw runtime_error("the number of coefficients is not equal to the number of grids");
+    }
+    size_t shape[3] = {(size_t)get<0>(NGrid), (size_t)get<1>(NGrid), (size_t)get<2>(NGrid)};
+    py::array_t<double> sums(planar ? shape[0] + shape[1] + shape[2] : 0);
+    double *ptr_sums = planar ? sums.mutable_data() : nullptr;
+    if (ptr_sums != nullptr)
+    {
+        fill(ptr_sums, ptr_sums + sums.size(), 0.0);
+    }
+    {
+        py::gil_scoped_release release;
+        combine_grids(inputs, coefficients, shape, output, head, threads, ptr_sums);
+    }
+    return planar ? py::object(sums) : py::object(py::none());
+}
+
+PyCHGInfo load(string name, int block, int threads)
+{
+    MappedFile file(name);
+    GridBlock grid;
+    {
+        py::gil_scoped_release release;
+        GridIndex index = index_grid(file.data(), file.size());
+        if (block < 0 || block >= (int)index.blocks.size())
+        {
+            throw runtime_error("grid block " + to_string(block) + " not found");
+        }
+        grid = index.blocks[block];
+    }
+
+    PyCHGInfo pyinfo;
+    pyinfo.NGX = grid.NGX;
+    pyinfo.NGY = grid.NGY;
+    pyinfo.NGZ = grid.NGZ;
+    pyinfo.density = py::array_t<double>((size_t)grid.NGX * grid.NGY * grid.NGZ);
+    double *ptr_density = pyinfo.density.mutable_data();
+    {
+        py::gil_scoped_release release;
+        parse_block(file.data(), file.size(), grid, ptr_density, threads);
     }
     return pyinfo;
 }
@@ -200,6 +317,46 @@ PYBIND11_MODULE(file_bind, m)
         .def_readwrite("NGZ", &PyCHGInfo::NGZ)
         .def_readwrite("density", &PyCHGInfo::density);
 
-    m.def("to_grd", &to_grd, "A C++ function to transform CHGCAR_mag to *.grd file");
-    m.def("load", &load, "A C++ function to load CHGBase file");
+    py::class_<PyGridIndex>(m, "PyGridIndex")
+        .def_readonly("head", &PyGridIndex::head)
+        .def_readonly("blocks", &PyGridIndex::blocks)
+        .def_readonly("augmentation", &PyGridIndex::augmentation);
+
+    m.def("load", &load, "A C++ function to load one grid block of CHGBase file (mmap && multi-threads)",
+          py::arg("name"), py::arg("block") = 0, py::arg("threads") = 0);
+    m.def("index", &build_index, "A C++ function to index the header, grid blocks and augmentation of CHGBase file",
+          py::arg("name"));
+    m.def("read_block", &read_block, "A C++ function to load the grid block in [begin, end) (mmap && multi-threads)",
+          py::arg("name"), py::arg("begin"), py::arg("end"), py::arg("NGX"), py::arg("NGY"), py::arg("NGZ"),
+          py::arg("threads") = 0);
+    m.def("read_blocks", &read_blocks,
+          "A C++ function to load several grid blocks [(begin, end, NGX, NGY, NGZ), ...] in one pass (mmap && multi-threads), "
+          "float32 arrays if single",
+          py::arg("name"), py::arg("blocks"), py::arg("threads") = 0, py::arg("single") = false);
+    m.def("read_into", &read_into,
+          "A C++ function to parse the grid block in [begin, end) into a preallocated array (mmap && multi-threads)",
+          py::arg("name"), py::arg("block"), py::arg("out"), py::arg("threads") = 0);
+    m.def("read_box", &read_box,
+          "A C++ function to load the strided box [lo, hi) (step) of a grid block (begin, end, NGX, NGY, NGZ), only the "
+          "lines of the selected rows are parsed (x fastest), float32 array if single",
+          py::arg("name"), py::arg("block"), py::arg("lo"), py::arg("hi"), py::arg("step"), py::arg("threads") = 0,
+          py::arg("single") = false);
+    m.def("copy_ranges", &write_ranges,
+          "A C++ function to write the byte ranges [(begin, end), ...] of file to output without decoding",
+          py::arg("name"), py::arg("output"), py::arg("ranges"));
+    m.def("write_grid", &write_grid_array,
+          "A C++ function to write head and the grid in VASP layout (5 values per line, multi-threads)",
+          py::arg("name"), py::arg("grid"), py::arg("head") = "", py::arg("append") = false, py::arg("threads") = 0);
+    m.def("combine", &combine,
+          "A C++ function to stream the linear combination of grid blocks [(name, begin, end), ...] to output "
+          "(lockstep chunks, constant memory), return the planar sums along x, y, z (concatenated) if planar",
+          py::arg("inputs"), py::arg("coefficients"), py::arg("NGrid"), py::arg("output"), py::arg("head") = "",
+          py::arg("planar") = false, py::arg("threads") = 0);
+    m.def("to_grd", &to_grd,
+          "A C++ function to write head and the grid in *.grd layout, |value| < cutoff is set to 0 (multi-threads)",
+          py::arg("name"), py::arg("grid"), py::arg("head") = "", py::arg("cutoff") = 0.0, py::arg("threads") = 0);
+    m.def("format_grid", &format_grid_array,
+          "A C++ function to format the grid in VASP (or *.grd if grd) layout block by block and pass each block (bytes) "
+          "to write, e.g., the write method of a compressed file",
+          py::arg("grid"), py::arg("write"), py::arg("grd") = false, py::arg("cutoff") = 0.0, py::arg("threads") = 0);
 }
@@ -0,0 +1,1251 @@
+#include "grid_lib.h"
+
+#include <algorithm>
+#include <cmath>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <limits>
+#include <memory>
+#include <stdexcept>
+#include <thread>
+
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+static const size_t MinChunk = 1 << 20; // bytes handled by one thread at least
+static const int MaxThreads = 64;
+
+static const double POW10[] = {1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10, 1e11,
+                               1e12, 1e13, 1e14, 1e15, 1e16, 1e17, 1e18, 1e19, 1e20, 1e21, 1e22};
+
+MappedFile::MappedFile(const string &name)
+{
+#ifdef _WIN32
+    HANDLE file = CreateFileA(name.c_str(), GENERIC_READ, FILE_SHARE_READ, NULL, OPEN_EXISTING,
+                              FILE_ATTRIBUTE_NORMAL | FILE_FLAG_SEQUENTIAL_SCAN, NULL);
+    if (file == INVALID_HANDLE_VALUE)
+    {
+        throw runtime_error("file open failure: " + name);
+    }
+    LARGE_INTEGER size;
+    if (!GetFileSizeEx(file, &size))
+    {
+        CloseHandle(file);
+        throw runtime_error("file stat failure: " + name);
+    }
+    file_ = file;
+    size_ = (size_t)size.QuadPart;
+    if (size_ == 0)
+    {
+        return;
+    }
+    HANDLE mapping = CreateFileMappingA(file, NULL, PAGE_READONLY, 0, 0, NULL);
+    if (mapping == NULL)
+    {
+        CloseHandle(file);
+        throw runtime_error("file mmap failure: " + name);
+    }
+    mapping_ = mapping;
+    data_ = (const char *)MapViewOfFile(mapping, FILE_MAP_READ, 0, 0, 0);
+    if (data_ == NULL)
+    {
+        CloseHandle(mapping);
+        CloseHandle(file);
+        throw runtime_error("file mmap failure: " + name);
+    }
+#else
+    fd_ = open(name.c_str(), O_RDONLY);
+    if (fd_ < 0)
+    {
+        throw runtime_error("file open failure: " + name);
+    }
+    struct stat info;
+    if (fstat(fd_, &info) != 0)
+    {
+        close(fd_);
+        throw runtime_error("file stat failure: " + name);
+    }
+    size_ = (size_t)info.st_size;
+    if (size_ == 0)
+    {
+        return;
+    }
+    void *ptr = mmap(NULL, size_, PROT_READ, MAP_PRIVATE, fd_, 0);
+    if (ptr == MAP_FAILED)
+    {
+        close(fd_);
+        throw runtime_error("file mmap failure: " + name);
+    }
+    posix_madvise(ptr, size_, POSIX_MADV_SEQUENTIAL);
+    data_ = (const char *)ptr;
+#endif
+}
+
+MappedFile::~MappedFile()
+{
+#ifdef _WIN32
+    if (data_ != nullptr)
+    {
+        UnmapViewOfFile(data_);
+    }
+    if (mapping_ != nullptr)
+    {
+        CloseHandle((HANDLE)mapping_);
+    }
+    if (file_ != nullptr)
+    {
+        CloseHandle((HANDLE)file_);
+    }
+#else
+    if (data_ != nullptr)
+    {
+        munmap((void *)data_, size_);
+    }
+    if (fd_ >= 0)
+    {
+        close(fd_);
+    }
+#endif
+}
+
+static inline bool is_space(char c)
+{
+    return c == ' ' || c == '\n' || c == '\r' || c == '\t';
+}
+
+static inline bool is_digit(char c)
+{
+    return (unsigned)(c - '0') < 10;
+}
+
+static inline size_t line_end(const char *data, size_t size, size_t pos)
+{
+    const void *ptr = memchr(data + pos, '\n', size - pos);
+    return ptr == nullptr ? size : (const char *)ptr - data;
+}
+
+static inline size_t next_line(const char *data, size_t size, size_t pos)
+{
+    size_t end = line_end(data, size, pos);
+    return end < size ? end + 1 : size;
+}
+
+// split one line into integers, false if any token is not an integer
+static bool read_ints(const char *begin, const char *end, vector<long long> &values, size_t limit)
+{
+    values.clear();
+    const char *p = begin;
+    while (p < end)
+    {
+        while (p < end && is_space(*p))
+        {
+            p++;
+        }
+        if (p >= end)
+        {
+            break;
+        }
+        if (values.size() == limit)
+        {
+            return false;
+        }
+        bool negative = (*p == '-');
+        if (*p == '-' || *p == '+')
+        {
+            p++;
+        }
+        if (p >= end || !is_digit(*p))
+        {
+            return false;
+        }
+        long long value = 0;
+        while (p < end && is_digit(*p))
+        {
+            value = value * 10 + (*p - '0');
+            p++;
+        }
+        if (p < end && !is_space(*p))
+        {
+            return false;
+        }
+        values.push_back(negative ? -value : value);
+    }
+    return true;
+}
+
+static bool is_blank(const char *begin, const char *end)
+{
+    for (const char *p = begin; p < end; p++)
+    {
+        if (!is_space(*p))
+        {
+            return false;
+        }
+    }
+    return true;
+}
+
+// parse one Fortran-formatted real, also accept the exponent without `E`, e.g. 0.12345678901-104
+static inline const char *parse_real(const char *p, const char *end, double &value)
+{
+    bool negative = false;
+    if (*p == '-' || *p == '+')
+    {
+        negative = (*p == '-');
+        p++;
+    }
+
+    uint64_t mantissa = 0;
+    int digits = 0, scale = 0;
+    bool truncated = false, any = false;
+    while (p < end && is_digit(*p))
+    {
+        any = true;
+        if (digits < 19)
+        {
+            mantissa = mantissa * 10 + (*p - '0');
+            digits += (mantissa != 0);
+        }
+        else
+        {
+            scale++;
+            truncated = true;
+        }
+        p++;
+    }
+    if (p < end && *p == '.')
+    {
+        p++;
+        while (p < end && is_digit(*p))
+        {
+            any = true;
+            if (digits < 19)
+            {
+                mantissa = mantissa * 10 + (*p - '0');
+                digits += (mantissa != 0);
+                scale--;
+            }
+            else
+            {
+                truncated = true;
+            }
+            p++;
+        }
+    }
+
+    int exponent = 0;
+    if (p < end && (*p == 'E' || *p == 'e' || *p == 'D' || *p == 'd' || *p == '+' || *p == '-'))
+    {
+        if (*p != '+' && *p != '-')
+        {
+            p++;
+        }
+        bool exp_negative = false;
+        if (p < end && (*p == '+' || *p == '-'))
+        {
+            exp_negative = (*p == '-');
+            p++;
+        }
+        while (p < end && is_digit(*p))
+        {
+            exponent = exponent < 100000 ? exponent * 10 + (*p - '0') : exponent;
+            p++;
+        }
+        exponent = exp_negative ? -exponent : exponent;
+    }
+
+    if (!any || (p < end && !is_space(*p)))
+    {
+        while (p < end && !is_space(*p)) // e.g. Fortran overflow `*****`
+        {
+            p++;
+        }
+        value = numeric_limits<double>::quiet_NaN();
+        return p;
+    }
+
+    int e10 = exponent + scale;
+    if (mantissa == 0)
+    {
+        value = 0.0;
+    }
+    else if (!truncated && mantissa <= (1ULL << 53) && e10 >= -22 && e10 <= 22)
+    {
+        value = e10 < 0 ? (double)mantissa / POW10[-e10] : (double)mantissa * POW10[e10];
+    }
+    else
+    {
+        char buffer[48];
+        snprintf(buffer, sizeof(buffer), "%llue%d", (unsigned long long)mantissa, e10);
+        value = strtod(buffer, nullptr);
+    }
+    value = negative ? -value : value;
+    return p;
+}
+
+// count the tokens which start in [begin, end), the token may cross `end`
+static size_t count_tokens(const char *begin, const char *end, const char *lower)
+{
+    size_t count = 0;
+    bool previous = (begin > lower) ? is_space(begin[-1]) : true;
+    for (const char *p = begin; p < end; p++)
+    {
+        bool space = is_space(*p);
+        count += (previous && !space);
+        previous = space;
+    }
+    return count;
+}
+
+// parse the tokens which start in [begin, end) to out, never read over `upper`
+template <typename T>
+static void parse_tokens(const char *begin, const char *end, const char *lower, const char *upper, T *out,
+                         size_t capacity)
+{
+    const char *p = begin;
+    if (p > lower && !is_space(p[-1])) // skip the token owned by the previous chunk
+    {
+        while (p < end && !is_space(*p))
+        {
+            p++;
+        }
+    }
+
+    size_t index = 0;
+    while (true)
+    {
+        while (p < end && is_space(*p))
+        {
+            p++;
+        }
+        if (p >= end || index >= capacity)
+        {
+            break;
+        }
+        double value;
+        p = parse_real(p, upper, value);
+        out[index++] = (T)value;
+    }
+}
+
+int default_threads(size_t nbytes)
+{
+    size_t hardware = thread::hardware_concurrency();
+    size_t threads = min(max(hardware, (size_t)1), nbytes / MinChunk + 1);
+    return (int)min(threads, (size_t)MaxThreads);
+}
+
+template <typename Func>
+static void run_parallel(int threads, Func func)
+{
+    if (threads <= 1)
+    {
+        func(0);
+        return;
+    }
+    vector<thread> workers;
+    workers.reserve(threads);
+    for (int i = 0; i < threads; i++)
+    {
+        workers.emplace_back(func, i);
+    }
+    for (auto &worker : workers)
+    {
+        worker.join();
+    }
+}
+
+static size_t count_tokens_parallel(const char *begin, const char *end, int threads, vector<size_t> &counts)
+{
+    size_t nbytes = end - begin;
+    threads = threads > 0 ? min(threads, MaxThreads) : default_threads(nbytes);
+    threads = max(1, min(threads, (int)(nbytes / 4096 + 1)));
+    counts.assign(threads, 0);
+    run_parallel(threads, [&](int i)
+                 { counts[i] = count_tokens(begin + nbytes * i / threads, begin + nbytes * (i + 1) / threads, begin); });
+
+    size_t total = 0;
+    for (auto count : counts)
+    {
+        total += count;
+    }
+    return total;
+}
+
+size_t locate_grid_header(const char *data, size_t size)
+{
+    vector<long long> values;
+    size_t pos = 0;
+    for (int i = 0; i < 5; i++) // title, scale, lattice
+    {
+        pos = next_line(data, size, pos);
+    }
+
+    size_t end = line_end(data, size, pos);
+    if (!read_ints(data + pos, data + end, values, 1024) || values.empty()) // VASP5: element names first
+    {
+        pos = next_line(data, size, pos);
+        end = line_end(data, size, pos);
+        if (!read_ints(data + pos, data + end, values, 1024) || values.empty())
+        {
+            throw runtime_error("can't identify the atoms' count line");
+        }
+    }
+    long long natoms = 0;
+    for (auto value : values)
+    {
+        natoms += value;
+    }
+
+    pos = next_line(data, size, pos);
+    size_t skip = pos;
+    while (skip < size && (data[skip] == ' ' || data[skip] == '\t'))
+    {
+        skip++;
+    }
+    if (skip < size && (data[skip] == 'S' || data[skip] == 's')) // selective dynamics
+    {
+        pos = next_line(data, size, pos);
+    }
+    pos = next_line(data, size, pos); // coordinate type
+    for (long long i = 0; i < natoms; i++)
+    {
+        pos = next_line(data, size, pos);
+    }
+
+    while (pos < size)
+    {
+        end = line_end(data, size, pos);
+        if (!is_blank(data + pos, data + end))
+        {
+            break;
+        }
+        pos = next_line(data, size, pos);
+    }
+    if (pos >= size || !read_ints(data + pos, data + line_end(data, size, pos), values, 3) || values.size() != 3)
+    {
+        throw runtime_error("grid header not found");
+    }
+    return pos;
+}
+
+static GridBlock read_block_header(const char *data, size_t size, size_t header)
+{
+    vector<long long> values;
+    size_t end = line_end(data, size, header);
+    if (!read_ints(data + header, data + end, values, 3) || values.size() != 3 || values[0] <= 0 || values[1] <= 0 ||
+        values[2] <= 0)
+    {
+        throw runtime_error("invalid grid header");
+    }
+
+    GridBlock block;
+    block.header = header;
+    block.begin = next_line(data, size, header);
+    block.end = block.begin;
+    block.NGX = (int)values[0];
+    block.NGY = (int)values[1];
+    block.NGZ = (int)values[2];
+    return block;
+}
+
+// walk the tokens until the grid is complete, exact for any layout
+static void walk_block(const char *data, size_t size, GridBlock &block)
+{
+    size_t total = (size_t)block.NGX * block.NGY * block.NGZ;
+    size_t count = 0;
+    bool previous = true;
+    size_t pos = block.begin;
+    for (; pos < size; pos++)
+    {
+        bool space = is_space(data[pos]);
+        if (previous && !space && ++count == total)
+        {
+            break;
+        }
+        previous = space;
+    }
+    if (count != total)
+    {
+        throw runtime_error("grid block is truncated");
+    }
+    block.end = next_line(data, size, pos);
+}
+
+GridBlock locate_block(const char *data, size_t size, size_t header)
+{
+    GridBlock block = read_block_header(data, size, header);
+    size_t total = (size_t)block.NGX * block.NGY * block.NGZ;
+
+    // fast path: VASP writes fixed-width lines, predict the end from the first line and check sampled line ends,
+    // parse_block verifies the prediction by the token count and falls back to walk_block if it fails
+    size_t width = next_line(data, size, block.begin) - block.begin;
+    size_t per_line = count_tokens(data + block.begin, data + block.begin + width, data + block.begin);
+    if (per_line > 0 && data[block.begin + width - 1] == '\n')
+    {
+        size_t full = total / per_line, residue = total % per_line;
+        size_t pos = block.begin + full * width;
+        bool regular = pos <= size;
+        const size_t samples = 256;
+        for (size_t i = 1; regular && i <= min(full, samples); i++)
+        {
+            size_t line = full * i / min(full, samples);
+            regular = data[block.begin + line * width - 1] == '\n';
+        }
+        if (regular && residue)
+        {
+            size_t end = next_line(data, size, pos);
+            regular = count_tokens(data + pos, data + end, data + pos) == residue;
+            pos = end;
+        }
+        if (regular)
+        {
+            block.end = pos;
+            return block;
+        }
+    }
+
+    walk_block(data, size, block);
+    return block;
+}
+
+// skip the `augmentation occupancies <atom> <count>` sections following a block (CHGCAR only)
+size_t skip_augmentation(const char *data, size_t size, size_t pos)
+{
+    static const char Keyword[] = "augmentation";
+    while (pos < size)
+    {
+        size_t end = line_end(data, size, pos), p = pos;
+        while (p < end && is_space(data[p]))
+        {
+            p++;
+        }
+        if (end - p < sizeof(Keyword) - 1 || strncmp(data + p, Keyword, sizeof(Keyword) - 1) != 0)
+        {
+            break;
+        }
+
+        size_t last = end; // the last integer of the line is the number of values
+        while (last > p && is_space(data[last - 1]))
+        {
+            last--;
+        }
+        size_t first = last;
+        while (first > p && is_digit(data[first - 1]))
+        {
+            first--;
+        }
+        size_t count = strtoul(string(data + first, data + last).c_str(), nullptr, 10), found = 0;
+        pos = next_line(data, size, pos);
+        while (found < count && pos < size)
+        {
+            end = next_line(data, size, pos);
+            found += count_tokens(data + pos, data + end, data + pos);
+            pos = end;
+        }
+    }
+    return pos;
+}
+
+bool find_next_block(const char *data, size_t size, const GridBlock &previous, size_t from, size_t &header)
+{
+    vector<long long> values;
+    for (size_t pos = from; pos < size; pos = next_line(data, size, pos))
+    {
+        size_t end = line_end(data, size, pos);
+        if (read_ints(data + pos, data + end, values, 3) && values.size() == 3 && values[0] == previous.NGX &&
+            values[1] == previous.NGY && values[2] == previous.NGZ)
+        {
+            header = pos;
+            return true;
+        }
+    }
+    return false;
+}
+
+GridIndex index_grid(const char *data, size_t size)
+{
+    GridIndex index;
+    index.head = locate_grid_header(data, size);
+    size_t header = index.head;
+    while (true)
+    {
+        GridBlock block = locate_block(data, size, header);
+        size_t end = skip_augmentation(data, size, block.end);
+        index.blocks.push_back(block);
+        index.augmentation.emplace_back(block.end, end);
+        if (!find_next_block(data, size, block, end, header))
+        {
+            break;
+        }
+    }
+    return index;
+}
+
+template <typename T>
+void parse_block(const char *data, size_t size, GridBlock &block, T *out, int threads)
+{
+    size_t total = (size_t)block.NGX * block.NGY * block.NGZ;
+    vector<size_t> counts;
+    size_t found = count_tokens_parallel(data + block.begin, data + block.end, threads, counts);
+    if (found != total) // irregular layout, locate the end exactly
+    {
+        walk_block(data, size, block);
+        found = count_tokens_parallel(data + block.begin, data + block.end, threads, counts);
+    }
+    if (found != total)
+    {
+        throw runtime_error("grid block size is not consistent");
+    }
+
+    const char *begin = data + block.begin, *end = data + block.end;
+    int nchunks = (int)counts.size();
+    vector<size_t> offsets(nchunks, 0);
+    for (int i = 1; i < nchunks; i++)
+    {
+        offsets[i] = offsets[i - 1] + counts[i - 1];
+    }
+
+    size_t nbytes = end - begin;
+    run_parallel(nchunks, [&](int i)
+                 { parse_tokens(begin + nbytes * i / nchunks, begin + nbytes * (i + 1) / nchunks, begin, end,
+                                out + offsets[i], counts[i]); });
+}
+
+// parse several blocks of one mapping concurrently, the threads are shared by the blocks
+template <typename T>
+void parse_blocks(const char *data, size_t size, vector<GridBlock> &blocks, const vector<T *> &outs, int threads)
+{
+    int nblocks = (int)blocks.size();
+    if (nblocks == 0)
+    {
+        return;
+    }
+    size_t nbytes = 0;
+    for (auto &block : blocks)
+    {
+        nbytes += block.end - block.begin;
+    }
+    threads = threads > 0 ? min(threads, MaxThreads) : default_threads(nbytes);
+    int concurrent = min(nblocks, threads); // blocks parsed at the same time
+    int workers = max(1, threads / concurrent);
+
+    vector<string> errors(nblocks);
+    run_parallel(concurrent, [&](int i)
+                 {
+                     for (int j = i; j < nblocks; j += concurrent)
+                     {
+                         try
+                         {
+                             parse_block(data, size, blocks[j], outs[j], workers);
+                         }
+                         catch (const exception &error)
+                         {
+                             errors[j] = error.what();
+                         }
+                     } });
+    for (auto &error : errors)
+    {
+        if (!error.empty())
+        {
+            throw runtime_error(error);
+        }
+    }
+}
+
+// skip the spaces before the next token, false if the block is exhausted
+static inline bool next_token(const char *&p, const char *end)
+{
+    while (p < end && is_space(*p))
+    {
+        p++;
+    }
+    return p < end;
+}
+
+static inline void skip_token(const char *&p, const char *end)
+{
+    while (p < end && !is_space(*p))
+    {
+        p++;
+    }
+}
+
+// parse the strided box [lo, hi) of a block to out (x fastest, shape of the box), for the fixed-width layout (VASP) only
+// the lines holding the selected rows are touched, otherwise the tokens are walked once up to the end of the box
+template <typename T>
+void parse_box(const char *data, size_t size, const GridBlock &block, const size_t lo[3], const size_t hi[3],
+               const size_t step[3], T *out, int threads)
+{
+    size_t n[3];
+    for (int i = 0; i < 3; i++)
+    {
+        n[i] = (hi[i] - lo[i] + step[i] - 1) / step[i];
+    }
+    size_t NGX = block.NGX, NGY = block.NGY, rows = n[1] * n[2];
+    const char *begin = data + block.begin, *end = data + block.end;
+    size_t width = next_line(data, size, block.begin) - block.begin;
+    size_t per_line = count_tokens(begin, begin + width, begin);
+    size_t last_x = lo[0] + (n[0] - 1) * step[0]; // last selected x of a row
+
+    if (per_line > 0 && begin[width - 1] == '\n' && rows > 0)
+    {
+        size_t row_bytes = (last_x - lo[0] + 1) / per_line * width + width;
+        threads = threads > 0 ? min(threads, MaxThreads) : default_threads(rows * row_bytes);
+        threads = max(1, min(threads, (int)rows));
+        vector<char> failure(threads, 0);
+        run_parallel(threads, [&](int t)
+                     {
+                         for (size_t row = rows * t / threads; row < rows * (t + 1) / threads && !failure[t]; row++)
+                         {
+                             size_t y = lo[1] + row % n[1] * step[1], z = lo[2] + row / n[1] * step[2];
+                             size_t first = lo[0] + NGX * (y + NGY * z);
+                             size_t line = block.begin + first / per_line * width;
+                             if (line >= block.end || (line > block.begin && data[line - 1] != '\n') ||
+                                 (line + width <= block.end && data[line + width - 1] != '\n'))
+                             {
+                                 failure[t] = 1; // irregular layout
+                                 break;
+                             }
+                             const char *p = data + line;
+                             for (size_t skip = first % per_line; skip > 0 && next_token(p, end); skip--)
+                             {
+                                 skip_token(p, end); // values before the row on its first line
+                             }
+                             T *row_out = out + row * n[0];
+                             for (size_t x = lo[0]; x <= last_x; x++)
+                             {
+                                 if (!next_token(p, end))
+                                 {
+                                     failure[t] = 1;
+                                     break;
+                                 }
+                                 if ((x - lo[0]) % step[0] == 0)
+                                 {
+                                     double value;
+                                     p = parse_real(p, end, value);
+                                     row_out[(x - lo[0]) / step[0]] = (T)value;
+                                 }
+                                 else
+                                 {
+                                     skip_token(p, end);
+                                 }
+                             }
+                         } });
+        if (find(failure.begin(), failure.end(), 1) == failure.end())
+        {
+            return;
+        }
+    }
+
+    // irregular layout: walk the tokens once
+    const char *p = begin;
+    size_t x = 0, y = 0, z = 0;
+    size_t last = last_x + NGX * (lo[1] + (n[1] - 1) * step[1] + NGY * (lo[2] + (n[2] - 1) * step[2]));
+    for (size_t i = 0; i <= last; i++)
+    {
+        if (!next_token(p, end))
+        {
+            throw runtime_error("grid block is truncated");
+        }
+        if (x >= lo[0] && x <= last_x && (x - lo[0]) % step[0] == 0 && y >= lo[1] && y < hi[1] &&
+            (y - lo[1]) % step[1] == 0 && z >= lo[2] && z < hi[2] && (z - lo[2]) % step[2] == 0)
+        {
+            double value;
+            p = parse_real(p, end, value);
+            out[((z - lo[2]) / step[2] * n[1] + (y - lo[1]) / step[1]) * n[0] + (x - lo[0]) / step[0]] = (T)value;
+        }
+        else
+        {
+            skip_token(p, end);
+        }
+        if (++x == NGX)
+        {
+            x = 0;
+            if (++y == NGY)
+            {
+                y = 0;
+                z++;
+            }
+        }
+    }
+}
+
+template void parse_block<double>(const char *, size_t, GridBlock &, double *, int);
+template void parse_block<float>(const char *, size_t, GridBlock &, float *, int);
+template void parse_blocks<double>(const char *, size_t, vector<GridBlock> &, const vector<double *> &, int);
+template void parse_blocks<float>(const char *, size_t, vector<GridBlock> &, const vector<float *> &, int);
+template void parse_box<double>(const char *, size_t, const GridBlock &, const size_t[3], const size_t[3],
+                                const size_t[3], double *, int);
+template void parse_box<float>(const char *, size_t, const GridBlock &, const size_t[3], const size_t[3],
+                               const size_t[3], float *, int);
+
+// write the concatenated byte ranges of a mapping to output, copied in large blocks without decoding
+void copy_ranges(const char *data, size_t size, const vector<pair<size_t, size_t>> &ranges, const string &output)
+{
+    const size_t Block = 1 << 24;
+    FILE *fp = fopen(output.c_str(), "wb");
+    if (fp == NULL)
+    {
+        throw runtime_error("file open failure: " + output);
+    }
+    for (auto &range : ranges)
+    {
+        if (range.first > range.second || range.second > size)
+        {
+            fclose(fp);
+            throw runtime_error("byte range is out of the file, the index may be outdated");
+        }
+        for (size_t pos = range.first; pos < range.second; pos += Block)
+        {
+            size_t count = min(Block, range.second - pos);
+            if (fwrite(data + pos, 1, count, fp) != count)
+            {
+                fclose(fp);
+                throw runtime_error("file write failure: " + output);
+            }
+        }
+    }
+    if (fclose(fp) != 0)
+    {
+        throw runtime_error("file write failure: " + output);
+    }
+}
+
+// format value as printf("%{precision + 7}.{precision}E"), e.g., %18.11E, the digits are rounded in integer arithmetic,
+// snprintf is only called for the values out of range or too close to a rounding tie
+char *format_real(double value, char *p, int precision)
+{
+    int width = precision + 7;
+    double magnitude = fabs(value);
+    if (magnitude == 0.0)
+    {
+        *p++ = signbit(value) ? '-' : ' ';
+        *p++ = '0';
+        *p++ = '.';
+        memset(p, '0', precision);
+        p += precision;
+        memcpy(p, "E+00", 4);
+        return p + 4;
+    }
+    if (!isfinite(magnitude) || precision > 15)
+    {
+        return p + snprintf(p, 48, "%*.*E", width, precision, value);
+    }
+
+    double lower = POW10[precision], upper = POW10[precision + 1];
+    int exponent = (int)floor(log10(magnitude));
+    double scaled = 0.0;
+    for (int attempt = 0; attempt < 2; attempt++) // log10 may be off by one near the powers of 10
+    {
+        int k = precision - exponent;
+        if (k < -22 || k > 22)
+        {
+            return p + snprintf(p, 48, "%*.*E", width, precision, value);
+        }
+        scaled = k >= 0 ? magnitude * POW10[k] : magnitude / POW10[-k];
+        if (scaled >= upper)
+        {
+            exponent++;
+        }
+        else if (scaled < lower)
+        {
+            exponent--;
+        }
+        else
+        {
+            break;
+        }
+    }
+    double whole = floor(scaled), fraction = scaled - whole;
+    if (scaled < lower || scaled >= upper || fabs(fraction - 0.5) < 1e-3) // the scaled value carries an error of ~1e-4
+    {
+        return p + snprintf(p, 48, "%*.*E", width, precision, value);
+    }
+    uint64_t digits = (uint64_t)whole + (fraction > 0.5 ? 1 : 0);
+    if (digits >= (uint64_t)upper)
+    {
+        digits /= 10;
+        exponent++;
+    }
+    if (exponent <= -100 || exponent >= 100)
+    {
+        return p + snprintf(p, 48, "%*.*E", width, precision, value);
+    }
+
+    char text[16];
+    for (int i = precision; i >= 0; i--)
+    {
+        text[i] = (char)('0' + digits % 10);
+        digits /= 10;
+    }
+    *p++ = value < 0 ? '-' : ' ';
+    *p++ = text[0];
+    *p++ = '.';
+    memcpy(p, text + 1, precision);
+    p += precision;
+    *p++ = 'E';
+    *p++ = exponent < 0 ? '-' : '+';
+    exponent = abs(exponent);
+    *p++ = (char)('0' + exponent / 10);
+    *p++ = (char)('0' + exponent % 10);
+    return p;
+}
+
+// format the values [first, last) of the grid (x fastest) by format(index, value, p) -> p
+template <typename T, typename Format>
+static void format_values(const T *data, const size_t shape[3], const ptrdiff_t strides[3], size_t first,
+                          size_t last, size_t width, Format format, vector<char> &buffer)
+{
+    buffer.resize((last - first) * width + 1);
+    char *p = buffer.data();
+    size_t x = first % shape[0], y = first / shape[0] % shape[1], z = first / (shape[0] * shape[1]);
+    const T *plane = data + y * strides[1] + z * strides[2];
+    for (size_t i = first; i < last; i++)
+    {
+        p = format(i, (double)plane[x * strides[0]], p);
+        if (++x == shape[0])
+        {
+            x = 0;
+            if (++y == shape[1])
+            {
+                y = 0;
+                z++;
+            }
+            plane = data + y * strides[1] + z * strides[2];
+        }
+    }
+    buffer.resize(p - buffer.data());
+}
+
+// format the strided data (e.g., Fortran- or C-ordered array) in place by threads in fixed-size blocks and pass the
+// blocks in order to sink(buffer, size) -> bool, stop if it fails, width is the upper bound of the bytes of one value
+template <typename T, typename Format, typename Sink>
+static bool format_blocks(const T *data, const size_t shape[3], const ptrdiff_t strides[3], int threads, size_t width,
+                          Format format, Sink sink)
+{
+    const size_t Chunk = 5 << 16; // values formatted by one thread at once, multiple of 5 (VASP line)
+    size_t total = shape[0] * shape[1] * shape[2];
+    threads = threads > 0 ? min(threads, MaxThreads) : default_threads(total * width);
+    threads = max(1, min(threads, (int)(total / Chunk + 1)));
+
+    vector<vector<char>> buffers(threads);
+    for (size_t begin = 0; begin < total; begin += Chunk * threads)
+    {
+        run_parallel(threads, [&](int i)
+                     {
+                         size_t first = min(total, begin + Chunk * i), last = min(total, first + Chunk);
+                         format_values(data, shape, strides, first, last, width, format, buffers[i]); });
+        for (auto &buffer : buffers)
+        {
+            if (!buffer.empty() && !sink(buffer.data(), buffer.size()))
+            {
+                return false;
+            }
+        }
+    }
+    return true;
+}
+
+// write head and the formatted grid, the blocks are streamed to output
+template <typename T, typename Format>
+static void stream_grid(const string &output, const string &head, const T *data, const size_t shape[3],
+                        const ptrdiff_t strides[3], bool append, int threads, size_t width, Format format)
+{
+    FILE *fp = fopen(output.c_str(), append ? "ab" : "wb");
+    if (fp == NULL)
+    {
+        throw runtime_error("file open failure: " + output);
+    }
+    bool failure = fwrite(head.data(), 1, head.size(), fp) != head.size();
+    failure = failure || !format_blocks(data, shape, strides, threads, width, format,
+                                        [fp](const char *buffer, size_t size)
+                                        { return fwrite(buffer, 1, size, fp) == size; });
+    if (fclose(fp) != 0 || failure)
+    {
+        throw runtime_error("file write failure: " + output);
+    }
+}
+
+// VASP layout: `%18.11E`, 5 values per line, the residue in the last line
+struct VaspFormat
+{
+    static const size_t width = 24;
+    size_t total;
+
+    char *operator()(size_t i, double value, char *p) const
+    {
+        p = format_real(value, p, 11);
+        *p++ = (i % 5 == 4 || i + 1 == total) ? '\n' : ' ';
+        return p;
+    }
+};
+
+// .grd layout: one value per line, `%12.5E` or `0` for |value| <= 1e-5, the values with |value| < cutoff are set to 0
+struct GrdFormat
+{
+    static const size_t width = 20;
+    double cutoff;
+
+    char *operator()(size_t, double value, char *p) const
+    {
+        if (fabs(value) < cutoff)
+        {
+            value = 0.0;
+        }
+        if (fabs(value) > 1e-5)
+        {
+            p = format_real(value, p, 5);
+        }
+        else
+        {
+            if (signbit(value))
+            {
+                *p++ = '-';
+            }
+            *p++ = '0';
+        }
+        *p++ = '\n';
+        return p;
+    }
+};
+
+template <typename T>
+void write_grid(const string &output, const string &head, const T *data, const size_t shape[3],
+                const ptrdiff_t strides[3], bool append, int threads)
+{
+    VaspFormat format = {shape[0] * shape[1] * shape[2]};
+    stream_grid(output, head, data, shape, strides, append, threads, VaspFormat::width, format);
+}
+
+template <typename T>
+void write_grd(const string &output, const string &head, const T *data, const size_t shape[3],
+               const ptrdiff_t strides[3], double cutoff, int threads)
+{
+    GrdFormat format = {cutoff};
+    stream_grid(output, head, data, shape, strides, false, threads, GrdFormat::width, format);
+}
+
+// format the grid in VASP (or .grd) layout block by block and pass the blocks to sink, e.g., a compressed stream
+template <typename T>
+void format_grid(const T *data, const size_t shape[3], const ptrdiff_t strides[3], bool grd, double cutoff,
+                 int threads, const function<void(const char *, size_t)> &sink)
+{
+    auto forward = [&sink](const char *buffer, size_t size)
+    {
+        sink(buffer, size);
+        return true;
+    };
+    if (grd)
+    {
+        GrdFormat format = {cutoff};
+        format_blocks(data, shape, strides, threads, GrdFormat::width, format, forward);
+    }
+    else
+    {
+        VaspFormat format = {shape[0] * shape[1] * shape[2]};
+        format_blocks(data, shape, strides, threads, VaspFormat::width, format, forward);
+    }
+}
+
+template void write_grid<double>(const string &, const string &, const double *, const size_t[3], const ptrdiff_t[3],
+                                 bool, int);
+template void write_grid<float>(const string &, const string &, const float *, const size_t[3], const ptrdiff_t[3],
+                                bool, int);
+template void write_grd<double>(const string &, const string &, const double *, const size_t[3], const ptrdiff_t[3],
+                                double, int);
+template void write_grd<float>(const string &, const string &, const float *, const size_t[3], const ptrdiff_t[3],
+                               double, int);
+template void format_grid<double>(const double *, const size_t[3], const ptrdiff_t[3], bool, double, int,
+                                  const function<void(const char *, size_t)> &);
+template void format_grid<float>(const float *, const size_t[3], const ptrdiff_t[3], bool, double, int,
+                                 const function<void(const char *, size_t)> &);
+
+GridStream::GridStream(const string &name, size_t begin, size_t end, size_t capacity)
+    : name_(name), remaining_(end - begin), buffer_(capacity)
+{
+    file_ = fopen(name.c_str(), "rb");
+    if (file_ == NULL)
+    {
+        throw runtime_error("file open failure: " + name);
+    }
+#ifdef _WIN32
+    int status = _fseeki64(file_, (long long)begin, SEEK_SET);
+#else
+    int status = fseeko(file_, (off_t)begin, SEEK_SET);
+#endif
+    if (begin > end || status != 0)
+    {
+        fclose(file_);
+        throw runtime_error("grid block is out of the file, the index may be outdated");
+    }
+}
+
+GridStream::~GridStream()
+{
+    fclose(file_);
+}
+
+// keep the unparsed tail and read the next bytes, false if nothing is left
+bool GridStream::fill()
+{
+    if (remaining_ == 0)
+    {
+        return false;
+    }
+    size_t kept = length_ - position_;
+    memmove(buffer_.data(), buffer_.data() + position_, kept);
+    if (kept == buffer_.size())
+    {
+        buffer_.resize(buffer_.size() * 2);
+    }
+    size_t count = fread(buffer_.data() + kept, 1, min(buffer_.size() - kept, remaining_), file_);
+    if (count == 0)
+    {
+        throw runtime_error("file read failure: " + name_);
+    }
+    remaining_ -= count;
+    position_ = 0;
+    length_ = kept + count;
+    return true;
+}
+
+size_t GridStream::read(double *out, size_t count)
+{
+    size_t index = 0;
+    const char *data = buffer_.data();
+    while (index < count)
+    {
+        while (position_ < length_ && is_space(data[position_]))
+        {
+            position_++;
+        }
+        size_t end = position_;
+        while (end < length_ && !is_space(data[end]))
+        {
+            end++;
+        }
+        if (end == length_ && remaining_ > 0) // the token may continue in the next bytes
+        {
+            fill();
+            data = buffer_.data();
+            continue;
+        }
+        if (position_ == length_)
+        {
+            break;
+        }
+        parse_real(data + position_, data + end, out[index++]);
+        position_ = end;
+    }
+    return index;
+}
+
+// stream the linear combination sum(coefficients[k] * grid[k]) of the blocks to output after head in VASP layout, the
+// inputs are read in lockstep by chunks, so the memory is constant (a few MB) regardless of the grid size; the planar
+// sums (NGX + NGY + NGZ values) are accumulated in the same pass if planar is given, nothing is written if output is empty
+void combine_grids(const vector<tuple<string, size_t, size_t>> &inputs, const vector<double> &coefficients,
+                   const size_t shape[3], const string &output, const string &head, int threads, double *planar)
+{
+    const size_t Chunk = 5 << 14; // values combined at once, multiple of 5 (VASP line)
+    size_t total = shape[0] * shape[1] * shape[2];
+    threads = threads > 0 ? min(threads, MaxThreads) : default_threads(total * 24);
+    threads = max(1, min(threads, (int)(Chunk / 4096)));
+
+    vector<unique_ptr<GridStream>> streams;
+    for (auto &input : inputs)
+    {
+        streams.emplace_back(new GridStream(get<0>(input), get<1>(input), get<2>(input)));
+    }
+    vector<double> values(Chunk), result(Chunk);
+    vector<vector<char>> buffers(threads);
+
+    FILE *fp = NULL;
+    if (!output.empty() && (fp = fopen(output.c_str(), "wb")) == NULL)
+    {
+        throw runtime_error("file open failure: " + output);
+    }
+    bool failure = fp != NULL && fwrite(head.data(), 1, head.size(), fp) != head.size();
+    size_t x = 0, y = 0, z = 0; // grid point of the next combined value (x fastest)
+    try
+    {
+        for (size_t begin = 0; begin < total && !failure; begin += Chunk)
+        {
+            size_t count = min(Chunk, total - begin);
+            fill(result.begin(), result.begin() + count, 0.0);
+            for (size_t k = 0; k < streams.size(); k++)
+            {
+                if (streams[k]->read(values.data(), count) != count)
+                {
+                    throw runtime_error("grid block of " + get<0>(inputs[k]) + " is incomplete");
+                }
+                for (size_t i = 0; i < count; i++)
+                {
+                    result[i] += coefficients[k] * values[i];
+                }
+            }
+
+            if (planar != nullptr) // planar sums along x, y and z: planar[x], planar[NGX + y], planar[NGX + NGY + z]
+            {
+                double *sum_x = planar, *sum_y = planar + shape[0], *sum_z = sum_y + shape[1];
+                for (size_t i = 0; i < count; i++)
+                {
+                    sum_x[x] += result[i];
+                    sum_y[y] += result[i];
+                    sum_z[z] += result[i];
+                    if (++x == shape[0])
+                    {
+                        x = 0;
+                        if (++y == shape[1])
+                        {
+                            y = 0;
+                            z++;
+                        }
+                    }
+                }
+            }
+            if (fp == NULL)
+            {
+                continue;
+            }
+
+            size_t part = ((count + threads - 1) / threads + 4) / 5 * 5;
+            size_t chunk_shape[3] = {count, 1, 1};
+            ptrdiff_t chunk_strides[3] = {1, 0, 0};
+            run_parallel(threads, [&](int t)
+                         {
+                             size_t first = min(count, part * t), last = min(count, first + part);
+                             format_values(result.data(), chunk_shape, chunk_strides, first, last, 24,
+                                           [begin, total](size_t i, double value, char *p)
+                                           {
+                                               p = format_real(value, p, 11);
+                                               *p++ = ((begin + i) % 5 == 4 || begin + i + 1 == total) ? '\n' : ' ';
+                                               return p; },
+                                           buffers[t]); });
+            for (auto &buffer : buffers)
+            {
+                failure = failure || fwrite(buffer.data(), 1, buffer.size(), fp) != buffer.size();
+            }
+        }
+    }
+    catch (...)
+    {
+        if (fp != NULL)
+        {
+            fclose(fp);
+        }
+        throw;
+    }
+    if (fp != NULL && (fclose(fp) != 0 || failure))
+    {
+        throw runtime_error("file write failure: " + output);
+    }
+}
+
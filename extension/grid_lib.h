@@ -0,0 +1,108 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <cstdio>
+#include <functional>
+#include <string>
+#include <tuple>
+#include <utility>
+#include <vector>
+
+using namespace std;
+
+// read-only memory mapping of a whole file, unmapped on destruction
+class MappedFile
+{
+public:
+    explicit MappedFile(const string &name);
+    ~MappedFile();
+    MappedFile(const MappedFile &) = delete;
+    MappedFile &operator=(const MappedFile &) = delete;
+
+    const char *data() const { return data_; }
+    size_t size() const { return size_; }
+
+private:
+    const char *data_ = nullptr;
+    size_t size_ = 0;
+#ifdef _WIN32
+    void *file_ = nullptr;
+    void *mapping_ = nullptr;
+#else
+    int fd_ = -1;
+#endif
+};
+
+// one volumetric data block: [begin, end) holds NGX * NGY * NGZ values
+struct GridBlock
+{
+    size_t header; // offset of the `NGX NGY NGZ` line
+    size_t begin;  // offset of the first value
+    size_t end;    // offset just after the line holding the last value
+    int NGX;
+    int NGY;
+    int NGZ;
+};
+
+// byte-offset index of a volumetric file: POSCAR head, grid blocks and their augmentation occupancies
+struct GridIndex
+{
+    size_t head; // offset of the first `NGX NGY NGZ` line
+    vector<GridBlock> blocks;
+    vector<pair<size_t, size_t>> augmentation; // [begin, end) after each block, empty if begin == end
+};
+
+// sequential reader of the values in [begin, end) of a file through a fixed-size buffer
+class GridStream
+{
+public:
+    GridStream(const string &name, size_t begin, size_t end, size_t capacity = 1 << 20);
+    ~GridStream();
+    GridStream(const GridStream &) = delete;
+    GridStream &operator=(const GridStream &) = delete;
+
+    size_t read(double *out, size_t count); // parse the next count values, return the number of parsed values
+
+private:
+    bool fill();
+
+    string name_;
+    FILE *file_ = nullptr;
+    size_t remaining_; // bytes of the range not read yet
+    vector<char> buffer_;
+    size_t position_ = 0;
+    size_t length_ = 0;
+};
+
+int default_threads(size_t nbytes);
+
+size_t locate_grid_header(const char *data, size_t size);
+GridBlock locate_block(const char *data, size_t size, size_t header);
+size_t skip_augmentation(const char *data, size_t size, size_t pos);
+bool find_next_block(const char *data, size_t size, const GridBlock &previous, size_t from, size_t &header);
+GridIndex index_grid(const char *data, size_t size);
+
+// T: double or float, the values are parsed in double precision and stored as T
+template <typename T>
+void parse_block(const char *data, size_t size, GridBlock &block, T *out, int threads);
+template <typename T>
+void parse_blocks(const char *data, size_t size, vector<GridBlock> &blocks, const vector<T *> &outs, int threads);
+template <typename T>
+void parse_box(const char *data, size_t size, const GridBlock &block, const size_t lo[3], const size_t hi[3],
+               const size_t step[3], T *out, int threads);
+void copy_ranges(const char *data, size_t size, const vector<pair<size_t, size_t>> &ranges, const string &output);
+
+char *format_real(double value, char *p, int precision);
+template <typename T>
+void write_grid(const string &output, const string &head, const T *data, const size_t shape[3],
+                const ptrdiff_t strides[3], bool append, int threads);
+template <typename T>
+void format_grid(const T *data, const size_t shape[3], const ptrdiff_t strides[3], bool grd, double cutoff,
+                 int threads, const function<void(const char *, size_t)> &sink);
+void combine_grids(const vector<tuple<string, size_t, size_t>> &inputs, const vector<double> &coefficients,
+                   const size_t shape[3], const string &output, const string &head, int threads,
+                   double *planar = nullptr);
+template <typename T>
+void write_grd(const string &output, const string &head, const T *data, const size_t shape[3],
+               const ptrdiff_t strides[3], double cutoff, int threads);
@@ -0,0 +1,279 @@
+"""
+Opt-in binary sidecar cache of the parsed grids (CHGCAR, AECCAR*, LOCPOT, ...)
+
+The cache lives in the `.gvasp_cache` directory next to the source file: every grid block is saved as
+`<name>.<block>.npy` with a small `<name>.json` header keyed by the size, mtime and content hash of the source, later
+loads memory-map the `.npy` instead of parsing the text again. The directory is capped (`cache_size` in config.json,
+unit: MB) and the least recently used grids are evicted first.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from gvasp.common.setting import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+CacheDir = '.gvasp_cache'
+
+
+def content_hash(name, samples=64, sample_size=4096):
+    """
+    Hash the size, head, tail and evenly sampled pieces of a file, cheap even for GB-level grids
+
+    Args:
+        name (str | Path): file name
+        samples (int): number of sampled pieces
+        sample_size (int): bytes of one piece
+
+    Returns:
+        hash (str): hex digest
+    """
+    size = os.path.getsize(name)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(name, 'rb') as f:
+        if size <= samples * sample_size:
+            digest.update(f.read())
+        else:
+            for index in range(samples):
+                f.seek((size - sample_size) * index // (samples - 1))
+                digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+
+class GridCache:
+    """
+    Sidecar cache of one source file
+
+    Args:
+        name (str | Path): source file, e.g., CHGCAR
+        capacity (int): size cap of the cache directory (unit: MB), default: `cache_size` of config.json
+    """
+
+    _lock = threading.Lock()  # grids may be saved by concurrent loaders (load_grids)
+
+    def __init__(self, name, capacity=None):
+        self.source = Path(name)
+        self.directory = self.source.parent / CacheDir
+        capacity = ConfigManager().cache_size if capacity is None else capacity
+        self.capacity = int(capacity * 1024 ** 2)
+
+    def __repr__(self):
+        return f"<GridCache | source='{self.source}'>"
+
+    @property
+    def header(self):
+        return self.directory / f'{self.source.name}.json'
+
+    def grid(self, block):
+        return self.directory / f'{self.source.name}.{block}.npy'
+
+    def _stamp(self):
+        stat = self.source.stat()
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def valid(self):
+        """
+        Check the cache is consistent with the source, the content hash is only calculated if the mtime is changed
+        (e.g., copy or touch), the stale grids are removed
+        """
+        try:
+            with open(self.header) as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        stamp = self._stamp()
+        if header.get('size') == stamp['size'] and header.get('mtime_ns') == stamp['mtime_ns']:
+            return True
+        if header.get('size') == stamp['size'] and header.get('hash') == content_hash(self.source):
+            self._write_header(hash=header['hash'], **stamp)
+            return True
+
+        logger.debug(f'{self.source} is changed, drop the cache')
+        self.clear()
+        return False
+
+    def load(self, block=0, dtype=None):
+        """
+        Memory-map the cached grid (copy-on-write), None if not cached or outdated
+
+        Args:
+            block (int): index of the grid block
+            dtype (np.dtype): requested precision, a float64 grid is converted to float32, a float32 grid is a miss for
+                              float64 (reparsed, not upcasted), None: as cached
+
+        Returns:
+            grid (np.memmap | np.ndarray | None): cached grid
+        """
+        path = self.grid(block)
+        if not path.exists() or not self.valid():
+            return None
+        try:
+            grid = np.load(path, mmap_mode='c')
+        except (OSError, ValueError):
+            logger.warning(f'{path} is broken, drop it')
+            path.unlink(missing_ok=True)
+            return None
+        if dtype is not None and grid.dtype != dtype:
+            if np.finfo(grid.dtype).precision < np.finfo(dtype).precision:
+                return None
+            grid = grid.astype(dtype, order='K')
+        os.utime(path)  # record the usage for LRU eviction
+        logger.debug(f'Load {self.source} (block {block}) from cache')
+        return grid
+
+    def convert(self, index, block=0, dtype=np.float64, threads=0):
+        """
+        Convert the grid block once to the raw binary `.npy` (parsed straight into the memory-mapped file, the grid is
+        never held in memory) and memory-map it, the out-of-core backend of the grids larger than memory; the
+        converted grid is kept even if it exceeds the capacity, the other grids are evicted first
+
+        Args:
+            index (VolumetricIndex): index of the source file
+            block (int): index of the grid block
+            dtype (np.dtype): float64 or float32
+            threads (int): number of parse threads, 0 means decided by the block size
+
+        Returns:
+            grid (np.memmap): memory-mapped grid (copy-on-write), shape=(NGX, NGY, NGZ)
+        """
+        self.directory.mkdir(exist_ok=True)
+        if not self.valid():
+            self._write_header(hash=content_hash(self.source), **self._stamp())
+        path = self.grid(block)
+        temp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        grid = np.lib.format.open_memmap(temp, mode='w+', dtype=dtype, shape=tuple(index.blocks[block][3:]),
+                                         fortran_order=True)
+        converted = False
+        try:
+            index.read_into(grid, block=block, threads=threads)
+            grid.flush()
+            converted = True
+        finally:
+            del grid  # release the mapping before the file is replaced or removed
+            if not converted:
+                temp.unlink(missing_ok=True)
+        os.replace(temp, path)
+        logger.debug(f'Convert {self.source} (block {block}) to {path}')
+        with GridCache._lock:
+            self.evict(self.directory, self.capacity, keep=path)
+        return np.load(path, mmap_mode='c')
+
+    def save(self, block, grid):
+        """
+        Save the grid to cache and evict the least recently used grids over the capacity, skipped (with warning) if
+        the directory is not writable
+
+        Args:
+            block (int): index of the grid block
+            grid (np.ndarray): grid data
+        """
+        if grid.nbytes > self.capacity:
+            logger.debug(f'{self.source} (block {block}) exceeds the cache capacity, skip')
+            return
+        try:
+            self.directory.mkdir(exist_ok=True)
+            if not self.valid():
+                self._write_header(hash=content_hash(self.source), **self._stamp())
+            path = self.grid(block)
+            temp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            with open(temp, 'wb') as f:
+                np.save(f, grid)
+            os.replace(temp, path)
+        except OSError as error:
+            logger.warning(f'Cache {self.source} failure: {error}')
+            return
+        with GridCache._lock:
+            self.evict(self.directory, self.capacity, keep=path)
+
+    def clear(self):
+        """remove the header and grids of this source"""
+        for path in self.directory.glob(f'{self.source.name}.*'):
+            if path == self.header or path.name[len(self.source.name) + 1:].split('.')[0].isdigit():
+                path.unlink(missing_ok=True)
+
+    def _write_header(self, **kwargs):
+        temp = self.header.with_name(f'{self.header.name}.{os.getpid()}.tmp')
+        with open(temp, 'w') as f:
+            json.dump({'source': self.source.name, **kwargs}, f, indent=2)
+        os.replace(temp, self.header)
+
+    @staticmethod
+    def entries(directory='.'):
+        """
+        List the cached grids of a directory, the most recently used first
+
+        Args:
+            directory (str | Path): directory of the source files
+
+        Returns:
+            entries (List[dict]): keys: name, size (unit: byte), used (timestamp)
+        """
+        cache_dir = Path(directory) / CacheDir
+        if not cache_dir.is_dir():
+            return []
+        entries = [{'name': path.name, 'size': path.stat().st_size, 'used': path.stat().st_mtime}
+                   for path in cache_dir.glob('*.npy')]
+        return sorted(entries, key=lambda entry: entry['used'], reverse=True)
+
+    @staticmethod
+    def evict(directory, capacity, keep=None):
+        """
+        Remove the least recently used grids until the total size is not larger than capacity (unit: byte)
+        """
+        paths = sorted(Path(directory).glob('*.npy'), key=lambda path: path.stat().st_mtime)
+        total = sum(path.stat().st_size for path in paths)
+        for path in paths:
+            if total <= capacity:
+                break
+            if path != keep:
+                total -= path.stat().st_size
+                path.unlink(missing_ok=True)
+                logger.debug(f'Evict {path} from cache')
+
+    @staticmethod
+    def scratch(shape, dtype=np.float64, directory='.'):
+        """
+        Memory-mapped grid (Fortran order) backed by an anonymous file in the cache directory, for the results of the
+        out-of-core arithmetic, the file is removed once the array is released
+
+        Args:
+            shape (Sequence[int]): (NGX, NGY, NGZ)
+            dtype (np.dtype): float64 or float32
+            directory (str | Path): directory of the source files
+
+        Returns:
+            grid (np.memmap): writable grid, initialized to zero
+        """
+        cache_dir = Path(directory) / CacheDir
+        cache_dir.mkdir(exist_ok=True)
+        with tempfile.TemporaryFile(dir=cache_dir) as f:
+            return np.memmap(f, dtype=dtype, mode='w+', shape=tuple(shape), order='F')
+
+    @staticmethod
+    def clear_all(directory='.'):
+        """remove the whole cache directory"""
+        cache_dir = Path(directory) / CacheDir
+        if cache_dir.is_dir():
+            for path in cache_dir.iterdir():
+                path.unlink()
+            cache_dir.rmdir()
+
+    @staticmethod
+    def report(directory='.'):
+        """print the cached grids of a directory"""
+        entries = GridCache.entries(directory)
+        total = sum(entry['size'] for entry in entries)
+        print(f'Cache directory: {Path(directory).resolve() / CacheDir}')
+        for entry in entries:
+            used = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['used']))
+            print(f"    {entry['name']:<40}{entry['size'] / 1024 ** 2:>10.2f} MB    {used}")
+        print(f'Total: {len(entries)} grid(s), {total / 1024 ** 2:.2f} MB')
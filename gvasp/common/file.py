@@ -1,9 +1,11 @@
 import logging
 import math
-from collections import namedtuple
+import mmap
+import os
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from functools import wraps, reduce
-from multiprocessing import Pool as ProcessPool
 from operator import add
 from pathlib import Path
 from typing import List, Union
@@ -15,14 +17,22 @@ from lxml import etree
 from pandas import DataFrame
 
 from gvasp.common.base import Atoms, Lattice
+from gvasp.common.cache import GridCache
 from gvasp.common.constant import COLUMNS_32, COLUMNS_8, ORBITALS, RED, RESET
 from gvasp.common.descriptor import ValueDescriptor
 from gvasp.common.error import StructureNotEqualError, GridNotEqualError, AnimationError, FrequencyError, \
     AttributeNotRegisteredError, ParameterError, PotDirNotExistError
+from gvasp.common.frames import FrameIndex
+from gvasp.common.isosurface import isosurface, write_mesh
 from gvasp.common.parameter import Parameter
-from gvasp.common.setting import RootDir
-from gvasp.common.structure import Structure
-from gvasp.lib import dos_cython, file_bind
+from gvasp.common.scanner import MarkerScanner, reverse_lines, tail_lines
+from gvasp.common.setting import RootDir, ConfigManager
+from gvasp.common.structure import Structure, Trajectory
+from gvasp.common.utils import redefine_frac
+from gvasp.common.volumetric import VolumetricIndex, combine, write_grid, write_grd, planar_averages, lattice_average, \
+    interplanar_distance, grid_box, grid_dtype, grid_average, linear_combination, resample_grid, \
+    integrate_atoms
+from gvasp.lib import file_bind
 
 POTENTIAL = ['PAW_LDA', 'PAW_PBE', 'PAW_PW91', 'USPP_LDA', 'USPP_PW91']
 
@@ -82,7 +92,15 @@ class CellFile(StructInfoFile):
 
 class ARCFile(MetaFile):
     @staticmethod
-    def write(name: str, structure: List[Structure], lattice: Lattice):
+    def write(name: str, structure: Union[List[Structure], Trajectory], lattice: Lattice):
+        """
+        Write the structures to arc file, the <Trajectory> is written frame by frame from its coordinate array (its own
+        lattice of each frame is used for the variable cell)
+        """
+        if isinstance(structure, Trajectory):
+            ARCFile._write_trajectory(name, structure)
+            return
+
         a, b, c = lattice.length
         alpha, beta, gamma = lattice.angle
         with open(name, 'w') as f:
@@ -103,6 +121,27 @@ class ARCFile(MetaFile):
                 f.write('end\n')
                 f.write('end\n')
 
+    @staticmethod
+    def _write_trajectory(name: str, trajectory: Trajectory):
+        template = ''.join(f'{formula + str(order + 1):5s} %14.10f %14.10f %14.10f XXXX 1       xx     '
+                           f'{formula:2s} 0.0000\n' for order, formula in enumerate(trajectory.element))
+        with open(name, 'w') as f:
+            f.write('!BIOSYM archive 3\n')
+            f.write('PBC=ON\n')
+            for frame in range(len(trajectory)):
+                lattice = trajectory.get_lattice(frame)
+                if frame == 0 or trajectory.lattices is not None:
+                    a, b, c = lattice.length
+                    alpha, beta, gamma = lattice.angle
+                    arc_matrix = Lattice.arc_lattice(lattice).matrix
+                f.write('Auto Generated CAR File\n')
+                f.write(f'!DATE {datetime.now().strftime("%a %b %d %H:%M:%S  %Y")}\n')
+                f.write(f'PBC   {a:.5f}  {b:.5f}  {c:.5f}  {alpha:.5f}  {beta:.5f}  {gamma:.5f} (P1)\n')
+                frac_coord = redefine_frac(trajectory.frac_coord[frame])
+                f.write(template % tuple((frac_coord @ arc_matrix).ravel()))
+                f.write('end\n')
+                f.write('end\n')
+
 
 class SubmitFile(MetaFile):
 
@@ -641,7 +680,7 @@ class XSDFile(MetaFile):
     @staticmethod
     def write(contcar: Union[str, Path], outcar: Union[str, Path], name='output.xsd'):
         structure = CONTCAR(contcar).structure
-        outcar = OUTCAR(outcar)
+        status = OUTCAR.status(outcar)
 
         doc = minidom.Document()
         doctype = DocumentType(qualifiedName='XSD []')
@@ -721,9 +760,9 @@ class XSDFile(MetaFile):
             AtomisticTreeRoot.appendChild(Property)
 
         atoms_num = structure.atoms.count
-        energy = outcar.last_energy
-        force = outcar.last_force if outcar.last_force is not None else 0
-        mag = outcar.last_mag if outcar.last_force is not None else 0
+        energy = status.energy
+        force = status.force if status.force is not None else 0
+        mag = status.mag if status.mag is not None else 0
         SymmetrySystem = doc.createElement('SymmetrySystem')
         SymmetrySystem.setAttribute('ID', '2')
         SymmetrySystem.setAttribute('Mapping', '3')
@@ -853,7 +892,7 @@ class XSDFile(MetaFile):
         doc.appendChild(XSD)
 
         stem = Path(name).stem
-        stem = stem + '-y' if outcar.finish else stem + '-n'
+        stem = stem + '-y' if status.finish else stem + '-n'
 
         with open(f'{stem}.xsd', 'w') as f:
             doc.writexml(f, indent='\t', addindent='\t', newl='\n', encoding='latin1')
@@ -900,116 +939,285 @@ class CONTCAR(POSCAR):
 
 
 class XDATCAR(StructInfoFile):
+    """
+    The frames are parsed into a <Trajectory> (one array of all frames) on the first access, the <Structure> of a frame
+    is only built on demand
+
+    Random access: XDATCAR[i] --> Structure, XDATCAR[i:j:k] (or index array) --> Trajectory, only the selected frames
+    are read by the byte-offset frame index (stored in `.gvasp_cache`, see <FrameIndex>)
+    """
+
     def __init__(self, name):
         super().__init__(name)
+        self._trajectory = None
+        self._index = None
+
+    def __getitem__(self, index):
+        if self._trajectory is not None:
+            return self._trajectory[index]
+        trajectory = self.index.read(index)
+        return trajectory[0] if isinstance(index, (int, np.integer)) else trajectory
+
+    def __len__(self):
+        return len(self._trajectory) if self._trajectory is not None else len(self.index)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = FrameIndex.from_file(self.name)
+        return self._index
 
-        self.lattice = Lattice.from_string(self.strings[2:5])
-        element_name = self.strings[5].split()
-        element_count = [int(item) for item in self.strings[6].split()]
-        self.element = sum([[name] * count for name, count in zip(element_name, element_count)], [])
-        self.frames = [i for i in range(len(self.strings)) if self.strings[i].find('Direct') != -1]
-        self._structure = []
+    @property
+    def trajectory(self):
+        if self._trajectory is None:
+            self._trajectory = Trajectory.from_XDATCAR(self.name)
+        return self._trajectory
+
+    @property
+    def lattice(self):
+        """lattice of the first frame, see `lattices` for the variable cell"""
+        return self._trajectory.lattice if self._trajectory is not None else self.index.lattice
+
+    @property
+    def lattices(self):
+        """lattice matrix of each frame, shape=(n_frames, 3, 3), None for the fixed cell"""
+        return self._trajectory.lattices if self._trajectory is not None else self.index.lattices
+
+    @property
+    def element(self):
+        return self._trajectory.element if self._trajectory is not None else self.index.element
 
     @property
     def structure(self):  # overwrite <structure method>
-        if len(self._structure) == 0:
-            for frame in self.frames:
-                frac_coord = np.array([[float(item) for item in line.split()] for line in
-                                       self.strings[frame + 1:frame + 1 + len(self.element)]])
-                atoms = Atoms(formula=self.element, frac_coord=frac_coord)
-                self._structure.append(Structure(atoms=atoms, lattice=self.lattice))
-        return self._structure
+        return self.trajectory
 
     def movie(self, name):
         """Transform the XDATCAR to arc file"""
-        ARCFile.write(name=name, structure=self.structure, lattice=self.lattice)
+        ARCFile.write(name=name, structure=self.trajectory, lattice=self.lattice)
 
 
 class DOSCAR(MetaFile):
+    """
+    Every block (TDOS and the projected DOS of each atom) is parsed natively from its byte range into arrays:
+        energy (np.ndarray): E - E_fermi, shape=(NDOS,)
+        tdos (np.ndarray): total DOS columns without energy, shape=(NDOS, 2 * ISPIN)
+        pdos (np.ndarray): projected DOS columns without energy, shape=(NAtom, NDOS, ncols), named by `columns`
+
+    With `load(lazy=True)`, only the TDOS is parsed, the block of an atom is parsed on its first use (`atom(index)`,
+    `dos(atoms, channels)`) and kept in a LRU cache of `cache_size` atoms, so the memory is proportional to the
+    selected atoms instead of the whole file
+
+    The spin/orbital channels (e.g., `up`, `p_down`, `dxy_up`) are summed by the column-index tables of `channels`, the
+    DataFrames `TDOS` / `LDOS` are only built on access for compatibility
+    """
     ISPIN = ValueDescriptor('ISPIN', [1, 2])
     LORBIT = ValueDescriptor('LORBIT', [0, 1, 2, 5, 10, 11, 12, 13, 14])
 
-    def __init__(self, name, ISPIN=2, LORBIT=12):
+    def __init__(self, name, ISPIN=2, LORBIT=12, cache_size=128):
         super().__init__(name=name)
         self.ISPIN = ISPIN
         self.LORBIT = LORBIT
-        self.NAtom = int(self.strings[0].split()[0])
-        self.Emax, self.Emin, self.NDOS, self.fermi = tuple(map(float, self.strings[5].split()[:4]))
+        self.cache_size = cache_size
+        with open(self.name) as f:
+            head = [f.readline() for _ in range(6)]
+        self.NAtom = int(head[0].split()[0])
+        self.Emax, self.Emin, self.NDOS, self.fermi = tuple(map(float, head[5].split()[:4]))
         self.NDOS = int(self.NDOS)
 
         if self.LORBIT not in [10, 12]:
             logger.error(f'LORBIT = {self.LORBIT} is not supported in this version!')
             exit(1)
 
-    def load(self):
-        def merge_dos(energy_list, Total_up, Total_down, atom_list, length):
-            """TODO:  need  optimize, deprecate DataFrame"""
-            atom_data = [energy_list]
-            columns, orbitals = [], []
-
-            Total_Dos = DataFrame(index=energy_list, columns=['tot_up', 'tot_down'], dtype='object')
-            Total_Dos['tot_up'] = Total_up
-            Total_Dos['tot_down'] = Total_down if self.ISPIN == 2 else [0.0] * len(Total_Dos['tot_up'])
-
-            if self.LORBIT == 10:
-                columns = COLUMNS_8[:length] if self.ISPIN == 2 else COLUMNS_8[:length * 2]
-                orbitals = []
-            elif self.LORBIT == 12:
-                columns = COLUMNS_32[:length] if self.ISPIN == 2 else COLUMNS_32[:length * 2]
-                orbitals = ORBITALS[1:int(math.sqrt(length / 2))] if self.ISPIN == 2 else ORBITALS[
-                    1:int(math.sqrt(length))]
-
-            for data in atom_list:
-                data_ispin = np.zeros(shape=(len(energy_list), len(columns)))
-
-                if self.ISPIN == 2:
-                    data_ispin = np.array(data)
-                else:
-                    data_ispin[:, ::2] += np.array(data)
+        self.energy, self.tdos = None, None
+        self._pdos = None
+        self._atoms = OrderedDict()  # LRU cache of the parsed atom blocks
+        self._blocks = None
+        self._ncols = None
+        self._channels = None
+        self._TDOS, self._LDOS = None, None
 
-                DATA = DataFrame(data_ispin, index=energy_list, columns=columns)
-                DATA['up'] = 0.0
-                DATA['down'] = 0.0
+    @property
+    def blocks(self):
+        """
+        [begin, end) byte offsets of the TDOS block and the block of each atom, every block is headed by the same
+        `Emax Emin NDOS E-fermi` line. VASP writes fixed-width lines, so the end of a block is predicted from its first
+        line and checked by the next header, only a few pages of the file are touched
+        """
+        if self._blocks is None:
+            with open(self.name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                begin = 0
+                for _ in range(6):
+                    begin = mm.find(b'\n', begin) + 1
+                header = mm[mm.rfind(b'\n', 0, begin - 1) + 1:begin]
+                self._blocks = []
+                while True:
+                    end = begin + self.NDOS * (mm.find(b'\n', begin) + 1 - begin)
+                    if not (end == len(mm) or mm[end:end + len(header)] == header):
+                        end = mm.find(header, begin)
+                        end = len(mm) if end == -1 else end
+                    self._blocks.append((begin, end))
+                    if end == len(mm):
+                        break
+                    begin = end + len(header)
+        return self._blocks
+
+    def _read_block(self, index):
+        """parse the index-th block, shape=(NDOS, 1 + ncols)"""
+        begin, end = self.blocks[index]
+        with open(self.name, 'rb') as f:
+            f.seek(begin)
+            ncols = len(f.readline().split())
+        return file_bind.read_block(str(self.name), begin, end, self.NDOS * ncols, 1, 1, 0).reshape((self.NDOS, ncols))
+
+    def load(self, lazy=False):
+        """
+        Parse the TDOS and the projected DOS of all atoms (lazy=False) into arrays
 
-                # LORBIT = 12, sum projected-orbitals, e.g., px+py+pz = p
-                for orbital in orbitals:
-                    DATA[orbital + '_up'] = 0.0
-                    DATA[orbital + '_down'] = 0.0
-                    orbital_p_up = [item for item in DATA.columns.values if
-                                    item.startswith(orbital) and item.endswith('up') and item != f'{orbital}_up'
-                                    and item != 'up']
-                    orbital_p_down = [item for item in DATA.columns.values if
-                                      item.startswith(orbital) and item.endswith(
-                                          'down') and item != f'{orbital}_down'
-                                      and item != 'down']
+        @param:
+            lazy:   if True, only parse the TDOS, the atoms are parsed on demand
 
-                    for item in orbital_p_up:
-                        DATA[f'{orbital}_up'] += DATA[item]
-                    for item in orbital_p_down:
-                        DATA[f'{orbital}_down'] += DATA[item]
-                    DATA['up'] += DATA[f'{orbital}_up']
-                    DATA['down'] += DATA[f'{orbital}_down']
+        @return:
+            self (DOSCAR): register energy, tdos, pdos
+        """
+        tdos = self._read_block(0)
+        self.energy, self.tdos = tdos[:, 0] - self.fermi, tdos[:, 1:]
+        self._pdos, self._channels, self._TDOS, self._LDOS = None, None, None, None
+        self._atoms.clear()
+        if not lazy:
+            self._load_pdos()
+        return self
 
-                # LORBIT = 10
-                if self.LORBIT == 10:
-                    for item in columns:
-                        if item.endswith('up') and not item.startswith('s'):
-                            DATA['up'] += DATA[item]
-                        elif item.endswith('down') and not item.startswith('s'):
-                            DATA['down'] += DATA[item]
+    def _load_pdos(self):
+        natoms = len(self.blocks) - 1
+        self._pdos = np.empty((natoms, self.NDOS, self.ncols))
+        for atom in range(natoms):
+            self._pdos[atom] = self._atoms[atom] if atom in self._atoms else self._read_block(atom + 1)[:, 1:]
+        self._atoms.clear()
 
-                # for both LORBIT=10/12
-                DATA['up'] += DATA['s_up']
-                DATA['down'] += DATA['s_down']
+    @property
+    def pdos(self):
+        """projected DOS of all atoms, shape=(NAtom, NDOS, ncols), parsed on access in the lazy mode"""
+        if self._pdos is None:
+            self._load_pdos()
+        return self._pdos
+
+    @property
+    def ncols(self):
+        """number of the projected DOS columns (without energy)"""
+        if self._ncols is None:
+            if self._pdos is not None:
+                self._ncols = self._pdos.shape[2]
+            elif len(self.blocks) > 1:
+                with open(self.name, 'rb') as f:
+                    f.seek(self.blocks[1][0])
+                    self._ncols = len(f.readline().split()) - 1
+            else:
+                self._ncols = 0
+        return self._ncols
+
+    def atom(self, index):
+        """
+        Projected DOS of one atom (index start from 0), shape=(NDOS, ncols), parsed on the first use and cached (LRU)
+        """
+        if self._pdos is not None:
+            return self._pdos[index]
+        if index in self._atoms:
+            self._atoms.move_to_end(index)
+            return self._atoms[index]
+        if not 0 <= index < len(self.blocks) - 1:
+            raise IndexError(f'{self.name} has {len(self.blocks) - 1} atom(s), atom {index} is out of range')
+
+        data = self._read_block(index + 1)[:, 1:]
+        self._atoms[index] = data
+        while len(self._atoms) > self.cache_size:
+            self._atoms.popitem(last=False)
+        return data
+
+    @property
+    def columns(self):
+        """names of the pdos columns"""
+        names = COLUMNS_8 if self.LORBIT == 10 else COLUMNS_32
+        return names[:self.ncols] if self.ISPIN == 2 else names[:2 * self.ncols:2]
+
+    @property
+    def orbitals(self):
+        """orbitals summed from the lm-decomposed columns (LORBIT = 12), e.g., ['p', 'd']"""
+        if self.LORBIT != 12:
+            return []
+        return ORBITALS[1:int(math.sqrt(self.ncols / self.ISPIN))]
 
-                atom_data.append(DATA)
+    @property
+    def channels(self):
+        """
+        Column-index table of the channels: {name: indices of the pdos columns}, name is a column (e.g., `px_up`), a
+        summed orbital (e.g., `p_up`, LORBIT = 12) or a whole spin (`up`/`down`), the down channels are empty for
+        ISPIN = 1
+        """
+        if self._channels is None:
+            columns = self.columns
+            channels = {name: [] for name in (COLUMNS_8 if self.LORBIT == 10 else COLUMNS_32)[:len(columns) *
+                                                                                              (3 - self.ISPIN)]}
+            channels.update({name: [index] for index, name in enumerate(columns)})
+            for spin in ('up', 'down'):
+                channels[spin] = [index for index, name in enumerate(columns) if name.endswith(f'_{spin}')]
+            for orbital in self.orbitals:
+                for spin in ('up', 'down'):
+                    channels[f'{orbital}_{spin}'] = [index for index, name in enumerate(columns) if
+                                                     name.startswith(orbital) and name.endswith(f'_{spin}')]
+            self._channels = channels
+        return self._channels
+
+    def weights(self, channels):
+        """
+        Column weights of the summed channels, the down channels are negative (plot convention), the unknown channels
+        (e.g., `f_up` without f-orbital) are zero
 
-            self.TDOS = Total_Dos  # DataFrame(NDOS, 2) / DataFrame(NDOS, 1)
-            self.LDOS = atom_data  # energy + List(NAtom, NDOS, NOrbital+8)
+        @param:
+            channels:   List[str], e.g., ['s_up', 'p_up']
 
-            return self
+        @return:
+            weights:    np.ndarray, shape=(ncols,)
+        """
+        weights = np.zeros(self.ncols)
+        for name in channels:
+            np.add.at(weights, self.channels.get(name, []), -1. if name.endswith('down') else 1.)
+        return weights
 
-        return merge_dos(*dos_cython.load(self.strings, self.NDOS, self.ISPIN, self.fermi))
+    def dos(self, atoms, channels):
+        """
+        Sum the channels of atoms, only the blocks of these atoms are parsed in the lazy mode
+
+        @param:
+            atoms:      List[int], index of atoms (start from 0)
+            channels:   List[str], e.g., ['up'], ['s_down', 'p_down']
+
+        @return:
+            dos:        np.ndarray, shape=(NDOS,)
+        """
+        if self._pdos is not None:
+            return self._pdos[list(atoms)].sum(axis=0) @ self.weights(channels)
+        total = np.zeros((self.NDOS, self.ncols))
+        for atom in atoms:
+            total += self.atom(atom)
+        return total @ self.weights(channels)
+
+    @property
+    def TDOS(self):
+        """DataFrame(NDOS, 2), columns: tot_up, tot_down (negative, 0. for ISPIN = 1), index: energy"""
+        if self._TDOS is None:
+            down = -self.tdos[:, 1] if self.ISPIN == 2 else np.zeros(self.NDOS)
+            self._TDOS = DataFrame({'tot_up': self.tdos[:, 0], 'tot_down': down}, index=self.energy)
+        return self._TDOS
+
+    @property
+    def LDOS(self):
+        """energy + List(NAtom * DataFrame(NDOS, NOrbital+8)), columns: all channels, index: energy"""
+        if self._LDOS is None:
+            names = list(self.channels)
+            weights = np.array([self.weights([name]) for name in names]).T
+            self._LDOS = [list(self.energy)] + [DataFrame(self.pdos[atom] @ weights, index=self.energy, columns=names)
+                                                 for atom in range(len(self.pdos))]
+        return self._LDOS
 
 
 class KPATHIN(MetaFile):
@@ -1071,9 +1279,21 @@ class KPATHIN(MetaFile):
 
 
 class EIGENVAL(MetaFile):
+    """
+    The k-points and band energies are read in bulk (native parser over the byte range after the head):
+        KPoint_coord (np.ndarray): fractional coordinates, shape=(NKPoint, 3)
+        KPoint_dist (np.ndarray): cumulative k-distance, shape=(NKPoint,)
+        KPoint_label (List[str]): high-symmetry label of each k-point, '' for the others
+        energy (np.ndarray): band energies, shape=(NKPoint, NBand, ISPIN)
+    """
+
     def __init__(self, name):
         super().__init__(name=name)
-        self.NKPoint, self.NBand = tuple(map(int, self.strings[5].split()[1:]))
+        with open(self.name) as f:
+            head = [f.readline() for _ in range(9)]
+        self.ISPIN = int(head[0].split()[3])
+        self.NKPoint, self.NBand = tuple(map(int, head[5].split()[1:]))
+        self._ncols = len(head[8].split())  # index, energy (and occupation) of each spin
         self.KPoint_coord = None
         self.KPoint_dist = None
         self.KPoint_label = None
@@ -1082,97 +1302,401 @@ class EIGENVAL(MetaFile):
         self._parse()
 
     def _parse(self):
-        from gvasp.common.utils import get_HIGH_SYM
-
         """
         load Eigenval obtain the band-energy
 
         @return:
-            self.energy:    shape=(NKPoint, NBand, 2)
+            self.energy:    shape=(NKPoint, NBand, ISPIN)
         """
-        self.KPoint_coord = []
-        self.energy = []
-        energy_flag = False
-        sBand = []
-        for index, line in enumerate(self.strings):
-            if index % (self.NBand + 2) == 7:
-                self.KPoint_coord.append(tuple(map(float, line.split()[0:3])))
-                energy_flag = True
-                continue
-            elif energy_flag:
-                sBand.append(list(map(float, line.split()[1:3])))
-                if len(sBand) == self.NBand:
-                    energy_flag = False
-                    self.energy.append(sBand)
-                    sBand = []
-
-        self.KPoint_coord = np.array(self.KPoint_coord)
-
-        self.KPoint_dist = []
-        self.KPoint_label = []
-        for index, k_point in enumerate(self.KPoint_coord):
-            if index == 0:
-                self.KPoint_dist.append(0.)
-            else:
-                k_before = self.KPoint_coord[index - 1]
-                dist = np.sum((k_point - k_before) ** 2) ** 0.5
-                self.KPoint_dist.append(self.KPoint_dist[-1] + dist)
-
-            for label, value in get_HIGH_SYM().items():
-                if np.sum((np.array(value) - k_point) ** 2) ** 0.5 <= 1E-03 and (
-                        not len(self.KPoint_label) or self.KPoint_label[-1] != label):
-                    self.KPoint_label.append(label)
-                    break
-            else:
-                self.KPoint_label.append('')
+        with open(self.name, 'rb') as f:
+            for _ in range(6):
+                f.readline()
+            begin, end = f.tell(), f.seek(0, 2)
+        width = 4 + self.NBand * self._ncols  # k-point line (coordinate, weight) and its bands
+        try:
+            values = file_bind.read_block(str(self.name), begin, end, self.NKPoint * width, 1, 1, 0)
+        except RuntimeError:
+            raise ValueError(f'{self.name} is incomplete, {self.NKPoint} k-points x {self.NBand} bands are expected')
+        values = values.reshape((self.NKPoint, width))
+
+        self.KPoint_coord = values[:, :3].copy()
+        self.energy = values[:, 4:].reshape((self.NKPoint, self.NBand, self._ncols))[:, :, 1:1 + self.ISPIN].copy()
+        steps = np.linalg.norm(np.diff(self.KPoint_coord, axis=0), axis=1)
+        self.KPoint_dist = np.concatenate(([0.], np.cumsum(steps)))
+
+        kpath_in = KPATHIN('KPATH.in') if Path('KPATH.in').exists() else None
+        self.KPoint_label = self._label(kpath_in.high_sym if kpath_in is not None else None)
 
         # Modify kcoord according to KPATH.in
-        if Path('KPATH.in').exists():
-            kpath_in = KPATHIN('KPATH.in')
+        if kpath_in is not None:
+            labels = np.array(self.KPoint_label, dtype=object)
             for item in kpath_in.kpath:
                 if '|' not in item:
                     continue
 
-                # Split path item
+                # Split path item, merge the adjacent k-points of the discontinuous path
                 first, second = item.split('|', 1)
-                for index, label in enumerate(self.KPoint_label):
-                    if label == first:
-                        first_index = index
-                        if self.KPoint_label[index + 1] == second:
-                            second_index = first_index + 1
+                for first_index in np.flatnonzero((labels[:-1] == first) & (labels[1:] == second)):
+                    second_index = first_index + 1
+                    self.KPoint_dist[second_index:] -= self.KPoint_dist[second_index] - self.KPoint_dist[first_index]
+                    labels[first_index] = labels[second_index] = item
+            self.KPoint_label = list(labels)
 
-                            # Calculate and apply coordinate adjustment
-                            first_kcoord = self.KPoint_dist[first_index]
-                            second_kcoord = self.KPoint_dist[second_index]
-                            diff_kcoord = second_kcoord - first_kcoord
+        return self
 
-                            # Adjust subsequent coordinates
-                            self.KPoint_dist[second_index:] -= diff_kcoord
+    def _label(self, high_sym=None, tolerance=1E-03):
+        """
+        Match the k-points with the high-symmetry table by one distance matrix, the first matched label (table order)
+        is used, the repeated label of the adjacent k-point is skipped
 
-                            # Update labels
-                            self.KPoint_label[first_index] = item
-                            self.KPoint_label[second_index] = item
+        Args:
+            high_sym (dict): label -> fractional coordinate, default: get_HIGH_SYM()
+            tolerance (float): distance tolerance
+
+        Returns:
+            labels (List[str]): label of each k-point
+        """
+        from gvasp.common.utils import get_HIGH_SYM
 
-        self.energy = np.array(self.energy)
+        high_sym = get_HIGH_SYM() if high_sym is None else high_sym
+        names = list(high_sym)
+        table = np.array([high_sym[name] for name in names], dtype=float).reshape((-1, 3))
+        matched = np.linalg.norm(self.KPoint_coord[:, np.newaxis, :] - table[np.newaxis, :, :], axis=2) <= tolerance
 
-        return self
+        labels = [''] * self.NKPoint
+        for index in np.flatnonzero(matched.any(axis=1)):
+            previous = labels[index - 1] if index else ''
+            labels[index] = next((names[item] for item in np.flatnonzero(matched[index]) if names[item] != previous),
+                                 '')
+        return labels
 
-    def write(self, directory='band_data'):
+    def write(self, directory='band_data', name='band.dat'):
         """
-        Write band-data to file, each band corresponding to one file and named as band_{index}
+        Write band-data to one file, the first column is the k-distance, followed by the energies of each band
+        (band_1, or band_1_up band_1_down for ISPIN = 2, ...)
 
         @params:
-            dir:    save directory, default: $CWD/band_data
+            directory:      save directory, default: $CWD/band_data
+            name:           file name, default: band.dat
         """
         Path(directory).mkdir(exist_ok=True)
-        for index in range(self.NBand):
-            np.savetxt(f'{directory}/band_{index + 1}', self.energy[:, index])
-        logger.info(f'Band data has been saved to {directory} directory')
+        spins = [''] if self.ISPIN == 1 else ['_up', '_down']
+        header = ' '.join(['kdist'] + [f'band_{index + 1}{spin}' for index in range(self.NBand) for spin in spins])
+        data = np.column_stack((self.KPoint_dist, self.energy.reshape((self.NKPoint, -1))))
+        np.savetxt(f'{directory}/{name}', data, fmt='%.6f', header=header)
+        logger.info(f'Band data has been saved to {directory}/{name}')
 
 
-class CHGBase(StructInfoFile):
+class GridFile(StructInfoFile):
     """
-    Subclass of StructInfoFile, inherit <structure property>
+    Subclass of StructInfoFile, base of the volumetric files (CHGBase, CHGCAR, LOCPOT), the header and grid blocks are
+    read through the <index property> without touching the rest of file
+    """
+
+    def __new__(cls, *args, **kwargs):
+        if cls is GridFile:
+            raise TypeError(f'<{cls.__name__} class> may not be instantiated')
+        return super().__new__(cls)
+
+    @staticmethod
+    def from_file(name):
+        """
+        Instantiate the grid file class keyed on the file name, e.g., LOCPOT -> <LOCPOT class>, CHGCAR_diff_AB ->
+        <CHGCAR_diff class>, the other names (CHGCAR, PARCHG, ...) are the generic charge density <CHGGrid class>
+
+        Args:
+            name (str | Path): name of the grid file
+
+        Returns:
+            grid_file (GridFile): instance of the matched class
+        """
+        classes = (AECCAR0, AECCAR2, CHGCAR_sum, CHGCAR_tot, CHGCAR_mag, CHGCAR_diff, LOCPOT)
+        for cls in sorted(classes, key=lambda item: len(item.__name__), reverse=True):
+            if Path(name).name.startswith(cls.__name__):
+                return cls(name)
+        return CHGGrid(name)
+
+    @property
+    def index(self) -> VolumetricIndex:
+        return VolumetricIndex.from_file(self.name)
+
+    @property
+    def structure(self):  # overwrite <structure method>, only parse the head of file
+        return self.index.structure
+
+    def read_grid(self, block=0, cache=None, threads=0, dtype=None):
+        """
+        Read one grid block, through the sidecar cache if enabled
+
+        Args:
+            block (int): index of the grid block, 0: total (or potential), 1: magnetization (ISPIN = 2)
+            cache (bool): whether or not use the sidecar cache, default: `cache` of config.json
+            threads (int): number of parse threads, 0 means decided by the block size
+            dtype (np.dtype): float64 or float32, default: `precision` of config.json
+
+        Returns:
+            grid (np.array[:, :, :]): shape=(NGX, NGY, NGZ)
+        """
+        return self.read_grids(blocks=(block,), cache=cache, threads=threads, dtype=dtype)[0]
+
+    def read_grids(self, blocks=(0,), cache=None, threads=0, dtype=None):
+        """
+        Read several grid blocks, the uncached blocks are parsed concurrently in one pass of the file
+
+        Args:
+            blocks (Sequence[int]): indices of the grid blocks
+            cache (bool): whether or not use the sidecar cache, default: `cache` of config.json
+            threads (int): number of parse threads, 0 means decided by the blocks size
+            dtype (np.dtype): float64 or float32, default: `precision` of config.json
+
+        Returns:
+            grids (List[np.array[:, :, :]]): shape=(NGX, NGY, NGZ) of each block
+        """
+        dtype = grid_dtype(ConfigManager().precision if dtype is None else dtype)
+        grid_cache = GridCache(self.name) if (ConfigManager().cache if cache is None else cache) else None
+        grids = {block: grid_cache.load(block, dtype=dtype) for block in blocks} if grid_cache is not None else {}
+        missing = [block for block in blocks if grids.get(block) is None]
+        if missing:
+            for block, grid in zip(missing, self.index.read_blocks(blocks=missing, threads=threads, dtype=dtype)):
+                grids[block] = grid
+                if grid_cache is not None:
+                    grid_cache.save(block, grid)
+        return [grids[block] for block in blocks]
+
+    def read_box(self, block=0, box=None, stride=1, cache=None, threads=0, dtype=None):
+        """
+        Read the strided box (region of interest) of one grid block, sliced from the cached grid if available,
+        otherwise the native reader skips the values outside the box
+
+        Args:
+            block (int): index of the grid block, 0: total (or potential), 1: magnetization (ISPIN = 2)
+            box (Sequence[Tuple[int, int] | slice | None]): index range [start, stop) along x, y, z, None: whole axis,
+                                                            e.g., (None, None, (40, 80)) for a z-range
+            stride (int | Sequence[int]): take every stride-th point along x, y, z
+            cache (bool): whether or not use the sidecar cache, default: `cache` of config.json
+            threads (int): number of parse threads, 0 means decided by the box size
+            dtype (np.dtype): float64 or float32, default: `precision` of config.json
+
+        Returns:
+            grid (np.array[:, :, :]): subgrid, shape=(nx, ny, nz)
+            offset (Tuple[int]): index of grid[0, 0, 0] in the block
+        """
+        index = self.index
+        dtype = grid_dtype(ConfigManager().precision if dtype is None else dtype)
+        grid = GridCache(self.name).load(block) if (ConfigManager().cache if cache is None else cache) else None
+        if grid is None or grid.dtype != dtype and grid.dtype == np.float32:  # float32 is not upcasted
+            return index.read_box(block=block, box=box, stride=stride, threads=threads, dtype=dtype)
+        lo, hi, step = grid_box(grid.shape, box, stride)
+        return np.array(grid[tuple(slice(*item) for item in zip(lo, hi, step))], dtype=dtype, order='F'), tuple(lo)
+
+    def map_grid(self, block=0, threads=0, dtype=None):
+        """
+        Memory-map one grid block (out-of-core backend), the block is converted once to the raw binary
+        `.gvasp_cache/<name>.<block>.npy` and mapped by the later loads until the source is changed
+
+        Args:
+            block (int): index of the grid block, 0: total (or potential), 1: magnetization (ISPIN = 2)
+            threads (int): number of parse threads, 0 means decided by the block size
+            dtype (np.dtype): float64 or float32, default: `precision` of config.json
+
+        Returns:
+            grid (np.memmap): shape=(NGX, NGY, NGZ), copy-on-write
+        """
+        dtype = grid_dtype(ConfigManager().precision if dtype is None else dtype)
+        grid_cache = GridCache(self.name)
+        grid = grid_cache.load(block)
+        if grid is None or grid.dtype != dtype:
+            grid = grid_cache.convert(self.index, block=block, dtype=dtype, threads=threads)
+        return grid
+
+    def _read(self, blocks, cache, threads, box, stride, dtype=None, backend='memory'):
+        """read the blocks (the whole blocks or their boxes), record the offset and stride of the loaded grids"""
+        if backend not in ('memory', 'memmap'):
+            raise ValueError(f"backend should be 'memory' or 'memmap', got {backend!r}")
+        NGrid = self.index.NGrid
+        lo, hi, step = grid_box(NGrid, box, stride)
+        self.offset, self.stride = tuple(lo), tuple(step)
+        self._subgrid = (lo, hi, step) != ([0, 0, 0], list(NGrid), [1, 1, 1])
+        if not self._subgrid and backend == 'memmap':
+            return [self.map_grid(block=block, threads=threads, dtype=dtype) for block in blocks]
+        if not self._subgrid:
+            return self.read_grids(blocks=blocks, cache=cache, threads=threads, dtype=dtype)
+        return [self.read_box(block=block, box=box, stride=stride, cache=cache, threads=threads, dtype=dtype)[0]
+                for block in blocks]
+
+    def _loaded(self, block):
+        """the grid of block already in memory, None if not loaded"""
+        return None
+
+    def _whole(self, grid):
+        """the loaded grid if it is the whole block, None for a box or strided grid"""
+        return None if getattr(self, '_subgrid', False) else grid
+
+    def _planar_averages(self, block):
+        """planar averages along x, y, z of the grid block, accumulated while parsing (the grid is not kept)"""
+        return planar_averages(self.name, block=block)
+
+    def period(self, direction='z'):
+        """
+        Length of the periodic cell along direction
+
+        Args:
+            direction (str | Sequence[int]): x, y, z or the Miller indices (hkl) of the lattice planes
+
+        Returns:
+            period (float): lattice length along x, y, z or the interplanar distance d_hkl (unit: Å)
+        """
+        mapping = {'x': 0, 'y': 1, 'z': 2}
+        if isinstance(direction, str):
+            if mapping.get(direction, None) is None:
+                raise KeyError(f'{direction} is not supported, should be [x, y, z] or (h, k, l)')
+            return self.structure.lattice.length[mapping[direction]]
+        return interplanar_distance(self.structure.lattice, direction)
+
+    def planar_average(self, direction='z', block=0, bins=None):
+        """
+        Planar average of one grid block along x, y, z (the loaded grid if available, slab by slab for a memory-mapped
+        one, otherwise accumulated by the native reader while parsing, the grid is not kept) or normal to the lattice
+        planes (hkl)
+
+        Args:
+            direction (str | Sequence[int]): x, y, z or the Miller indices (hkl) of the lattice planes, e.g., (1, 1, 0)
+            block (int): index of the grid block, 0: total (or potential), 1: magnetization (ISPIN = 2)
+            bins (int): number of points along (hkl), default: number of distinct planes through the grid points
+
+        Returns:
+            position (np.array[:]): position along the direction (unit: Å)
+            average (np.array[:]): planar average
+        """
+        mapping = {'x': 0, 'y': 1, 'z': 2}
+        length = self.period(direction)
+        grid = self._loaded(block)
+        if not isinstance(direction, str):
+            grid = self.read_grid(block=block) if grid is None else grid
+            return lattice_average(grid, self.structure.lattice, direction, bins=bins)
+
+        axis = mapping[direction]
+        if grid is None:
+            average = self._planar_averages(block)[axis]
+        else:
+            average = grid_average(grid, axis)
+        return np.linspace(start=0, stop=length, num=len(average)), average
+
+    def integrate(self, blocks=None, radii=None):
+        """
+        Integrate the grid blocks (the loaded ones if available) over the region of each atom, i.e., its periodic
+        Voronoi cell or the part within its radius, e.g., the charge and magnetic moment of each atom from CHGCAR
+
+        Args:
+            blocks (Sequence[int]): indices of the grid blocks, default: all blocks
+            radii (float | dict | Sequence[float]): cutoff radius (unit: Å) of all atoms, of each element (e.g.,
+                                                    {'Ce': 1.5, 'O': 0.8}, the others are not cut) or of each atom,
+                                                    default: None (Voronoi cell)
+
+        Returns:
+            integrals (np.array[:, :]): integral of each block over each atom, shape=(n_blocks, n_atoms)
+            volumes (np.array[:]): volume of the region of each atom (unit: Å^3)
+        """
+        index = self.index
+        blocks = list(range(len(index)) if blocks is None else blocks)
+        grids = {block: self._loaded(block) for block in blocks}
+        missing = [block for block in blocks if grids[block] is None]
+        if missing:
+            grids.update(zip(missing, self.read_grids(blocks=missing)))
+
+        structure = self.structure
+        if isinstance(radii, dict):
+            radii = [radii.get(formula, np.inf) for formula in structure.atoms.formula]
+        return integrate_atoms([grids[block] for block in blocks], structure.lattice, structure.atoms.frac_coord,
+                               radii=radii)
+
+    def isosurface(self, isovalues, block=0, name=None, format='ply', scale=1.):
+        """
+        Export the isosurfaces of one grid block (the loaded one if available, e.g., CHGCAR_diff) as the triangle
+        meshes, the cubes across the periodic boundaries are wrapped in and all isovalues are extracted in one pass
+
+        Args:
+            isovalues (float | Sequence[float]): isovalues, a negative isovalue encloses the region below it (e.g., the
+                                                 depletion of CHGCAR_diff or the minority spin of CHGCAR_mag)
+            block (int): index of the grid block, 0: total (or potential), 1: magnetization (ISPIN = 2)
+            name (str): prefix of the mesh files, default: name of the file
+            format (str): 'ply' (binary) or 'obj'
+            scale (float): factor from isovalues to the unit of grid, e.g., the lattice volume for the isovalues of
+                           density (unit: e/Å^3) of CHGCAR (rho * V), default: 1 (isovalues in the unit of grid)
+
+        Returns:
+            names (List[str]): name of the mesh file of each isovalue, `<name>_<isovalue>.<format>`
+        """
+        grid = self._loaded(block)
+        grid = self.read_grid(block=block) if grid is None else grid
+        isovalues = np.atleast_1d(np.asarray(isovalues, dtype=float))
+        meshes = isosurface(grid, self.structure.lattice, isovalues * scale)
+        prefix = Path(self.name).name if name is None else name
+        names = []
+        for isovalue, (vertices, faces) in zip(isovalues, meshes):
+            names.append(f'{prefix}_{isovalue:g}.{format}')
+            write_mesh(names[-1], vertices, faces, comment=f'isosurface of {Path(self.name).name} (block {block}) at '
+                                                           f'{isovalue:g}')
+        return names
+
+    def to_grd(self, name='vasp.grd', DenCut=-1, block=0, box=None, stride=1, compress=None):
+        """
+        transform one grid block (the loaded one if available, e.g., CHGCAR_sum) to grd file
+
+        param:
+            name:       specify the name of grd file
+            DenCut:     |density| lower than DenCut - 100 will be set to zero (default: -1: disable the DenCut option)
+            block:      index of the grid block, 0: total (or potential), 1: magnetization (ISPIN = 2)
+            box:        index range [start, stop) along x, y, z (None: whole axis), only the box is exported
+            stride:     take every stride-th point along x, y, z, e.g., 2 for a quick look of a large cell
+            compress:   None, 'gzip' or 'xz', the suffix (.gz, .xz) is appended to name
+
+        return:
+            name:       name of the written grd file
+        """
+        if box is None and stride == 1:
+            grid = self._loaded(block)
+            grid = self.read_grid(block=block) if grid is None else grid
+            return write_grd(name, grid, self.structure.lattice, DenCut=DenCut, compress=compress)
+
+        NGrid = self.index.NGrid
+        lo, hi, step = grid_box(NGrid, box, stride)
+        lo = [start - start % every for start, every in zip(lo, step)]  # align the box to the strided cell grid
+        grid, offset = self.read_box(block=block, box=list(zip(lo, hi)), stride=step)
+        return write_grd(name, grid, self.structure.lattice, DenCut=DenCut,
+                         NGrid=[len(range(0, NG, every)) for NG, every in zip(NGrid, step)],
+                         origin=[start // every for start, every in zip(offset, step)], compress=compress)
+
+
+def load_grids(files, cache=None, workers=None, dtype=None):
+    """
+    Load several grid files concurrently (e.g., AECCAR0 + AECCAR2, or the three grids of a charge difference), the
+    native parsers release the GIL in threads and write directly into the arrays owned by this process, so no grid is
+    pickled or copied between processes
+
+    Args:
+        files (Sequence[GridFile]): grid files (e.g., CHGBase, CHGCAR, LOCPOT instances), loaded in place
+        cache (bool): whether or not use the sidecar cache, default: `cache` of config.json
+        workers (int): number of files loaded at the same time, default: all files
+        dtype (np.dtype): float64 or float32, default: `precision` of config.json
+
+    Returns:
+        files (List[GridFile]): the loaded files
+    """
+    files = list(files)
+    if not len(files):
+        return files
+    workers = min(len(files), workers or len(files))
+    threads = max(1, (os.cpu_count() or 1) // workers)  # parse threads of each file
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(item.load, cache=cache, threads=threads, dtype=dtype) for item in files]:
+            future.result()
+    return files
+
+
+class CHGBase(GridFile):
+    """
+    Subclass of GridFile, inherit <structure property>
     """
 
     def __new__(cls, *args, **kwargs):
@@ -1184,68 +1708,131 @@ class CHGBase(StructInfoFile):
         super().__init__(name=name)
         self.NGX, self.NGY, self.NGZ = None, None, None
         self.density = None
+        self.offset, self.stride = (0, 0, 0), (1, 1, 1)
+        self._structure = None
+
+    @property
+    def structure(self):
+        if self._structure is None:
+            self._structure = super().structure
+        return self._structure
+
+    @structure.setter
+    def structure(self, _structure):
+        self._structure = _structure
+
+    @classmethod
+    def from_array(cls, name: str, structure, NGrid: tuple[int, int, int], density):
+        instance = cls(name=name)
+        instance.structure = structure
+        instance.NGX, instance.NGY, instance.NGZ = NGrid
+        instance.density = density
+        return instance
 
     def __add__(self, other):
         if self.__class__.__name__.startswith('AECCAR') and other.__class__.__name__.startswith('AECCAR'):
-            if self.density is None and other.density is None:
-                pool = ProcessPool(processes=2)
-                results = [pool.apply_async(self.load), pool.apply_async(other.load)]  # new instance
-                self, other = (item.get() for item in results)
-                pool.close()
-                pool.join()
-            elif self.density is None:
-                self.load()
-            elif other.density is None:
-                other.load()
-            if self.structure != other.structure:
-                raise StructureNotEqualError(f'{self.name}.structure is not equal to {other.name}.structure')
-            if (self.NGX, self.NGY, self.NGZ) != (other.NGX, other.NGY, other.NGZ):
-                raise GridNotEqualError(f'{self.name}.NGrid is not equal to {other.name}.NGrid')
-            density_sum = self.density + other.density
+            density_sum = self._combine(other, (1., 1.))
             return CHGCAR_sum.from_array('CHGCAR_sum', self.structure, (self.NGX, self.NGY, self.NGZ), density_sum)
         else:
             raise TypeError(
                 f'unsupported operand type(s) for +: {self.__class__.__name__} and {other.__class__.__name__}')
 
-    def load(self):
+    def __sub__(self, other):
+        if isinstance(other, CHGBase):
+            density_diff = self._combine(other, (1., -1.))
+            return CHGCAR_diff.from_array('CHGCAR_diff', self.structure, (self.NGX, self.NGY, self.NGZ), density_diff)
+        else:
+            raise TypeError(
+                f'unsupported operand type(s) for -: {self.__class__.__name__} and {other.__class__.__name__}')
+
+    def _combine(self, other, coefficients):
+        """
+        linear combination of the two grids slab by slab, the result is memory-mapped in the cache directory if any
+        grid is memory-mapped (load(backend='memmap')), so the memory is bounded for the grids larger than RAM; the
+        grid of other is resampled onto the NGrid of self by Fourier interpolation if they are different
+        """
+        load_grids([item for item in (self, other) if item.density is None])
+        if self.structure != other.structure:
+            raise StructureNotEqualError(f'{self.name}.structure is not equal to {other.name}.structure')
+        grids = (self.density, other.density)
+        if (self.NGX, self.NGY, self.NGZ) != (other.NGX, other.NGY, other.NGZ):
+            if self._whole(self.density) is None or other._whole(other.density) is None:
+                raise GridNotEqualError(f'{self.name}.NGrid is not equal to {other.name}.NGrid (box or stride loaded)')
+            logger.warning(f'{other.name}.NGrid {other.density.shape} is resampled to {self.name}.NGrid '
+                           f'{self.density.shape} by Fourier interpolation')
+            grids = (self.density, resample_grid(other.density, self.density.shape))
+        out = None
+        if any(isinstance(grid, np.memmap) for grid in grids):
+            out = GridCache.scratch(self.density.shape, np.result_type(*grids), directory=Path(self.name).parent)
+        return linear_combination(grids, coefficients, out=out)
+
+    @staticmethod
+    def combine(files, coefficients, output='CHGCAR_diff', title=None, blocks=None, average=False, resample=False):
+        """
+        Linear combination sum(coefficients[k] * grid[k]) of any number of grid files (e.g., AB - A - B), the headers
+        are checked once and the grids are streamed to output block by block, one sequential read of each input and
+        constant memory
+
+        @param:
+            files:          grid files (names or GridFile instances), e.g., ('CHGCAR_AB', 'CHGCAR_A', 'CHGCAR_B')
+            coefficients:   coefficient of each file, e.g., (1, -1, -1)
+            output:         output file name, default: CHGCAR_diff
+            title:          title of the output, default: AutoGenerated
+            blocks:         grid block of each file, default: the first block (total density)
+            average:        whether or not accumulate the planar averages in the same pass
+            resample:       whether or not resample the grids of different NGrid (e.g., fragments of another ENCUT)
+                            onto the NGrid of the first file by Fourier interpolation (combined in memory)
+
+        @return:
+            result:         <CHGCAR_diff class> instance of output (not loaded), the planar averages along x, y, z are
+                            recorded in result.averages if average
+        """
+        names = [getattr(item, 'name', item) for item in files]
+        averages = combine(names, coefficients, output, title=title, blocks=blocks, average=average, resample=resample)
+        result = CHGCAR_diff(output)
+        result.averages = averages
+        return result
+
+    def load(self, cache=None, threads=0, box=None, stride=1, dtype=None, backend='memory'):
         """
         load Electronic-Density
 
+        @param:
+            cache:      whether or not use the sidecar cache, default: `cache` of config.json
+            threads:    number of parse threads, 0 means decided by the grid size
+            box:        index range [start, stop) along x, y, z (None: whole axis), e.g., (None, None, (40, 80))
+            stride:     take every stride-th point along x, y, z
+            dtype:      float64 or float32 (half memory), default: `precision` of config.json
+            backend:    'memory' or 'memmap' (out-of-core: converted once to .gvasp_cache/<name>.0.npy and mapped, for
+                        the grids larger than RAM; +, -, planar averages and write are then evaluated chunk-wise)
+
         @return:
-            self.density:    shape=(NGX, NGY, NGZ)
+            self.density:    shape=(NGX, NGY, NGZ), the subgrid if box or stride, np.memmap if backend='memmap'
+            self.offset:     index of density[0, 0, 0] in the whole grid
+            self.stride:     stride along x, y, z
         """
-        info = file_bind.load(self.name)
-        self.NGX, self.NGY, self.NGZ = info.NGX, info.NGY, info.NGZ
-        self.density = info.density
-        assert self.density.size == self.NGX * self.NGY * self.NGZ, 'Load density failure, size is not consistent'
-        self.density = self.density.reshape((self.NGX, self.NGY, self.NGZ), order='F')
+        self.density, = self._read((0,), cache=cache, threads=threads, box=box, stride=stride, dtype=dtype,
+                                   backend=backend)
+        self.NGX, self.NGY, self.NGZ = self.density.shape
         return self
 
-    def write(self, title=None, factor=1.0):
+    def _loaded(self, block):
+        return self._whole({0: self.density}.get(block))
+
+    def write(self, title=None, factor=1.0, compress=None):
         """
-        write CHGCAR_* file from array
+        write CHGCAR_* file from array (float64 or float32)
 
         @param:
             system:     specify the structure system
             factor:     coordination factor
-        """
-        self.structure.write_POSCAR(name=self.__class__.__name__, title=title, factor=factor)
-        density_fortran = self.density.reshape(-1, order='F')
-
-        # solve residue problem
-        residue = density_fortran.size % 5
-        if residue:
-            density_fortran1 = density_fortran[:-residue].reshape(-1, 5)
-            density_fortran2 = density_fortran[-residue:].reshape(1, -1)
-        else:
-            density_fortran1 = density_fortran.reshape(-1, 5)
-            density_fortran2 = None
+            compress:   None, 'gzip' or 'xz', the output is compressed while streamed, e.g., CHGCAR_sum.gz
 
-        with open(self.__class__.__name__, 'a+') as f:
-            f.write(f'{self.NGX:>5}{self.NGY:>5}{self.NGZ:>5}\n')
-            np.savetxt(f, density_fortran1, fmt='%18.11E')
-            if density_fortran2 is not None:
-                np.savetxt(f, density_fortran2, fmt='%18.11E')
+        @return:
+            name:       name of the written file
+        """
+        head = self.structure.to_string(title=title, factor=factor)
+        return write_grid(self.__class__.__name__, self.density, head=head, compress=compress)
 
 
 class AECCAR0(CHGBase):
@@ -1257,27 +1844,7 @@ class AECCAR2(CHGBase):
 
 
 class CHGCAR_sum(CHGBase):
-    def __init__(self, name):
-        super().__init__(name=name)
-        self._structure = None
-
-    @property
-    def structure(self):
-        if self._structure is None:
-            self._structure = super().structure()
-        return self._structure
-
-    @structure.setter
-    def structure(self, _structure):
-        self._structure = _structure
-
-    @staticmethod
-    def from_array(name: str, structure, NGrid: tuple[int, int, int], density):
-        instance = CHGCAR_sum(name=name)
-        instance.structure = structure
-        instance.NGX, instance.NGY, instance.NGZ = NGrid
-        instance.density = density
-        return instance
+    pass
 
 
 class CHGCAR_tot(CHGBase):
@@ -1285,105 +1852,85 @@ class CHGCAR_tot(CHGBase):
 
 
 class CHGCAR_mag(CHGBase):
-    @staticmethod
-    def to_grd(name='vasp.grd', DenCut=-1):
-        """
-        transform CHGCAR_mag to grd file
+    pass
 
-        param:
-            name:       specify the name of grd file
-            DenCut:     density lower than DenCut will be set to zero (default: -1: disable the DenCut option)
-        """
-        file_bind.to_grd(name, DenCut)
+
+class CHGGrid(CHGBase):
+    """
+    Generic charge density (CHGCAR, PARCHG, ...) of any number of blocks, block 0 is loaded as density
+    """
 
 
 class CHGCAR_diff(CHGBase):
+    def __init__(self, name):
+        super().__init__(name=name)
+        self.averages = None  # planar averages along x, y, z recorded by CHGBase.combine
+
+    def _planar_averages(self, block):
+        if block == 0 and self.averages is not None:
+            return self.averages
+        return super()._planar_averages(block)
 
     def line_potential(self, direction='z'):
         """
-        Calculate Charge Density Difference along one direction, default: z-axis
+        Calculate Charge Density Difference along one direction, default: z-axis, the grid is not loaded (streamed
+        planar average) unless direction is the lattice planes (hkl)
 
         Args:
-            direction (str): which axis you want to Average the CCD
+            direction (str | Sequence[int]): which axis (x, y, z) or normal of the lattice planes (hkl) you want to
+                                             Average the CCD
 
         Returns:
             line_potential (np.array[:]): CCD along one axis
 
         """
-        mapping = {'x': 0, 'y': 1, 'z': 2}
-
-        if getattr(self, 'density', None) is None:
-            self.load()
-        NGXYZ = (self.NGX, self.NGY, self.NGZ)
-
-        if mapping.get(direction, None) is None:
-            raise KeyError(f'{direction} is not supported, should be [x, y, z]')
+        position, average = self.planar_average(direction=direction)
+        return position, average / self.period(direction)
 
-        # TODO: python: malloc.c:2617: sysmalloc: Assertion failed for linux system (win success).
-        #               `(old_top == initial_top (av) && old_size == 0) || ((unsigned long) (old_size) >= MINSIZE &&
-        #               prev_inuse (old_top) && ((unsigned long) old_end & (pagesize - 1)) == 0)'
-        #  Guess the `file_bind.so` file error
-        potential_swap = np.swapaxes(self.density / self.structure.lattice.length[mapping[direction]], -1,
-                                     mapping[direction])
-        return np.linspace(start=0, stop=self.structure.lattice.length[mapping[direction]],
-                           num=NGXYZ[mapping[direction]]), np.mean(potential_swap, axis=(0, 1))
 
-
-class CHGCAR(StructInfoFile):
+class CHGCAR(GridFile):
     def __init__(self, name):
         super().__init__(name=name)
         self.NGX, self.NGY, self.NGZ, self.NGrid = None, None, None, None
         self.density_tot, self.density_mag = None, None
+        self.offset, self.stride = (0, 0, 0), (1, 1, 1)
 
         self._head = None
-        self._density_tot_strings, self._density_mag_strings = None, None
 
-    def load(self):
+    def load(self, cache=None, threads=0, box=None, stride=1, dtype=None):
         """
         load Electronic-Density
 
+        @param:
+            cache:      whether or not use the sidecar cache, default: `cache` of config.json
+            threads:    number of parse threads, 0 means decided by the grid size
+            box:        index range [start, stop) along x, y, z (None: whole axis), e.g., (None, None, (40, 80))
+            stride:     take every stride-th point along x, y, z
+            dtype:      float64 or float32 (half memory), default: `precision` of config.json
+
         @return:
             self.NGrid:                 NGX * NGY * NGZ
-            self.density:               shape=(NGX, NGY, NGZ)
-            self._density_strings:      density with strings format
+            self.density_tot:           shape=(NGX, NGY, NGZ), the subgrid if box or stride
+            self.density_mag:           shape=(NGX, NGY, NGZ), the subgrid if box or stride
+            self.offset:                index of density_tot[0, 0, 0] in the whole grid
+            self.stride:                stride along x, y, z
         """
-        start = len(self.structure.atoms) + 9
-        self.NGX, self.NGY, self.NGZ = tuple(map(int, self.strings[start].split()))
-        self._head = self.strings[:start + 1]
-        index = np.where(np.array(self.strings) == self.strings[start])[0]
-        assert len(index) == 2, f'Search indicator failure'
-
+        self._head = self.index.head_strings
+        self.density_tot, self.density_mag = self._read((0, 1), cache=cache, threads=threads, box=box, stride=stride,
+                                                        dtype=dtype)
+        self.NGX, self.NGY, self.NGZ = self.density_tot.shape
         self.NGrid = self.NGX * self.NGY * self.NGZ
-        count = self.NGrid / 5 if self.NGrid % 5 == 0 else self.NGrid / 5 + 1
-        count = int(count)
-
-        self._density_tot_strings = self.strings[index[0] + 1:index[0] + 1 + count]
-        self._density_mag_strings = self.strings[index[1] + 1:index[1] + 1 + count]
-
-        # solve residue problem
-        self._density_tot_strings_list = np.char.split(self._density_tot_strings).tolist()
-        residue = 5 - len(self._density_tot_strings_list[-1])
-        self._density_tot_strings_list[-1] += ['0.'] * residue
-
-        self._density_mag_strings_list = np.char.split(self._density_mag_strings).tolist()
-        self._density_mag_strings_list[-1] += ['0.'] * residue
-
-        self.density_tot = np.append([], self._density_tot_strings_list).astype(float)
-        self.density_tot = self.density_tot[:-residue].reshape((self.NGX, self.NGY, self.NGZ), order='F')
+        return self
 
-        self.density_mag = np.append([], self._density_mag_strings_list).astype(float)
-        self.density_mag = self.density_mag[:-residue].reshape((self.NGX, self.NGY, self.NGZ), order='F')
+    def _loaded(self, block):
+        return self._whole({0: self.density_tot, 1: self.density_mag}.get(block))
 
     def split(self):
         """split CHGCAR to CHGCAR_tot && CHGCAR_mag"""
-        if getattr(self, '_head', None) is None:
-            self.load()
-
-        with open('CHGCAR_tot', 'w') as tot, open('CHGCAR_mag', 'w') as mag:
-            tot.writelines(self._head)
-            tot.writelines(self._density_tot_strings)
-            mag.writelines(self._head)
-            mag.writelines(self._density_mag_strings)
+        index = self.index
+        if len(index) < 2:
+            raise ValueError(f'{self.name} has no magnetization density, check the ISPIN tag')
+        index.split(names=('CHGCAR_tot', 'CHGCAR_mag'))
 
 
 class ACFFile(MetaFile):
@@ -1405,160 +1952,389 @@ class ACFFile(MetaFile):
         self.charge = np.array(self.charge)
 
 
-class LOCPOT(StructInfoFile):
+class LOCPOT(GridFile):
     def __init__(self, name):
         super().__init__(name=name)
         self.NGX, self.NGY, self.NGZ, self.NGrid = None, None, None, None
         self.potential = None
         self.lattice = None
+        self.offset, self.stride = (0, 0, 0), (1, 1, 1)
 
         self._head = None
-        self._potential_strings = None
 
-    def load(self):
+    def load(self, cache=None, threads=0, box=None, stride=1, dtype=None):
         """
         load Electrostatic Potential
 
+        Args:
+            cache (bool): whether or not use the sidecar cache, default: `cache` of config.json
+            threads (int): number of parse threads, 0 means decided by the grid size
+            box (Sequence[Tuple[int, int] | None]): index range [start, stop) along x, y, z (None: whole axis), e.g.,
+                                                    (None, None, (40, 80)) for the vacuum region
+            stride (int | Sequence[int]): take every stride-th point along x, y, z
+            dtype (np.dtype): float64 or float32 (half memory), default: `precision` of config.json
+
         Returns:
             self.NGrid (int): value = NGX * NGY * NGZ
-            self.potential (np.array[:, :, :]): record the electrostatic potential
+            self.potential (np.array[:, :, :]): record the electrostatic potential, the subgrid if box or stride
             self.lattice (Lattice): <Lattice class> instance
+            self.offset (Tuple[int]): index of potential[0, 0, 0] in the whole grid
+            self.stride (Tuple[int]): stride along x, y, z
         """
-        start = len(self.structure.atoms) + 9
-        self.NGX, self.NGY, self.NGZ = tuple(map(int, self.strings[start].split()))
-        self._head = self.strings[:start + 1]
-        self.lattice = Lattice.from_string(self._head[2:5])
-        index = np.where(np.array(self.strings) == self.strings[start])[0]
+        self._head = self.index.head_strings
+        self.lattice = self.index.lattice
 
+        self.potential, = self._read((0,), cache=cache, threads=threads, box=box, stride=stride, dtype=dtype)
+        self.NGX, self.NGY, self.NGZ = self.potential.shape
         self.NGrid = self.NGX * self.NGY * self.NGZ
-        count = self.NGrid / 5 if self.NGrid % 5 == 0 else self.NGrid / 5 + 1
-        count = int(count)
-
-        self._potential_strings = self.strings[index[0] + 1:index[0] + 1 + count]
-
-        # solve residue problem
-        self._potential_strings = np.char.split(self._potential_strings).tolist()
-        residue = 5 - len(self._potential_strings[-1])
-        self._potential_strings[-1] += ['0.'] * residue
+        return self
 
-        self.potential = np.append([], self._potential_strings).astype(float)
-        if residue:
-            self.potential = self.potential[:-residue].reshape((self.NGX, self.NGY, self.NGZ), order='F')
-        else:
-            self.potential = self.potential.reshape((self.NGX, self.NGY, self.NGZ), order='F')
+    def _loaded(self, block):
+        return self._whole({0: self.potential}.get(block))
 
     def line_potential(self, direction='z'):
         """
-        Calculate the electrostatic potential along one direction, default: z-axis
+        Calculate the electrostatic potential along one direction, default: z-axis, the grid is not loaded (streamed
+        planar average) unless direction is the lattice planes (hkl)
 
         Args:
-            direction (str): which axis you want to calculate the electrostatic potential
+            direction (str | Sequence[int]): which axis (x, y, z) or normal of the lattice planes (hkl) you want to
+                                             calculate the electrostatic potential
 
         Returns:
             line_potential (np.array[:]): electrostatic potential along one axis
 
         """
-        mapping = {'x': 0, 'y': 1, 'z': 2}
-
-        if getattr(self, 'potential', None) is None:
-            self.load()
-        NGXYZ = (self.NGX, self.NGY, self.NGZ)
+        return self.planar_average(direction=direction)
 
-        if mapping.get(direction, None) is None:
-            raise KeyError(f'{direction} is not supported, should be [x, y, z]')
 
-        potential_swap = np.swapaxes(self.potential, -1, mapping[direction])
-        return np.linspace(start=0, stop=self.lattice.length[mapping[direction]],
-                           num=NGXYZ[mapping[direction]]), np.mean(potential_swap, axis=(0, 1))
+class OUTCAR(MetaFile):
+    """
+    The constructor only scans the head of OUTCAR (element, spin, bands, kpoints), the ionic steps and the
+    frequency/band/neb/fort sections are parsed on their first access and cached
 
+    For a running job, `update()` only parses the bytes appended since the last scan and extends the values in place
+    """
 
-class OUTCAR(MetaFile):
     def __init__(self, name):
         super().__init__(name=name)
 
-        element_name = [line.split()[3].split('_')[0] for line in self.strings if 'TITEL' in line]
-        element_count = [list(map(int, line.split()[4:])) for line in self.strings if 'ions per' in line][0]
-        self.element = sum([[name] * count for name, count in zip(element_name, element_count)], [])
-        self.lattice = {Lattice.from_string(self.strings[index + 1:index + 4]) for index, line in
-                        enumerate(self.strings) if 'direct lattice vectors' in line}
-        self.lattice = list(self.lattice)[0] if len(self.lattice) == 1 else self.lattice
-        self._frequency = [i for i in range(len(self.strings)) if 'Hz' in self.strings[i]]
-        self._neb = [line for line in self.strings if 'NEB:' in line]
-        self._fort = [line for line in self.strings if 'fort.1881' in line]
-        self.spin, self.bands, self.kpoints, self.fermi, self.steps = None, None, None, None, None
-        self.energy, self.force, self.mag = None, None, None
-        self.last_energy, self.last_force, self.last_mag = None, None, None
-        self.finish = 'reached' in self.strings[-30]
-        self._parse_base()
-
-        self.frequency = None
-        if len(self._frequency):
-            self._parse_freq()
+        self.element = None
+        self.spin, self.bands, self.kpoints = None, None, None
+
+        self._element_name, self._element_count = [], None
+        self._head_scanned = False  # the head is complete (the first `Iteration` is written)
+        self._steps_scanned, self._band_parsed = False, False
+        self._finish = None
+        self._lattices, self._steps, self._fermi = set(), [], None
+        self._energy, self._force, self._mag = [], [], []
+        self._frequency = []  # (line index, byte offset) of the `Hz` lines
+        self._frequency_info = None
+        self._neb, self._fort = False, False
+        self._tangent, self._condist = [], []
+        self._band_offset = None  # byte offset of the first `E-fermi` line after the last `Iteration`
+        self._kpoint_info, self._band_info = None, None
+        self._status = None
+        self._offset, self._line_number = 0, 0  # scanned position of the ionic steps
+        self._scan_head()
+
+    @staticmethod
+    def status(name):
+        """
+        Fast path of the job status, read OUTCAR backwards from EOF and stop at the last ionic step
+
+        Args:
+            name (str | Path): name of OUTCAR
+
+        Returns:
+            status (Status): namedtuple(finish, energy, force, mag, fermi, tangent), the values of last ionic step,
+                             None if not found (mag is None for ISPIN = 1, tangent is 0. for non-NEB job)
+        """
+        values = {'energy  without': None, 'FORCES: max atom': None, 'number of electron ': None, 'E-fermi': None,
+                  'tangent': None}
+        parsers = {'energy  without': lambda item: float(item[3]),
+                   'FORCES: max atom': lambda item: float(item[5]),
+                   'number of electron ': lambda item: float(item[5]) if len(item) > 5 else None,
+                   'E-fermi': lambda item: float(item[2]),
+                   'tangent': lambda item: float(item[-1])}
+        found, finish, last_ionic = set(), False, None
+        for index, line in enumerate(reverse_lines(name)):
+            if index == 29:  # same as `strings[-30]`
+                finish = 'reached' in line
+            for marker in values:
+                if marker not in found and marker in line and (marker != 'tangent' or 'NEB:' in line):
+                    values[marker] = parsers[marker](line.split())
+                    found.add(marker)
+            if 'Iteration' in line:
+                ionic = int(line.split()[2].split('(')[0])
+                last_ionic = ionic if last_ionic is None else last_ionic
+                if ionic < last_ionic - 1:  # the last ionic step may be unfinished, go back to the previous one
+                    break
+            if index >= 29 and len(found) == len(values):
+                break
+
+        return namedtuple('Status', ('finish', 'energy', 'force', 'mag', 'fermi', 'tangent'))(
+            finish, values['energy  without'], values['FORCES: max atom'], values['number of electron '],
+            values['E-fermi'], values['tangent'] if values['tangent'] is not None else 0.)
+
+    def _scan_head(self):
+        """
+        Scan the head of OUTCAR until the first electronic step
+        """
+        self.spin, self.bands, self.kpoints = None, None, None
+        self._element_name, self._element_count = [], None
+
+        def on_iteration(line, scanner):
+            self._head_scanned = True
+            scanner.stop()
+
+        scanner = MarkerScanner()
+        for marker, handler in (('TITEL', self._on_titel),
+                                ('ions per', self._on_ions),
+                                ('ISPIN', self._on_spin),
+                                ('NBANDS', self._on_bands),
+                                ('Iteration', on_iteration)):
+            scanner.register(marker, handler)
+        scanner.scan(self.name)
+        self.element = sum([[name] * count for name, count in zip(self._element_name, self._element_count or [])],
+                           [])
+
+    def _scan_steps(self):
+        """
+        Stream the OUTCAR once, dispatch the marked lines to handlers and only keep the parsed values, the frequency
+        and band sections are only located here
+        """
+        if not self._steps_scanned:
+            self.update()
+
+    def update(self):
+        """
+        Incrementally parse the OUTCAR of a running job, only the bytes appended since the last scan are read, the
+        energy/force/mag/steps lists are extended in place (the cost is constant per new ionic step). OUTCAR is
+        re-scanned from the beginning if it is truncated (e.g., job restarted)
+
+        @return:
+            self (OUTCAR)
+        """
+        if os.path.getsize(self.name) < self._offset:
+            logger.debug(f'{self.name} is truncated, scan from the beginning')
+            self.__init__(self.name)
+        if not self._head_scanned:
+            self._scan_head()
+
+        self._finish, self._status = None, None
+        self._band_parsed, self._kpoint_info, self._band_info = False, None, None
+        frequency = len(self._frequency)
+
+        scanner = MarkerScanner()
+        for marker, handler in (('direct lattice vectors', self._on_lattice),
+                                ('Hz', self._on_frequency),
+                                ('NEB:', self._on_neb),
+                                ('tangent', self._on_tangent),
+                                ('fort.1881', self._on_fort),
+                                ('distance after opt', self._on_condist),
+                                ('Iteration', self._on_iteration),
+                                ('E-fermi', self._on_fermi),
+                                ('energy  without', self._on_energy),
+                                ('FORCES: max atom', self._on_force),
+                                ('number of electron ', self._on_mag)):
+            scanner.register(marker, handler)
+        self._offset = scanner.scan(self.name, self._offset, self._line_number, final=self.finish)
+        self._line_number = scanner.line_number
+        self._steps_scanned = True
+
+        if len(self._frequency) != frequency:
+            self._frequency_info = None
+        return self
+
+    def _on_titel(self, line, scanner):
+        self._element_name.append(line.split()[3].split('_')[0])
+
+    def _on_ions(self, line, scanner):
+        if self._element_count is None:
+            self._element_count = list(map(int, line.split()[4:]))
+
+    def _on_spin(self, line, scanner):
+        if self.spin is None:
+            self.spin = int(line.split()[2])
+
+    def _on_bands(self, line, scanner):
+        if self.bands is None and 'the' not in line:
+            self.bands, self.kpoints = int(line.split()[-1]), int(line.split()[3])
+
+    def _on_lattice(self, line, scanner):
+        self._lattices.add(Lattice.from_string(scanner.lines(3)))
+
+    def _on_frequency(self, line, scanner):
+        scanner.lines(len(self.element) + 1)  # make sure the section is complete
+        self._frequency.append((scanner.line_number, scanner.offset))
+
+    def _on_neb(self, line, scanner):
+        self._neb = True
+
+    def _on_tangent(self, line, scanner):
+        self._tangent.append(float(line.split()[-1]))
+
+    def _on_fort(self, line, scanner):
+        self._fort = True
+
+    def _on_condist(self, line, scanner):
+        self._condist.append(float(line.split()[-1]))
+
+    def _on_iteration(self, line, scanner):
+        self._steps.append((scanner.line_number, int(line.split()[2].split('(')[0]),
+                            int(line.split()[3].split(')')[0])))
+        self._band_offset = None
 
-        self.kpoint_info, self.band_info = None, None
-
-        if self.finish:
-            self._parse_band()
-
-        self.tangent, self.last_tangent = 0., 0.
-        if len(self._neb):
-            self._parse_neb()
-
-        self.condist, self.last_condist = 0., 0.
-        if len(self._fort):
-            self._parse_fort()
-
-    def _parse_base(self):
-        self.spin = [int(line.split()[2]) for line in self.strings if 'ISPIN' in line][0]
-        self.bands, self.kpoints = \
-            [(int(line.split()[-1]), int(line.split()[3])) for line in self.strings if
-             'NBANDS' in line and 'the' not in line][0]
-        steps = [(index, int(line.split()[2].split('(')[0]), int(line.split()[3].split(')')[0]))
-                 for index, line in enumerate(self.strings) if 'Iteration' in line]
-        self.steps = namedtuple('Steps', ('index', 'ionic', 'electronic'))(*list(map(tuple, zip(*steps))))
-        self.fermi = [float(line.split()[2]) for line in self.strings if 'E-fermi' in line][-1]
-        self.energy = [float(line.split()[3]) for line in self.strings if 'energy  without' in line]
-        self.force = [float(line.split()[5]) for line in self.strings if 'FORCES: max atom' in line]
+    def _on_fermi(self, line, scanner):
+        self._fermi = float(line.split()[2])
+        if self._band_offset is None and len(self._steps):
+            self._band_offset = scanner.offset
+
+    def _on_energy(self, line, scanner):
+        self._energy.append(float(line.split()[3]))
+
+    def _on_force(self, line, scanner):
+        self._force.append(float(line.split()[5]))
+
+    def _on_mag(self, line, scanner):  # ISPIN is printed in the head of OUTCAR
         if self.spin == 2:
-            self.mag = [float(line.split()[5]) for line in self.strings if 'number of electron ' in line]
-        else:
-            self.mag = []
-        self.last_energy = self.energy[-1] if len(self.energy) else None
-        self.last_force = self.force[-1] if len(self.force) else None
-        self.last_mag = self.mag[-1] if len(self.mag) else None
+            self._mag.append(float(line.split()[5]))
+
+    @property
+    def finish(self):
+        if self._finish is None:
+            tail = tail_lines(self.name, 30)
+            self._finish = len(tail) == 30 and 'reached' in tail[0]
+        return self._finish
+
+    @property
+    def lattice(self):
+        self._scan_steps()
+        return list(self._lattices)[0] if len(self._lattices) == 1 else self._lattices
+
+    @property
+    def steps(self):
+        self._scan_steps()
+        return namedtuple('Steps', ('index', 'ionic', 'electronic'))(
+            *(list(map(tuple, zip(*self._steps))) or [(), (), ()]))
+
+    @property
+    def fermi(self):
+        self._scan_steps()
+        return self._fermi
+
+    @property
+    def energy(self):
+        self._scan_steps()
+        return self._energy
+
+    @property
+    def force(self):
+        self._scan_steps()
+        return self._force
+
+    @property
+    def mag(self):
+        self._scan_steps()
+        return self._mag
+
+    def _last(self, field, values):
+        """value of the last ionic step, read from the tail of OUTCAR if the steps are not scanned"""
+        if not self._steps_scanned:
+            if self._status is None:
+                self._status = OUTCAR.status(self.name)
+            if getattr(self._status, field) is not None:
+                return getattr(self._status, field)
+        values = values()
+        return values[-1] if len(values) else None
+
+    @property
+    def last_energy(self):
+        return self._last('energy', lambda: self.energy)
+
+    @property
+    def last_force(self):
+        return self._last('force', lambda: self.force)
+
+    @property
+    def last_mag(self):
+        if self.spin != 2:
+            return None
+        return self._last('mag', lambda: self.mag)
+
+    @property
+    def frequency(self):
+        self._scan_steps()
+        if self._frequency_info is None and len(self._frequency):
+            self._parse_freq()
+        return self._frequency_info
+
+    @property
+    def kpoint_info(self):
+        self._parse_band()
+        return self._kpoint_info
+
+    @property
+    def band_info(self):
+        self._parse_band()
+        return self._band_info
+
+    @property
+    def tangent(self):
+        self._scan_steps()
+        return self._tangent if self._neb else 0.
+
+    @property
+    def last_tangent(self):
+        tangent = self.tangent
+        return tangent[-1] if isinstance(tangent, list) and len(tangent) else 0.
+
+    @property
+    def condist(self):
+        self._scan_steps()
+        return self._condist if self._fort else 0.
+
+    @property
+    def last_condist(self):
+        condist = self.condist
+        return condist[-1] if isinstance(condist, list) and len(condist) else 0.
 
     def _parse_freq(self):
         """
         Parse frequency information from OUTCAR
 
         @return:
-            register self.frequency attr (type: namedtuple)
+            register self._frequency_info attr (type: namedtuple)
         """
         image, wave_number, vib_energy, coord, vibration = [], [], [], [], []
-        for index in self._frequency:
-            item = self.strings[index].split()
-            image.append(False) if item[1] == 'f' else image.append(True)
-            wave_number.append(float(item[-4]))
-            vib_energy.append(float(item[-2]))
-            item = list(map(lambda x: [float(i) for i in x],
-                            np.char.split(self.strings[index + 2:index + 2 + len(self.element)])))
-            coord.append(np.array(item)[:, :3])
-            vibration.append(np.array(item)[:, 3:])
-
-        self.frequency = namedtuple('Frequency',
-                                    ('image', 'wave_number', 'vib_energy', 'coord', 'vibration'))(image,
-                                                                                                  np.array(wave_number),
-                                                                                                  np.array(vib_energy),
-                                                                                                  np.array(coord),
-                                                                                                  np.array(vibration))
+        with open(self.name, 'rb') as f:
+            for _, offset in self._frequency:
+                f.seek(offset)
+                lines = [f.readline().decode(errors='replace') for _ in range(len(self.element) + 2)]
+                item = lines[0].split()
+                image.append(False) if item[1] == 'f' else image.append(True)
+                wave_number.append(float(item[-4]))
+                vib_energy.append(float(item[-2]))
+                item = list(map(lambda x: [float(i) for i in x], np.char.split(lines[2:])))
+                coord.append(np.array(item)[:, :3])
+                vibration.append(np.array(item)[:, 3:])
+
+        self._frequency_info = namedtuple('Frequency',
+                                          ('image', 'wave_number', 'vib_energy', 'coord', 'vibration'))(
+            image, np.array(wave_number), np.array(vib_energy), np.array(coord), np.array(vibration))
 
     def _parse_band(self):
         """
         Parse band information from OUTCAR
 
         @return:
-            register self.kpoint_info (type: tuple(List[KPoint(coord, value)], List[KPoint(coord, value)]))
+            register self._kpoint_info (type: tuple(List[KPoint(coord, value)], List[KPoint(coord, value)]))
         """
+        if self._band_parsed or not self.finish:  # only parse the finished job
+            return
+        self._band_parsed = True
+        self._scan_steps()
 
         def spin_obtain(kpoint_group):
             """
@@ -1590,10 +2366,18 @@ class OUTCAR(MetaFile):
             band = band.transpose((1, 0))
             return band
 
-        content = self.strings[self.steps.index[-1]:]  # calculate bandgap from last step
-        start_index = [index for index, line in enumerate(content) if 'E-fermi' in line][0]
-        end_index = [index for index, line in enumerate(content) if '-----' in line and index > start_index][0]
-        band_info = content[start_index:end_index]  # band_info content in last step
+        if self._band_offset is None:
+            logger.warning(f'{self.name} has no band information in the last step')
+            return
+
+        band_info = []  # band_info content in last step, from `E-fermi` to `-----`
+        with open(self.name, 'rb') as f:
+            f.seek(self._band_offset)
+            for line in f:
+                line = line.decode(errors='replace')
+                if '-----' in line and len(band_info):
+                    break
+                band_info.append(line)
         KPoint = namedtuple('KPoint', ('coord', 'value'))  # including `kpoint coord` and `each band energy`
         if self.spin == 2:
             kpoint_index = [index for index, line in enumerate(band_info) if 'k-point' in line]
@@ -1603,19 +2387,12 @@ class OUTCAR(MetaFile):
             spin_up = spin_obtain(kpoint_up)
             spin_down = spin_obtain(kpoint_down)
 
-            self.kpoint_info = namedtuple('KPoint_info', ('up', 'down'))(spin_up, spin_down)
-            self.band_info = namedtuple('Band_info', ('up', 'down'))(transform_band(spin_up), transform_band(spin_down))
+            self._kpoint_info = namedtuple('KPoint_info', ('up', 'down'))(spin_up, spin_down)
+            self._band_info = namedtuple('Band_info', ('up', 'down'))(transform_band(spin_up),
+                                                                      transform_band(spin_down))
         else:
             logger.warning('Non-spin polarized calculation may have error, please check!!')
 
-    def _parse_neb(self):
-        self.tangent = [float(line.split()[-1]) for line in self.strings if line.find('tangent') != -1]
-        self.last_tangent = self.tangent[-1]
-
-    def _parse_fort(self):
-        self.condist = [float(line.split()[-1]) for line in self.strings if line.find('distance after opt') != -1]
-        self.last_condist = self.condist[-1]
-
     def bandgap(self, cutoff=0.01):
         """
         Calculated the bandgap from OUTCAR file
@@ -1678,8 +2455,9 @@ class OUTCAR(MetaFile):
         if self.frequency is None:
             raise AnimationError(f"{self.name} don't include frequency information")
 
-        if isinstance(freq, int) and freq not in range(len(self._frequency)):
-            raise FrequencyError(f'freq{freq} is not in {self.name}, should be {list(range(len(self._frequency)))}')
+        if isinstance(freq, int) and freq not in range(len(self.frequency.image)):
+            raise FrequencyError(
+                f'freq{freq} is not in {self.name}, should be {list(range(len(self.frequency.image)))}')
 
         if isinstance(freq, str) and freq != 'image':
             raise FrequencyError(f'`{freq}` is not supported, should be `image`')
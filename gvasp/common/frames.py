@@ -0,0 +1,204 @@
+"""
+Random-access frame index of the trajectory file (XDATCAR)
+
+The byte offsets of every frame (and of its lattice header for the variable cell, e.g., ISIF = 3) are found once by a
+memory-mapped scan and stored in `.gvasp_cache/<name>.frames.npz` next to the file; afterwards a frame, slice or
+strided selection only reads the bytes of the selected frames. When the file grows (running MD), only the appended
+frames are indexed.
+"""
+import logging
+import mmap
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+from gvasp.common.base import Lattice
+from gvasp.common.cache import CacheDir
+from gvasp.common.structure import Trajectory
+
+logger = logging.getLogger(__name__)
+
+Pattern = re.compile(rb'Direct')
+
+
+class FrameIndex:
+    """
+    Byte-offset index of the frames of XDATCAR
+
+    Attributes:
+        name (str | Path): file name
+        element (List[str]): formula of each atom
+        lattice (Lattice): lattice of the file head (first frame)
+        variable (bool): whether the cell is variable (every frame has its own lattice header)
+        starts (np.ndarray): offset of the first coordinate line of each frame
+        ends (np.ndarray): offset just after the coordinates of each frame
+        headers (np.ndarray): offset of the lattice header of each frame, only meaningful for the variable cell
+    """
+
+    def __init__(self, name):
+        self.name = name
+        with open(name, 'rb') as f:
+            head = [f.readline().decode() for _ in range(7)]
+        self._head = head
+        self.lattice = Lattice.from_string(head[2:5])
+        self.element = sum([[name] * int(count) for name, count in zip(head[5].split(), head[6].split())], [])
+        self.variable = False
+        self.starts, self.ends, self.headers = (np.empty(0, dtype=np.int64) for _ in range(3))
+        self._stamp = (0, 0)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f"<FrameIndex | name='{self.name}', frames={len(self)}, " \
+               f"cell={'variable' if self.variable else 'fixed'}>"
+
+    @property
+    def sidecar(self):
+        path = Path(self.name)
+        return path.parent / CacheDir / f'{path.name}.frames.npz'
+
+    @classmethod
+    def from_file(cls, name):
+        """
+        Load the stored index of file, extend it if the file grows, rebuild it if the file is changed otherwise
+
+        Args:
+            name (str | Path): name of XDATCAR
+
+        Returns:
+            index (FrameIndex): index of the file
+        """
+        index = cls(name)
+        stat = os.stat(name)
+        stored = index._load()
+        if stored is not None and index._stamp == (stat.st_size, stat.st_mtime_ns):
+            return index
+
+        with open(name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if stored is not None and index._stamp[0] <= stat.st_size and len(index) and \
+                    mm[index.starts[-1] - 1:index.starts[-1]] == b'\n' and \
+                    b'Direct' in mm[mm.rfind(b'\n', 0, index.starts[-1] - 1) + 1:index.starts[-1]]:
+                logger.debug(f'{name} is appended, index the new frames')
+                begin = mm.rfind(b'\n', 0, index.starts[-1] - 1) + 1
+                index.starts, index.ends, index.headers = index.starts[:-1], index.ends[:-1], index.headers[:-1]
+            else:
+                logger.debug(f'Index the frames of {name}')
+                begin = 0
+                index.starts, index.ends, index.headers = (np.empty(0, dtype=np.int64) for _ in range(3))
+            index._scan(mm, begin)
+        index._stamp = (stat.st_size, stat.st_mtime_ns)
+        index._save()
+        return index
+
+    def _scan(self, mm, begin):
+        """locate the `Direct configuration` lines after begin and append the complete frames"""
+        directs, starts = [], []
+        for match in Pattern.finditer(mm, begin):
+            end = mm.find(b'\n', match.end()) + 1
+            if not end:  # the `Direct` line is still being written
+                break
+            directs.append(mm.rfind(b'\n', 0, match.start()) + 1)
+            starts.append(end)
+        if not len(starts):
+            return
+
+        if not self.variable and len(self) + len(starts) > 1:  # check once if the lattice header is repeated
+            second = directs[1] if len(self) == 0 else directs[0]
+            self.variable = self._lines_before(mm, second, 2) == [line.encode() for line in self._head[5:7]]
+
+        headers = [self._line_start(mm, direct, 7) for direct in directs] if self.variable else directs
+        ends = headers[1:] + [len(mm)]
+        natoms = len(self.element)
+        if mm[starts[-1]:ends[-1]].count(b'\n') < natoms:  # the last frame is still being written
+            directs, starts, headers, ends = directs[:-1], starts[:-1], headers[:-1], ends[:-1]
+
+        self.starts = np.append(self.starts, np.array(starts, dtype=np.int64))
+        self.ends = np.append(self.ends, np.array(ends, dtype=np.int64))
+        self.headers = np.append(self.headers, np.array(headers, dtype=np.int64))
+
+    @staticmethod
+    def _line_start(mm, position, count):
+        """offset of the count-th line before the line starting at position"""
+        for _ in range(count):
+            position = mm.rfind(b'\n', 0, max(position - 1, 0)) + 1
+        return position
+
+    @staticmethod
+    def _lines_before(mm, position, count):
+        start = FrameIndex._line_start(mm, position, count)
+        return mm[start:position].splitlines(keepends=True)
+
+    def _load(self):
+        try:
+            with np.load(self.sidecar) as data:
+                if str(data['source']) != Path(self.name).name:
+                    return None
+                self._stamp = tuple(int(item) for item in data['stamp'])
+                self.variable = bool(data['variable'])
+                self.starts, self.ends, self.headers = data['starts'], data['ends'], data['headers']
+        except (OSError, ValueError, KeyError):
+            return None
+        return self
+
+    def _save(self):
+        """store the index, skipped (with warning) if the directory is not writable"""
+        try:
+            self.sidecar.parent.mkdir(exist_ok=True)
+            temp = self.sidecar.with_name(f'{self.sidecar.name}.{os.getpid()}.tmp.npz')
+            np.savez(temp, source=Path(self.name).name, stamp=np.array(self._stamp, dtype=np.int64),
+                     variable=self.variable, starts=self.starts, ends=self.ends, headers=self.headers)
+            os.replace(temp, self.sidecar)
+        except OSError as error:
+            logger.warning(f'Store the frame index of {self.name} failure: {error}')
+
+    @property
+    def lattices(self):
+        """lattice matrix of each frame, shape=(n_frames, 3, 3), None for the fixed cell (only headers are read)"""
+        if not self.variable:
+            return None
+        with open(self.name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return np.array([self._lattice(mm, frame) for frame in range(len(self))]).reshape((-1, 3, 3))
+
+    def select(self, index):
+        """
+        Normalize int/slice/index array to an array of frame indices
+        """
+        if isinstance(index, (int, np.integer)):
+            if not -len(self) <= index < len(self):
+                raise IndexError(f'{self.name} has {len(self)} frame(s), frame {index} is out of range')
+            return np.array([index % len(self)])
+        if isinstance(index, slice):
+            return np.arange(len(self))[index]
+        return np.arange(len(self))[np.asarray(index)]
+
+    def read(self, index):
+        """
+        Read the selected frames via mmap
+
+        Args:
+            index (int | slice | Sequence[int]): selected frames
+
+        Returns:
+            trajectory (Trajectory): Trajectory of the selected frames
+        """
+        frames = self.select(index)
+        natoms = len(self.element)
+        with open(self.name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = b' '.join(mm[self.starts[frame]:self.ends[frame]] for frame in frames)
+            values = np.fromstring(data, sep=' ') if len(frames) else np.empty(0)
+            lattices = np.array([self._lattice(mm, frame) for frame in frames]).reshape((-1, 3, 3)) \
+                if self.variable else None
+        if values.size != len(frames) * natoms * 3:
+            raise ValueError(f'{self.name} is changed after indexed, the frame size is not consistent')
+
+        frac_coord = values.reshape((len(frames), natoms, 3))
+        lattice = Lattice(lattices[0]) if lattices is not None and len(lattices) else self.lattice
+        return Trajectory(self.element, frac_coord, lattice, lattices)
+
+    def _lattice(self, mm, frame):
+        """lattice matrix in the header of frame (variable cell)"""
+        lines = self._lines_before(mm, self.starts[frame], 8)  # title, scale, lattice, element, count, Direct
+        return Lattice.from_string([line.decode() for line in lines[2:5]]).matrix
@@ -1,21 +1,20 @@
 import logging
 from collections import defaultdict, namedtuple
 from functools import wraps
-from itertools import product
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
-from pandas import DataFrame
+from pandas import Series
 from scipy import interpolate
 from scipy.integrate import simps
 
-from gvasp.common.constant import COLUMNS_32
 from gvasp.common.figure import Figure, SolidLine, DashLine, Text, plot_wrapper, PchipLine
 from gvasp.common.file import CONTCAR, DOSCAR, EIGENVAL, OUTCAR, POSCAR, LOCPOT, CHGCAR_diff, KPATHIN
 from gvasp.common.structure import Structure
 from gvasp.common.task import NEBTask
+from gvasp.common.volumetric import macroscopic_average
 from gvasp.common.utils import identify_atoms, search_peak
 
 pd.set_option('display.max_columns', None)  # show all columns
@@ -23,6 +22,8 @@ pd.set_option('display.max_rows', None)  # show all rows
 
 logger = logging.getLogger(__name__)
 
+NonInteractive = ('agg', 'cairo', 'pdf', 'pgf', 'ps', 'svg', 'template')  # matplotlib backends without window
+
 
 def interpolated_wrapper(func):
     @wraps(func)
@@ -98,9 +99,9 @@ class PostDOS(Figure):
                 for index, item in enumerate(self.align):
                     if len(item) == 2:
                         if index == 0:
-                            reference = self.managers[index].atom_list[item[0] + 1][item[1] + '_up']
+                            reference = self.managers[index].series(item[0] + 1, item[1] + '_up')
                             refer_extremes = search_peak(reference)
-                        current = self.managers[index].atom_list[item[0] + 1][item[1] + '_up']
+                        current = self.managers[index].series(item[0] + 1, item[1] + '_up')
                         current_extremes = search_peak(current)
                         diff_extreme = current_extremes[0] - refer_extremes[0]
                         for dos_line in DOSdata[str(index)]:
@@ -141,31 +142,26 @@ class PostDOS(Figure):
         manager = self.managers[0]
         elements = manager.elements
         total_dos = manager.total_dos
-        atom_list = manager.atom_list
 
         atoms = identify_atoms(selector.get('atoms', None), elements)
         orbitals = selector.get('orbitals', None)
         xlim = selector['xlim']
 
-        y = 0
-        rang = (total_dos.index.values < xlim[1]) & (total_dos.index.values > xlim[0])
+        energy = manager.doscar.energy
+        rang = (energy < xlim[1]) & (energy > xlim[0])
         if len(atoms) == len(elements) - 1 and orbitals is None:
             orbitals = 'All'
-            y += total_dos.loc[rang, 'tot_up']
-            y -= total_dos.loc[rang, 'tot_down']
+            y = total_dos['tot_up'].values - total_dos['tot_down'].values
         elif orbitals is None:
             orbitals = 'All'
-            for atom in atoms:
-                y += atom_list[atom].loc[rang, 'up']
-                y -= atom_list[atom].loc[rang, 'down']
+            y = manager.dos(atoms, ['up']) - manager.dos(atoms, ['down'])
         else:
-            for atom in atoms:
-                for orbital in orbitals:
-                    y += atom_list[atom].loc[rang, f'{orbital}_up']
-                    y -= atom_list[atom].loc[rang, f'{orbital}_down']
+            y = manager.dos(atoms, [f'{orbital}_up' for orbital in orbitals]) - \
+                manager.dos(atoms, [f'{orbital}_down' for orbital in orbitals])
+        x, y = energy[rang], y[rang]
 
-        e_count = simps(y.values, y.index.values)  # Simpson Integration method for obtain the electrons' num
-        dos = simps([a * b for a, b in zip(y.values, y.index.values)], y.index.values)
+        e_count = simps(y, x)  # Simpson Integration method for obtain the electrons' num
+        dos = simps(y * x, x)
 
         # format atoms output
         format_atoms = ''
@@ -199,21 +195,44 @@ class DOSData():
 
     Methods:
         get_data():     get_data main func
-        center():   calculate the band-center
+        dos():          sum the channels of atoms
+        series():       one channel of one atom
 
-        contcar_parse:  parse CONTCAR data
-        doscar_parse:   parse DOSCAR data
+        parse_contcar:  parse CONTCAR data
     """
 
     def __init__(self, dos_file, pos_file, ISPIN=2, LORBIT=12, magnification=100):
         self.dos_file = dos_file
         self.pos_file = pos_file
         self.elements = DOSData.parse_contcar(self.pos_file)
-        self.total_dos, self.atom_list = DOSData.parse_doscar(self.dos_file, ISPIN, LORBIT)
+        self.doscar = DOSCAR(name=self.dos_file, ISPIN=ISPIN, LORBIT=LORBIT).load(lazy=True)  # atoms on demand
         self.magnification = magnification
 
         self.atoms, self.orbitals, self.method, self.avgflag = None, None, None, None
 
+    @property
+    def total_dos(self):
+        """TDOS DataFrame (compatibility)"""
+        return self.doscar.TDOS
+
+    @property
+    def atom_list(self):
+        """
+        energy + List(NAtom * DataFrame), public API kept for backward compatibility, it parses the blocks of all atoms,
+        use `dos` or `series` (only the selected atoms are parsed) in new code
+        """
+        return self.doscar.LDOS
+
+    def dos(self, atoms, channels):
+        """
+        Sum the channels (e.g., ['up'], ['s_down', 'p_down']) of atoms (index start from 1, same as `elements`)
+        """
+        return self.doscar.dos([atom - 1 for atom in atoms], channels)
+
+    def series(self, atom, channel):
+        """one channel of one atom (index start from 1), Series(index=energy)"""
+        return Series(self.dos([atom], [channel]), index=self.doscar.energy)
+
     def get_data(self, atoms=None, exclude=None, orbitals=None, avgflag=False, **kargs):
         """
         <Get_Data Main Func>
@@ -234,32 +253,18 @@ class DOSData():
         def TDOS_data(self):
             """Get Total DOS"""
             for column in self.total_dos.columns.values:
-                yield self.total_dos.index.values, list(self.total_dos[column].values), 1, self.magnification
+                yield self.doscar.energy, self.total_dos[column].values, 1, self.magnification
 
         @interpolated_wrapper
         def LDOS_data(self):
             """Get DOS of atom list"""
-            plus_tot = defaultdict(list)
-            plus_tot = DataFrame(plus_tot, index=self.atom_list[0],
-                                 columns=['up', 'down', 'p_up', 'p_down', 'd_up', 'd_down', 'f_up', 'f_down'] +
-                                         COLUMNS_32, dtype='object')
-            plus_tot.iloc[:, :] = 0.0
-            for atom in self.atoms:
-                for column in plus_tot.columns.values:
-                    try:
-                        plus_tot[column] += self.atom_list[atom][column]
-                    except KeyError:
-                        plus_tot[column] = 0
-
             if self.orbitals is None:
-                orbitals = [plus_tot['up'].values, plus_tot['down'].values]
+                channels = [['up'], ['down']]
             else:
-                orbitals_up = np.array([plus_tot[item[0] + item[1]] for item in product(self.orbitals, ['_up'])])
-                orbitals_down = np.array([plus_tot[item[0] + item[1]] for item in product(self.orbitals, ['_down'])])
-                orbitals = [np.sum(orbitals_up, axis=0), np.sum(orbitals_down, axis=0)]
+                channels = [[f'{orbital}_{spin}' for orbital in self.orbitals] for spin in ('up', 'down')]
 
-            for orbital_value in orbitals:
-                yield plus_tot.index.values, orbital_value, len(self.atoms), self.magnification
+            for channel in channels:
+                yield self.doscar.energy, self.dos(self.atoms, channel), len(self.atoms), self.magnification
 
         """Main Content of get_data func"""
         if self.atoms is None:
@@ -289,34 +294,53 @@ class DOSData():
         elements = [' '] + structure.atoms.formula
         return elements
 
-    @staticmethod
-    def parse_doscar(name, ISPIN, LORBIT):
-        """
-        read DOSCAR file, obtain the TDOS && LDOS.
-
-        Args:
-            name:       DOSCAR file name
-
-        Returns:
-            TDOS:       DataFrame(NDOS, 2)
-            LDOS:       energy_list + List(NAtom * DataFrame(NDOS, NOrbital+8))
-        """
-        dos_instance = DOSCAR(name=name, ISPIN=ISPIN, LORBIT=LORBIT).load()
-        return dos_instance.TDOS, dos_instance.LDOS
-
 
 class PlotOpt(Figure):
     def __init__(self, name='OUTCAR', width=16, title='Structure Optimization', xlabel='Steps', **kargs):
         super().__init__(width=width, title=title, xlabel=xlabel, **kargs)
         self.name = name
-        outcar = OUTCAR(name=self.name)
-        self.energy = outcar.energy
-        self.force = outcar.force
+        self.outcar = OUTCAR(name=self.name)
+        self.energy = self.outcar.energy
+        self.force = self.outcar.force
 
     def plot(self, color=('#ed0345', '#009734')):
         self._plot_energy(color=color[0])
         self._plot_force(color=color[1])
 
+    def follow(self, color=('#ed0345', '#009734'), interval=10., name=None):
+        """
+        Follow a running optimization: poll the OUTCAR, only the appended bytes are parsed, and re-plot when new ionic
+        steps are finished, stop when the job is finished or Ctrl-C
+
+        @param:
+            color:      colors of energy and force lines
+            interval:   poll interval (unit: s)
+            name:       if not None, the figure is also saved to `name` after every re-plot
+        """
+        if name is None and plt.get_backend().lower() in NonInteractive:
+            logger.warning(f'matplotlib backend `{plt.get_backend()}` is non-interactive, the figure is neither drawn '
+                           f'nor saved in follow mode, only the progress is logged (use `--save` to save the figure)')
+        steps = None
+        try:
+            while True:
+                self.outcar.update()
+                self.energy, self.force = self.outcar.energy, self.outcar.force  # new lists if OUTCAR is truncated
+                if steps != len(self.energy):
+                    steps = len(self.energy)
+                    logger.info(f'{self.name}: {steps} ionic steps, energy = {self.outcar.last_energy}, '
+                                f'force = {self.outcar.last_force}')
+                    plt.clf()
+                    self.plot(color=color)
+                    if name is not None:
+                        self.save(name=name)
+                if self.outcar.finish:
+                    break
+                plt.pause(interval)
+        except KeyboardInterrupt:
+            pass
+        if name is not None:
+            logger.info(f'Figure has been saved as `{name}`, please check')
+
     @plot_wrapper
     def _plot_energy(self, color):
         plt.subplot(121)
@@ -369,15 +393,27 @@ class PlotBand(Figure):
 
 
 class PlotEPotential(Figure):
-    def __init__(self, direction='z', output=True, title='Local Potential', xlabel='Position (Å)', ylabel='Energy (eV)',
-                 **kargs):
+    """
+    Plot the planar average (and macroscopic average) of the electrostatic potential
+
+    Args:
+        direction (str | Sequence[int]): x, y, z or the Miller indices (hkl) of the lattice planes
+        macroscopic (float | Sequence[float]): window periods (unit: Å) of the macroscopic average, default: None
+        output (bool): whether or not save the planar (and macroscopic) average to VLINE
+    """
+
+    def __init__(self, direction='z', macroscopic=None, output=True, title='Local Potential', xlabel='Position (Å)',
+                 ylabel='Energy (eV)', **kargs):
         super().__init__(title=title, xlabel=xlabel, ylabel=ylabel, **kargs)
-        self.lpotential = LOCPOT(name='LOCPOT').line_potential(direction=direction)
+        locpot = LOCPOT(name='LOCPOT')
+        self.lpotential = locpot.line_potential(direction=direction)  # streamed, the grid is not loaded
+        self.macroscopic = None
+        if macroscopic is not None:
+            self.macroscopic = macroscopic_average(self.lpotential[1], locpot.period(direction), macroscopic)
 
         if output:
-            pos, value = self.lpotential
-            lpotential2col = np.concatenate((pos.reshape(-1, 1), value.reshape(-1, 1)), axis=1)
-            np.savetxt('VLINE', lpotential2col, fmt='%.6f', delimiter='\t')
+            columns = [*self.lpotential] + ([self.macroscopic] if self.macroscopic is not None else [])
+            np.savetxt('VLINE', np.column_stack(columns), fmt='%.6f', delimiter='\t')
 
     @plot_wrapper
     def plot(self):
@@ -385,12 +421,14 @@ class PlotEPotential(Figure):
         Plot Electrostatic Potential
         """
         plt.plot(*self.lpotential)
+        if self.macroscopic is not None:
+            plt.plot(self.lpotential[0], self.macroscopic, linestyle='--')
 
 
 class PlotCCD(Figure):
     def __init__(self, direction='z', xlabel='Position along z-axis (Å)', ylabel='Charge density (e/Å)', **kargs):
         super().__init__(xlabel=xlabel, ylabel=ylabel, **kargs)
-        self.lpotential = CHGCAR_diff(name='CHGCAR_diff').line_potential(direction=direction)
+        self.lpotential = CHGCAR_diff(name='CHGCAR_diff').line_potential(direction=direction)  # streamed
 
     @plot_wrapper
     def plot(self):
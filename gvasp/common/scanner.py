@@ -0,0 +1,200 @@
+"""
+Single-pass streaming scanner of large text outputs (e.g., OUTCAR)
+
+The file is read once in large binary chunks, only the lines containing one of the registered markers are decoded and
+dispatched to their handlers, so the memory is independent of the file size.
+"""
+import logging
+import re
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+
+class _Incomplete(Exception):
+    """the following lines of a marked line are not written yet"""
+
+
+class MarkerScanner:
+    """
+    Event-driven scanner, dispatch the lines containing registered marker substrings to handlers
+
+    Handler signature: handler(line: str, scanner: MarkerScanner), during the dispatch:
+        scanner.line_number:    index of the line in file (start from 0)
+        scanner.offset:         byte offset of the line in file
+        scanner.lines(n):       consume and return the next n lines (List[str]), their markers are not dispatched
+        scanner.stop():         stop the scan after the current line
+
+    Args:
+        chunk_size (int): bytes read from file at once
+    """
+
+    def __init__(self, chunk_size=1 << 23):
+        self.chunk_size = chunk_size
+        self.handlers = {}
+        self.line_number = 0
+        self.offset = 0
+
+        self._pattern = None
+        self._file = None
+        self._buffer = b''
+        self._base = 0  # file offset of self._buffer[0]
+        self._cursor = 0  # end of the current line (or consumed lines) in self._buffer
+        self._counted = 0  # newlines before self._counted in self._buffer have been counted
+        self._eof = False
+        self._stop = False
+        self._final = True
+
+    def register(self, marker, handler):
+        """
+        Register a handler for the lines containing marker
+
+        Args:
+            marker (str): marker substring
+            handler (Callable[[str, MarkerScanner], None]): called in file order
+        """
+        self.handlers.setdefault(marker.encode(), []).append(handler)
+        self._pattern = None
+        return self
+
+    def scan(self, name, offset=0, line_number=0, final=True):
+        """
+        Stream the file from offset and dispatch the marked lines
+
+        Args:
+            name (str | Path): file name
+            offset (int): byte offset to start, should be the beginning of a line
+            line_number (int): line index of offset
+            final (bool): whether or not the file is complete, if False (e.g., running job), the last line without
+                          newline is left, and the marked line whose following lines are not written is rolled back
+
+        Returns:
+            end (int): byte offset after the last scanned line, self.line_number is the line index of end
+        """
+        if self._pattern is None:
+            self._pattern = re.compile(b'|'.join(re.escape(marker) for marker in self.handlers))
+
+        self._buffer, self._base, self._cursor, self._counted, self._eof = b'', offset, 0, 0, False
+        self._stop, self._final = False, final
+        self.line_number = line_number
+        with open(name, 'rb') as self._file:
+            self._file.seek(offset)
+            try:
+                end = self._dispatch()
+            except _Incomplete:
+                end = self.offset - self._base
+        self._file = None
+        return self._base + end
+
+    def _dispatch(self):
+        while True:
+            limit = self._buffer.rfind(b'\n') + 1 if not (self._eof and self._final) else len(self._buffer)
+            match = self._pattern.search(self._buffer, self._cursor, limit) if self.handlers else None
+            if match is None:
+                if self._eof:
+                    self._count(limit)
+                    return limit
+                self._count(limit)
+                self._buffer, self._base = self._buffer[limit:], self._base + limit
+                self._cursor, self._counted = 0, 0
+                self._read()
+                continue
+
+            start = self._buffer.rfind(b'\n', 0, match.start()) + 1
+            end = self._buffer.find(b'\n', match.start())
+            end = len(self._buffer) if end == -1 else end + 1
+            self._count(start)
+            self.offset = self._base + start
+            self._cursor = end
+
+            raw = self._buffer[start:end]
+            line = raw.decode(errors='replace')
+            for marker, handlers in self.handlers.items():
+                if marker in raw:
+                    for handler in handlers:
+                        handler(line, self)
+            if self._stop:
+                self._count(self._cursor)
+                return self._cursor
+
+    def lines(self, count):
+        """
+        Consume and return the next count lines after the current one, less if the file is finished
+        """
+        lines = []
+        while len(lines) < count:
+            end = self._buffer.find(b'\n', self._cursor)
+            if end == -1:
+                if not self._eof:
+                    self._read()
+                    continue
+                if not self._final:
+                    raise _Incomplete
+                if self._cursor < len(self._buffer):
+                    lines.append(self._buffer[self._cursor:].decode(errors='replace'))
+                    self._cursor = len(self._buffer)
+                break
+            lines.append(self._buffer[self._cursor:end + 1].decode(errors='replace'))
+            self._cursor = end + 1
+        return lines
+
+    def stop(self):
+        self._stop = True
+
+    def _read(self):
+        data = self._file.read(self.chunk_size)
+        if data:
+            self._buffer += data
+        else:
+            self._eof = True
+
+    def _count(self, position):
+        if position > self._counted:
+            self.line_number += self._buffer.count(b'\n', self._counted, position)
+            self._counted = position
+
+
+def reverse_lines(name, block_size=1 << 16):
+    """
+    Yield the lines of a file from EOF to the beginning, read backwards in blocks
+
+    Args:
+        name (str | Path): file name
+        block_size (int): bytes read backwards at once
+
+    Returns:
+        lines (Generator[str]): last line first, same lines as `reversed(f.readlines())`
+    """
+    with open(name, 'rb') as f:
+        position = f.seek(0, 2)
+        buffer, end = b'', 0
+        while True:
+            cut = buffer.rfind(b'\n', 0, end - 1) if end > 1 else -1
+            if cut != -1:
+                yield buffer[cut + 1:end].decode(errors='replace')
+                end = cut + 1
+            elif position > 0:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                buffer = f.read(step) + buffer[:end]
+                end = len(buffer)
+            else:
+                if end:
+                    yield buffer[:end].decode(errors='replace')
+                return
+
+
+def tail_lines(name, count, block_size=1 << 16):
+    """
+    Read the last count lines of a file by seeking backwards from EOF
+
+    Args:
+        name (str | Path): file name
+        count (int): number of lines
+        block_size (int): bytes read backwards at once
+
+    Returns:
+        lines (List[str]): last count lines (less if the file is short), same as `f.readlines()[-count:]`
+    """
+    return list(islice(reverse_lines(name, block_size), count))[::-1]
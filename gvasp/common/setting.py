@@ -24,6 +24,9 @@ class ConfigManager:
         self.logdir = None
         self.UValue = None
         self.scheduler = None
+        self.cache = None
+        self.cache_size = None
+        self.precision = None
 
         self.load()
 
@@ -35,6 +38,8 @@ class ConfigManager:
                f'! scheduler:      {self.scheduler.stem} \n' \
                f'! PotDir:         {self.potdir} \n' \
                f'! LogDir:         {self.logdir} \n' \
+               f'! GridCache:      {"on" if self.cache else "off"} ({self.cache_size} MB) \n' \
+               f'! GridPrecision:  {self.precision} \n' \
                f'------------------------------------------------------------------------------------------'
 
     def load(self):
@@ -81,6 +86,13 @@ class ConfigManager:
         # specify the scheduler
         self.scheduler = config.get('scheduler', 'slurm')
 
+        # specify the sidecar cache of the parsed grids (opt-in) and its size cap (unit: MB)
+        self.cache = bool(config.get('cache', False))
+        self.cache_size = float(config.get('cache_size', 2048))
+
+        # specify the precision of the loaded (and cached) grids, float32 halves the memory
+        self.precision = config.get('precision', 'float64')
+
     def __setattr__(self, key, value):
         if key == 'scheduler' and self.config_dir is not None:
             scheduler_path = self.config_dir / f'{value}.submit'
@@ -94,7 +106,8 @@ class ConfigManager:
     @property
     def dict(self):
         return {'config_dir': self.config_dir, 'INCAR': self.template, 'potdir': self.potdir, 'logdir': self.logdir,
-                'UValue': self.UValue, 'scheduler': self.scheduler.stem}
+                'UValue': self.UValue, 'scheduler': self.scheduler.stem, 'cache': self.cache,
+                'cache_size': self.cache_size, 'precision': self.precision}
 
     def write(self):
         shutil.copyfile(f'{RootDir}/config.json', f'{RootDir}/config_ori.json')
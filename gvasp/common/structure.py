@@ -192,6 +192,18 @@ class Structure:
         logger.debug(f'Handle the {name}')
         with open(name) as f:
             cfg = f.readlines()
+        return Structure.from_string(cfg)
+
+    @staticmethod
+    def from_string(cfg):
+        """
+        Construct a Structure instance from POSCAR-format lines, the lines after the coordinates are ignored
+
+        Args:
+            cfg (List[str]): POSCAR-format lines, e.g., the head of CHGCAR or LOCPOT
+
+        Returns: Structure instance
+        """
         lattice = Lattice.from_string(cfg[2:5])
 
         formula = [(name, int(count)) for name, count in zip(cfg[5].split(), cfg[6].split())]
@@ -257,7 +269,8 @@ class Structure:
         atoms.set_coord(structure.lattice)
         return Structure(atoms=atoms, lattice=structure.lattice)
 
-    def write_POSCAR(self, name, title=None, factor=1.0):
+    def to_string(self, title=None, factor=1.0):
+        """POSCAR-format text of the structure, e.g., the head of CHGCAR_sum"""
         title = title if title is not None else 'AutoGenerated'
         lattice = self.lattice.strings
         elements = [(key, str(len(list(value)))) for key, value in itertools.groupby(self.atoms.formula)]
@@ -269,17 +282,12 @@ class Structure:
             coords = ''.join([coord + '\t' + '   '.join(selective_matrix) + '\n' for coord, selective_matrix in
                               zip(coords.split('\n'), self.atoms.selective_matrix)])
 
+        return f'{title}\n{factor}\n{lattice}{element_name}\n{element_count}\n' + \
+            ('Selective Dynamics\n' if selective else '') + f'Direct\n{coords}\n\n'
+
+    def write_POSCAR(self, name, title=None, factor=1.0):
         with open(name, 'w') as f:
-            f.write(f'{title}\n')
-            f.write(f'{factor}\n')
-            f.write(lattice)
-            f.write(f'{element_name}\n')
-            f.write(f'{element_count}\n')
-            if selective:
-                f.write('Selective Dynamics\n')
-            f.write('Direct\n')
-            f.write(coords)
-            f.write('\n\n')
+            f.write(self.to_string(title=title, factor=factor))
 
         logger.debug(f'{name} write finished!')
 
@@ -308,3 +316,125 @@ class NeighbourTable(defaultdict):
     @property
     def coordination(self):
         return np.array([sum([value[3] for value in values]) for _, values in self.items()])
+
+
+class Trajectory:
+    """
+    Trajectory (MD or optimization) stored in one contiguous array, the <Structure> of a frame is built on demand
+
+    Attributes:
+        element (List[str]): formula of each atom
+        frac_coord (np.ndarray): fractional coordinates of all frames, shape=(n_frames, n_atoms, 3)
+        lattice (Lattice): lattice of the first frame
+        lattices (np.ndarray | None): lattice matrix of each frame, shape=(n_frames, 3, 3), None for the fixed cell
+
+    Indexing: trajectory[i] --> Structure, trajectory[i:j:k] (or index array) --> Trajectory
+    """
+
+    def __init__(self, element, frac_coord, lattice, lattices=None):
+        self.element = element
+        self.frac_coord = frac_coord
+        self.lattice = lattice
+        self.lattices = lattices
+
+    def __len__(self):
+        return len(self.frac_coord)
+
+    def __repr__(self):
+        return f'<Trajectory | frames={len(self)}, atoms={len(self.element)}, ' \
+               f'cell={"fixed" if self.lattices is None else "variable"}>'
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            frac_coord = self.frac_coord[index].copy()
+            atoms = Atoms(formula=self.element, frac_coord=frac_coord)
+            return Structure(atoms=atoms, lattice=self.get_lattice(index))
+
+        lattices = self.lattices[index] if self.lattices is not None else None
+        lattice = Lattice(lattices[0]) if lattices is not None and len(lattices) else self.lattice
+        return Trajectory(self.element, self.frac_coord[index], lattice, lattices)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def get_lattice(self, index):
+        """lattice of the index-th frame"""
+        return self.lattice if self.lattices is None else Lattice(self.lattices[index])
+
+    @property
+    def cart_coord(self):
+        """cartesian coordinates of all frames, shape=(n_frames, n_atoms, 3)"""
+        if self.lattices is None:
+            return self.frac_coord @ self.lattice.matrix
+        return np.einsum('fij,fjk->fik', self.frac_coord, self.lattices)
+
+    @staticmethod
+    def from_XDATCAR(name, chunk_size=1 << 23):
+        """
+        Stream the XDATCAR in chunks, only the coordinates are parsed (in bulk) into the preallocated array, the
+        repeated header of the variable cell (e.g., ISIF = 3) is recognized, an incomplete last frame (running job)
+        is ignored
+
+        Args:
+            name (str | Path): name of XDATCAR
+            chunk_size (int): bytes read from file at once
+
+        Returns:
+            trajectory (Trajectory): Trajectory instance
+        """
+        logger.debug(f'Handle the {name}')
+        size = os.path.getsize(name)
+        with open(name, 'rb') as f:
+            head = [f.readline().decode() for _ in range(7)]
+            lattice = Lattice.from_string(head[2:5])
+            element = sum([[name] * int(count) for name, count in zip(head[5].split(), head[6].split())], [])
+            n_atoms = len(element)
+
+            coord, count, lattices, matrix, variable = None, 0, [], lattice.matrix, False
+            lines, index, pending = [], 0, b''
+            while True:
+                data = f.read(chunk_size)
+                lines = lines[index:] + (pending + data).split(b'\n')
+                pending = lines.pop() if data else b''
+                index = 0
+
+                blocks = []
+                while True:
+                    while index < len(lines) and not lines[index].strip():
+                        index += 1
+                    if index >= len(lines):
+                        break
+                    if b'Direct' in lines[index]:
+                        start = index + 1
+                    else:  # repeated header of the variable cell
+                        if index + 8 > len(lines):
+                            break
+                        matrix = Lattice.from_string([line.decode() for line in lines[index + 2:index + 5]]).matrix
+                        variable, start = True, index + 8
+                    if start + n_atoms > len(lines):
+                        break
+                    blocks.append(b' '.join(lines[start:start + n_atoms]))
+                    lattices.append(matrix)
+                    index = start + n_atoms
+
+                if len(blocks):
+                    values = np.fromstring(b' '.join(blocks), sep=' ').reshape((len(blocks), n_atoms, 3))
+                    if coord is None:  # estimate the number of frames from the size of first frame
+                        capacity = max(size // (len(blocks[0]) + 30), 1) + len(blocks)
+                        coord = np.empty((capacity, n_atoms, 3))
+                    if count + len(values) > len(coord):
+                        coord.resize((max(2 * len(coord), count + len(values)), n_atoms, 3), refcheck=False)
+                    coord[count:count + len(values)] = values
+                    count += len(values)
+
+                if not data:
+                    break
+
+            if any(line.strip() for line in lines[index:]):
+                logger.warning(f'The last frame of {name} is incomplete, ignore it')
+
+        if coord is None:
+            coord = np.empty((0, n_atoms, 3))
+        coord.resize((count, n_atoms, 3), refcheck=False)
+        return Trajectory(element, coord, lattice, np.array(lattices) if variable else None)
@@ -3,6 +3,7 @@ import copy
 import logging
 import os
 import shutil
+import time
 from functools import wraps
 from pathlib import Path
 
@@ -13,10 +14,11 @@ from seekpath import get_path
 from gvasp.common.utils import str_list
 from gvasp.common.base import Atom
 from gvasp.common.constant import GREEN, YELLOW, RESET, RED
-from gvasp.common.error import XSDFileNotFoundError, TooManyXSDFileError, ConstrainError
-from gvasp.common.file import POSCAR, OUTCAR, ARCFile, XSDFile, KPOINTS, POTCAR, XDATCAR, CHGCAR, AECCAR0, AECCAR2, \
-    CHGCAR_mag, INCAR, SubmitFile, CONTCAR, Fort188File
+from gvasp.common.error import XSDFileNotFoundError, TooManyXSDFileError, ConstrainError, ParameterError
+from gvasp.common.file import POSCAR, OUTCAR, ARCFile, XSDFile, KPOINTS, POTCAR, XDATCAR, CHGCAR, CHGCAR_mag, INCAR, \
+    SubmitFile, CONTCAR, Fort188File, CHGBase, GridFile
 from gvasp.common.setting import WorkDir, ConfigManager
+from gvasp.common.volumetric import combine
 from gvasp.neb.path import IdppPath, LinearPath
 
 logger = logging.getLogger(__name__)
@@ -545,19 +547,133 @@ class ChargeTask(NormalTask):
     @staticmethod
     def sum():
         """
-        sum AECCAR0 and AECCAR2 to CHGCAR_sum
+        sum AECCAR0 and AECCAR2 to CHGCAR_sum, streamed block by block with constant memory
         """
-        aeccar0 = AECCAR0('AECCAR0')
-        aeccar2 = AECCAR2('AECCAR2')
-        chgcar_sum = aeccar0 + aeccar2
-        chgcar_sum.write()
+        combine(names=('AECCAR0', 'AECCAR2'), coefficients=(1., 1.), output='CHGCAR_sum')
 
     @staticmethod
-    def to_grd(name='vasp.grd', Dencut=250):
+    def diff(files, coefficients=None, output='CHGCAR_diff', average=None, resample=False):
         """
-        transform CHGCAR_mag to grd file
+        linear combination of grid files to CHGCAR_diff, e.g., CHGCAR_AB - CHGCAR_A - CHGCAR_B, streamed block by block
+        with constant memory, the planar averages along average directions are saved to <output>_<direction>.dat
+
+        @param:
+            files:          grid files, e.g., (CHGCAR_AB, CHGCAR_A, CHGCAR_B)
+            coefficients:   coefficient of each file, default: 1 for the first file and -1 for the others
+            output:         output file name, default: CHGCAR_diff
+            average:        directions of the planar averages, e.g., 'z' or 'xyz', default: None
+            resample:       whether or not resample the grids of different NGrid onto the NGrid of the first file
+        """
+        coefficients = [1.] + [-1.] * (len(files) - 1) if coefficients is None else coefficients
+        result = CHGBase.combine(files, coefficients, output=output, average=bool(average), resample=resample)
+        for direction in average or '':
+            distance, value = result.line_potential(direction=direction)
+            np.savetxt(f'{output}_{direction}.dat', np.column_stack((distance, value)), fmt='%.6e',
+                       header=f'distance average_{direction}')
+            logger.info(f'Planar average along {direction} has been saved to {output}_{direction}.dat')
+
+    @staticmethod
+    def to_grd(name='vasp.grd', Dencut=250, source='CHGCAR_mag', block=0, stride=1, compress=None):
+        """
+        transform one grid block of source (default: CHGCAR_mag) to grd file, every stride-th grid point is exported,
+        compressed by gzip or xz if compress
+        """
+        name = GridFile.from_file(source).to_grd(name=name, DenCut=Dencut, block=block, stride=stride,
+                                                 compress=compress)
+        logger.info(f'{source} has been transformed to {name}')
+
+    @staticmethod
+    def integrate(source='CHGCAR', radius=None, output='ACF_integrate.dat'):
         """
-        CHGCAR_mag('CHGCAR_mag').to_grd(name=name, DenCut=Dencut)
+        integrate the charge (and magnetization) density of source over the periodic Voronoi cell (or within radius)
+        of each atom in process, a quick estimation without the bader program, the result is saved to output in the
+        layout of ACF.dat (readable by ACFFile), the magnetic moments follow the charge column for ISPIN = 2, only the
+        magnetic moments (MAGNETIZATION column) are integrated for CHGCAR_mag
+
+        @param:
+            source:     charge density file, e.g., CHGCAR (charge and magnetic moment), CHGCAR_tot or CHGCAR_mag, the
+                        other grids (e.g., LOCPOT) raise ParameterError
+            radius:     cutoff radius (unit: Å) of all atoms (float), of each element (dict, e.g., {'Ce': 1.5}), or
+                        their command-line strings (e.g., ['1.2'] or ['Ce:1.5', 'O:0.8']), default: None (Voronoi)
+            output:     output file name, default: ACF_integrate.dat
+
+        @return:
+            integrals:  integral of each grid block over each atom, shape=(n_blocks, n_atoms)
+            volumes:    volume of the region of each atom (unit: Å^3)
+        """
+        if isinstance(radius, (list, tuple)):
+            radius = ChargeTask._radius(radius)
+
+        grid_file = GridFile.from_file(source)
+        if not isinstance(grid_file, CHGBase):
+            raise ParameterError(f'{source} is not a charge density file, only CHGCAR-like grids can be integrated')
+        quantity, summary = ('MAGNETIZATION', 'TOTAL MAGNETIZATION') if isinstance(grid_file, CHGCAR_mag) else \
+            ('CHARGE', 'NUMBER OF ELECTRONS')
+
+        grid_file.load()
+        integrals, volumes = grid_file.integrate(radii=radius)
+        structure = grid_file.structure
+        cart_coord = structure.atoms.frac_coord @ structure.lattice.matrix
+        total = np.mean(grid_file.planar_average(direction='z')[1])
+
+        columns = [quantity] + {1: [], 2: ['MAGNETIZATION'], 4: ['MAG_X', 'MAG_Y', 'MAG_Z']}.get(len(integrals), [])
+        columns = (columns + [f'BLOCK_{block}' for block in range(len(columns), len(integrals))])[:len(integrals)]
+        with open(output, 'w') as f:
+            f.write(f"{'#':>5}{'X':>12}{'Y':>12}{'Z':>12}" + ''.join(f'{name:>15}' for name in columns) +
+                    f"{'ATOMIC VOL':>15}\n")
+            f.write('-' * (41 + 15 * (len(columns) + 1)) + '\n')
+            for order, (coord, values, volume) in enumerate(zip(cart_coord, integrals.T, volumes)):
+                f.write(f'{order + 1:>5}' + ''.join(f'{item:>12.4f}' for item in coord) +
+                        ''.join(f'{item:>15.4f}' for item in values) + f'{volume:>15.4f}\n')
+            f.write('-' * (41 + 15 * (len(columns) + 1)) + '\n')
+            f.write(f'{f"VACUUM {quantity}:":>30}{total - integrals[0].sum():>15.4f}\n')
+            f.write(f'{"VACUUM VOLUME:":>30}{max(structure.lattice.volume - volumes.sum(), 0.):>15.4f}\n')
+            f.write(f'{f"{summary}:":>30}{total:>15.4f}\n')
+        logger.info(f'Atomic integrals of {source} have been saved to {output}')
+        return integrals, volumes
+
+    @staticmethod
+    def _radius(tokens):
+        """parse the command-line radius, one bare float (e.g., ['1.2']) or `El:r` tokens (e.g., ['Ce:1.5', 'O:0.8'])"""
+        radius = {}
+        for token in tokens:
+            pair = token.split(':')
+            try:
+                if len(pair) == 1 and len(tokens) == 1:
+                    return float(pair[0])
+                if len(pair) != 2 or not pair[0]:
+                    raise ValueError
+                radius[pair[0]] = float(pair[1])
+            except ValueError:
+                raise ParameterError(f'Invalid radius `{token}` in {list(tokens)}, should be one float (e.g., 1.2) or '
+                                     f'only `El:r` items (e.g., Ce:1.5 O:0.8)') from None
+        return radius
+
+    @staticmethod
+    def isosurface(source='CHGCAR_mag', isovalues=(0.01,), block=0, format='ply', scale=None):
+        """
+        export the isosurfaces of one grid block of source (default: CHGCAR_mag) as the triangle meshes, one file per
+        isovalue, e.g., CHGCAR_mag_0.01.ply, loadable by VESTA-like viewers, ParaView or Blender
+
+        @param:
+            source:     grid file, e.g., CHGCAR_mag, CHGCAR_diff, CHGCAR, LOCPOT
+            isovalues:  isovalues of the density (unit: e/Å^3, as VESTA) or of the potential (unit: eV, LOCPOT), a
+                        negative isovalue encloses the region below it, e.g., (0.01, -0.01) for the spin up and down
+                        (or accumulation and depletion) lobes
+            block:      index of the grid block, 0: total density (or potential), 1: magnetization density
+            format:     'ply' (binary) or 'obj'
+            scale:      factor from isovalues to the unit of grid, default: the lattice volume for the charge density
+                        (the grid stores density * volume), 1 for the others (e.g., LOCPOT)
+
+        @return:
+            names:      name of the mesh file of each isovalue
+        """
+        grid_file = GridFile.from_file(source)
+        if scale is None:
+            scale = grid_file.structure.lattice.volume if isinstance(grid_file, CHGBase) else 1.
+        names = grid_file.isosurface(isovalues, block=block, format=format, scale=scale)
+        logger.info(f'Isosurfaces of {source} have been saved to {", ".join(names)}')
+        return names
 
 
 class WorkFuncTask(NormalTask):
@@ -899,19 +1015,48 @@ class NEBTask(BaseTask, Animatable):
         logger.info("All structures don't have overlap")
 
     @staticmethod
-    def monitor():
+    def monitor(follow=False, interval=10.):
         """
         Monitor tangent, energy and barrier in the NEB-task
+
+        @param:
+            follow:     if True, keep polling the images' OUTCAR (only the appended bytes are parsed) and print the table
+                        when any image finishes a new ionic step, until all images are finished or Ctrl-C
+            interval:   poll interval (unit: s) of the follow mode
         """
         neb_dirs = NEBTask._search_neb_dir()
+        if not follow:
+            status = [OUTCAR.status(f'{image}/OUTCAR') for image in neb_dirs]
+            NEBTask._print_monitor(neb_dirs, [(item.energy, item.tangent) for item in status])
+            return
+
+        outcars = [OUTCAR(f'{image}/OUTCAR') for image in neb_dirs]
+        steps = None
+        try:
+            while True:
+                for outcar in outcars:
+                    outcar.update()
+                if steps != [len(outcar.energy) for outcar in outcars]:
+                    steps = [len(outcar.energy) for outcar in outcars]
+                    NEBTask._print_monitor(neb_dirs, [(outcar.last_energy, outcar.last_tangent) for outcar in outcars])
+                if all(outcar.finish for outcar in outcars):
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+    @staticmethod
+    def _print_monitor(neb_dirs, values):
+        """
+        Print the tangent, energy and barrier of the last ionic step, values: List[(energy, tangent)] of the images
+        """
         ini_energy = 0.
         print('image   tangent          energy       barrier')
-        for image in neb_dirs:
-            outcar = OUTCAR(f'{image}/OUTCAR')
+        for image, (energy, tangent) in zip(neb_dirs, values):
             if not int(image.stem):
-                ini_energy = outcar.last_energy
-            barrier = outcar.last_energy - ini_energy
-            print(f' {image.stem} \t {outcar.last_tangent:>10.6f} \t {outcar.last_energy} \t {barrier:.6f}')
+                ini_energy = energy
+            barrier = energy - ini_energy if energy is not None and ini_energy is not None else float('nan')
+            print(f' {image.stem} \t {tangent:>10.6f} \t {energy} \t {barrier:.6f}')
 
     @staticmethod
     def movie(name='movie.arc', file='CONTCAR', workdir=None):
@@ -0,0 +1,628 @@
+"""
+Block-aware engine of the VASP volumetric format (CHGCAR, AECCAR*, LOCPOT, CHGCAR_*, ...)
+
+The file is indexed once (POSCAR head, byte offsets of every grid block and its augmentation occupancies), afterwards
+the header or one grid block (e.g., total or magnetization density) is read without touching the rest of the file.
+"""
+import gzip
+import logging
+import lzma
+import os
+from collections import namedtuple
+
+import numpy as np
+import scipy.fft
+from scipy.spatial import cKDTree
+
+from gvasp.common.error import StructureNotEqualError, GridNotEqualError
+from gvasp.common.structure import Structure
+from gvasp.lib import file_bind
+
+logger = logging.getLogger(__name__)
+
+GridBlock = namedtuple('GridBlock', ('header', 'begin', 'end', 'NGX', 'NGY', 'NGZ'))
+
+Compressors = {'gzip': ('.gz', lambda name, mode: gzip.open(name, mode, compresslevel=6)),
+               'xz': ('.xz', lambda name, mode: lzma.open(name, mode))}
+
+
+def grid_dtype(dtype=None):
+    """
+    Normalize the precision of the grid, float64 (default) or float32 (half memory, ~7 significant digits)
+    """
+    dtype = np.dtype(np.float64 if dtype is None else dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError(f'precision of the grid should be float32 or float64, got {dtype}')
+    return dtype
+
+
+def compressed_name(name, compress=None):
+    """
+    Output name with the suffix of compression, e.g., CHGCAR.gz for gzip
+    """
+    if compress is None:
+        return str(name)
+    if compress not in Compressors:
+        raise ValueError(f'compress should be one of {list(Compressors)} or None, got {compress!r}')
+    suffix = Compressors[compress][0]
+    return str(name) if str(name).endswith(suffix) else f'{name}{suffix}'
+
+
+def _write_compressed(name, grid, head, compress, append=False, grd=False, cutoff=0., threads=0):
+    """format the grid natively by blocks and stream them to the compressed file"""
+    with Compressors[compress][1](name, 'ab' if append else 'wb') as f:
+        f.write(head.encode())
+        file_bind.format_grid(grid, f.write, grd, cutoff, threads)
+
+
+def write_grid(name, grid, head='', append=False, threads=0, compress=None):
+    """
+    Write the head, `NGX NGY NGZ` line and grid in VASP layout (x fastest, 5 values per line), the values are formatted
+    natively by threads (`%18.11E`) from the array in place (no Fortran-order copy) and streamed in blocks
+
+    Args:
+        name (str | Path): output file name
+        grid (np.ndarray): grid data (float64 or float32), shape=(NGX, NGY, NGZ)
+        head (str): text before the grid, e.g., the POSCAR part
+        append (bool): append to the file instead of overwrite
+        threads (int): number of format threads, 0 means decided by the grid size
+        compress (str): None, 'gzip' or 'xz', the formatted blocks are compressed while streamed and the suffix
+                        (.gz, .xz) is appended to name
+
+    Returns:
+        name (str): output file name
+    """
+    grid = np.asarray(grid)
+    if grid.ndim != 3:
+        raise ValueError(f'grid should be a 3-dimensional array, got shape={grid.shape}')
+    NGX, NGY, NGZ = grid.shape
+    name, head = compressed_name(name, compress), f'{head}{NGX:>5}{NGY:>5}{NGZ:>5}\n'
+    if compress is None:
+        file_bind.write_grid(name, grid, head, append, threads)
+    else:
+        _write_compressed(name, grid, head, compress, append=append, threads=threads)
+    return name
+
+
+def check_compatible(indices, grid=True):
+    """
+    Check the structure and NGrid of the volumetric files are equal, only their heads are read
+
+    Args:
+        indices (List[VolumetricIndex]): indices of the files
+        grid (bool): whether or not check the NGrid
+    """
+    reference = indices[0]
+    for index in indices[1:]:
+        if index.structure != reference.structure:
+            raise StructureNotEqualError(f'{index.name}.structure is not equal to {reference.name}.structure')
+        if grid and index.NGrid != reference.NGrid:
+            raise GridNotEqualError(f'{index.name}.NGrid is not equal to {reference.name}.NGrid')
+
+
+def combine(names, coefficients, output, title=None, blocks=None, average=False, threads=0, resample=False):
+    """
+    Stream the linear combination sum(coefficients[k] * grid[k]) of the grid blocks of files to output, the inputs are
+    read in lockstep by chunks and the result is written as it goes, so the memory is a few MB regardless of the grid
+    size, the planar averages of the result are accumulated in the same pass if average; the files of different NGrid
+    (e.g., fragments run with another ENCUT) are combined in memory after their Fourier interpolation if resample
+
+    Args:
+        names (Sequence[str | Path]): volumetric files, e.g., AECCAR0 and AECCAR2
+        coefficients (Sequence[float]): coefficient of each file
+        output (str | Path | None): output file name, the head is the structure of the first file, None: not written
+        title (str): title of the output, default: AutoGenerated
+        blocks (Sequence[int]): grid block of each file, default: the first block (total density or potential)
+        average (bool): whether or not return the planar averages
+        threads (int): number of format threads, 0 means decided by the grid size
+        resample (bool): whether or not resample the grids of different NGrid onto the NGrid of the first file
+
+    Returns:
+        averages (Tuple[np.ndarray] | None): planar averages of the result along x, y, z, shape=(NGX,), (NGY,), (NGZ,)
+    """
+    if len(names) != len(coefficients):
+        raise ValueError(f'{len(names)} files but {len(coefficients)} coefficients')
+    blocks = [0] * len(names) if blocks is None else blocks
+    indices = [VolumetricIndex.from_file(name) for name in names]
+    check_compatible(indices, grid=not resample)
+    reference = indices[0]
+    NGX, NGY, NGZ = reference.NGrid
+    head = f'{reference.structure.to_string(title=title)}{NGX:>5}{NGY:>5}{NGZ:>5}\n' if output is not None else ''
+    inputs = []
+    for index, block in zip(indices, blocks):
+        if not 0 <= block < len(index):
+            raise IndexError(f'{index.name} has {len(index)} grid block(s), block {block} is out of range')
+        inputs.append((str(index.name), index.blocks[block].begin, index.blocks[block].end))
+    if any(index.NGrid != reference.NGrid for index in indices):
+        logger.warning(f'NGrid of {[str(index.name) for index in indices]} are not equal, resampled to '
+                       f'{reference.NGrid} of {reference.name} in memory')
+        grids = [resample_grid(index.read(block=block, threads=threads), reference.NGrid)
+                 for index, block in zip(indices, blocks)]
+        grid = linear_combination(grids, coefficients)
+        if output is not None:
+            write_grid(output, grid, head=reference.structure.to_string(title=title), threads=threads)
+        return tuple(grid_average(grid, axis) for axis in range(3)) if average else None
+    sums = file_bind.combine(inputs, [float(coefficient) for coefficient in coefficients], reference.NGrid,
+                             '' if output is None else str(output), head, average, threads)
+    if sums is None:
+        return None
+    return sums[:NGX] / (NGY * NGZ), sums[NGX:NGX + NGY] / (NGX * NGZ), sums[NGX + NGY:] / (NGX * NGY)
+
+
+def linear_combination(grids, coefficients, out=None, chunk_size=1 << 22):
+    """
+    sum(coefficients[k] * grids[k]) of the grids in memory or memory-mapped (np.memmap), evaluated slab by slab along
+    z, so the temporaries are bounded by chunk_size and a memory-mapped out is filled without loading the inputs
+
+    Args:
+        grids (Sequence[np.ndarray]): grids of the same shape=(NGX, NGY, NGZ)
+        coefficients (Sequence[float]): coefficient of each grid
+        out (np.ndarray): array of the result (e.g., np.memmap), default: a new array in memory
+        chunk_size (int): grid points evaluated at once
+
+    Returns:
+        out (np.ndarray): linear combination, shape=(NGX, NGY, NGZ)
+    """
+    if len(grids) != len(coefficients) or not len(grids):
+        raise ValueError(f'{len(grids)} grid(s) are given with {len(coefficients)} coefficient(s)')
+    shape = grids[0].shape
+    if any(grid.shape != shape for grid in grids):
+        raise GridNotEqualError(f'shapes of the grids are not equal: {[grid.shape for grid in grids]}')
+    out = np.empty(shape, dtype=np.result_type(*grids), order='F') if out is None else out
+    step = max(1, chunk_size // (shape[0] * shape[1]))
+    for begin in range(0, shape[2], step):
+        slab = slice(begin, begin + step)
+        value = np.multiply(coefficients[0], grids[0][:, :, slab], dtype=out.dtype)
+        for grid, coefficient in zip(grids[1:], coefficients[1:]):
+            value += coefficient * grid[:, :, slab]
+        out[:, :, slab] = value
+    return out
+
+
+def grid_average(grid, axis, chunk_size=1 << 22):
+    """
+    Planar average of a grid in memory or memory-mapped (np.memmap) along one axis, accumulated slab by slab along z
+    in float64, so the in-memory and out-of-core grids give identical results
+
+    Args:
+        grid (np.ndarray): grid data, shape=(NGX, NGY, NGZ)
+        axis (int): 0, 1, 2 for x, y, z
+        chunk_size (int): grid points accumulated at once
+
+    Returns:
+        average (np.ndarray): planar average, shape=(NG[axis],)
+    """
+    NGX, NGY, NGZ = grid.shape
+    step = max(1, chunk_size // (NGX * NGY))
+    sums = np.zeros(grid.shape[axis])
+    for begin in range(0, NGZ, step):
+        slab = grid[:, :, begin:begin + step]
+        if axis == 2:
+            sums[begin:begin + slab.shape[2]] = slab.sum(axis=(0, 1), dtype=np.float64)
+        else:
+            sums += slab.sum(axis=(1 - axis, 2), dtype=np.float64)
+    return sums * grid.shape[axis] / grid.size
+
+
+def resample_grid(grid, NGrid, workers=-1):
+    """
+    Fourier interpolation of a periodic grid onto NGrid, e.g., the grids of different ENCUT; the real FFT along each
+    axis of different size is zero-padded (upsampling) or truncated (downsampling) in reciprocal space and the Nyquist
+    component is split or folded, so the result is real and the values on the common grid points are kept
+
+    Args:
+        grid (np.ndarray): grid data (float64 or float32), shape=(NGX, NGY, NGZ)
+        NGrid (Sequence[int]): target (NGX, NGY, NGZ)
+        workers (int): number of FFT threads, -1: all CPUs
+
+    Returns:
+        grid (np.ndarray): resampled grid of the same dtype, shape=NGrid
+    """
+    grid = np.asarray(grid)
+    dtype, NGrid = grid.dtype, tuple(int(NG) for NG in NGrid)
+    if len(NGrid) != 3 or min(NGrid) < 1:
+        raise ValueError(f'NGrid should be three positive integers, got {NGrid}')
+    for axis, (old, new) in enumerate(zip(grid.shape, NGrid)):
+        if old == new:
+            continue
+        spectrum = scipy.fft.rfft(grid, axis=axis, workers=workers)
+        shape = list(spectrum.shape)
+        shape[axis] = new // 2 + 1
+        common = min(old, new)
+        index = [slice(None)] * 3
+        index[axis] = slice(0, common // 2 + 1)
+        resampled = np.zeros(shape, dtype=spectrum.dtype)
+        resampled[tuple(index)] = spectrum[tuple(index)]
+        del spectrum
+        if common % 2 == 0:  # Nyquist of the smaller grid: folded from +/- frequencies, or split to them
+            index[axis] = common // 2
+            resampled[tuple(index)] *= 2. if new < old else .5
+        grid = scipy.fft.irfft(resampled, n=new, axis=axis, workers=workers)
+        grid *= new / old
+    return grid.astype(dtype, copy=False)
+
+
+def planar_averages(name, block=0):
+    """
+    Planar averages of one grid block along x, y and z, accumulated by the native reader while parsing, the grid is
+    not kept (memory: a few MB regardless of the grid size)
+
+    Args:
+        name (str | Path): volumetric file, e.g., LOCPOT
+        block (int): index of the grid block, 0: total (or potential), 1: magnetization (ISPIN = 2)
+
+    Returns:
+        averages (Tuple[np.ndarray]): planar averages along x, y, z, shape=(NGX,), (NGY,), (NGZ,)
+    """
+    return combine((name,), (1.,), None, blocks=(block,), average=True)
+
+
+def interplanar_distance(lattice, hkl):
+    """
+    Distance between the adjacent lattice planes (hkl), i.e., the period of the average normal to them
+
+    Args:
+        lattice (Lattice): lattice of the grid
+        hkl (Sequence[int]): Miller indices, reduced by their greatest common divisor
+
+    Returns:
+        distance (float): d_hkl (unit: Å)
+    """
+    hkl = _reduce_hkl(hkl)
+    return 1. / np.linalg.norm(lattice.inverse @ hkl)
+
+
+def _reduce_hkl(hkl):
+    hkl = np.asarray(hkl)
+    if hkl.shape != (3,) or not np.issubdtype(hkl.dtype, np.integer) or not hkl.any():
+        raise ValueError(f'hkl should be three integers (not all zero), got {hkl!r}')
+    return hkl // np.gcd.reduce(np.abs(hkl))
+
+
+def lattice_average(grid, lattice, hkl, bins=None, chunk_size=1 << 22):
+    """
+    Average of the grid over the lattice planes (hkl) as a function of the distance along their normal, the grid
+    points are binned by their phase h * x / NGX + k * y / NGY + l * z / NGZ (mod 1) slab by slab, so no full-size
+    temporary is allocated; (001) is the planar average along z for the orthogonal c-axis
+
+    Args:
+        grid (np.ndarray): grid data, shape=(NGX, NGY, NGZ)
+        lattice (Lattice): lattice of the grid
+        hkl (Sequence[int]): Miller indices of the planes
+        bins (int): number of points in one period, default: number of distinct phases (every grid point is exactly
+                    on a plane of bins)
+        chunk_size (int): grid points binned at once
+
+    Returns:
+        distance (np.ndarray): distance along the plane normal in [0, d_hkl), shape=(bins,)
+        average (np.ndarray): average over each plane, shape=(bins,)
+    """
+    hkl = _reduce_hkl(hkl)
+    NGrid = np.array(grid.shape)
+    period = np.lcm.reduce([NG // np.gcd(h, NG) for h, NG in zip(hkl, NGrid) if h])
+    if bins is None:
+        bins = int(period)
+        weights = [h * period // NG for h, NG in zip(hkl, NGrid)]  # exact integer phase * bins
+    else:
+        weights = [h * period / NG for h, NG in zip(hkl, NGrid)]
+
+    x, y = np.ogrid[:NGrid[0], :NGrid[1]]
+    plane = weights[0] * x + weights[1] * y
+    step = max(1, chunk_size // (NGrid[0] * NGrid[1]))
+    sums, counts = np.zeros(bins), np.zeros(bins)
+    for begin in range(0, NGrid[2], step):
+        z = np.arange(begin, min(begin + step, NGrid[2]))
+        phase = plane[:, :, None] + weights[2] * z
+        if bins == period and np.issubdtype(phase.dtype, np.integer):
+            index = phase % bins
+        else:
+            index = np.floor((phase % period) * bins / period + 0.5).astype(np.int64) % bins
+        sums += np.bincount(index.ravel(), weights=grid[:, :, z[0]:z[-1] + 1].ravel(), minlength=bins)
+        counts += np.bincount(index.ravel(), minlength=bins)
+    distance = np.arange(bins) * interplanar_distance(lattice, hkl) / bins
+    with np.errstate(invalid='ignore'):
+        return distance, sums / counts
+
+
+def macroscopic_average(average, length, periods):
+    """
+    Macroscopic average of a planar average by the (double) convolution with the box windows of periods, performed by
+    FFT in the periodic cell, e.g., one period for a homogeneous slab, two periods for an interface of two materials
+
+    Args:
+        average (np.ndarray): planar average on the uniform periodic grid of the axis
+        length (float): length of the cell along the axis (unit: Å)
+        periods (float | Sequence[float]): width of the windows (unit: Å), e.g., the interlayer distances
+
+    Returns:
+        macroscopic (np.ndarray): macroscopic average, same shape as average
+    """
+    average = np.asarray(average, dtype=float)
+    frequency = np.fft.rfftfreq(len(average), d=length / len(average))  # unit: 1/Å
+    spectrum = np.fft.rfft(average)
+    for period in np.atleast_1d(periods):
+        spectrum *= np.sinc(frequency * period)  # Fourier transform of the normalized box window
+    return np.fft.irfft(spectrum, n=len(average))
+
+
+def integrate_atoms(grids, lattice, frac_coord, radii=None, chunk_size=1 << 20, workers=-1):
+    """
+    Integrate the grids (e.g., total and magnetization density) over the region of each atom, every grid point is
+    assigned to its nearest atom (periodic Voronoi cell) by a KD-tree of the atoms and their 26 neighbour images, or
+    dropped if it is farther than the radius of that atom; the points are generated and assigned slab by slab along z,
+    so the time is linear in the grid size and the memory is bounded by chunk_size
+
+    Args:
+        grids (Sequence[np.ndarray]): grids of the same shape=(NGX, NGY, NGZ) in VASP convention (value * volume),
+                                      in memory or memory-mapped
+        lattice (Lattice): lattice of the grids
+        frac_coord (np.ndarray): fractional coordinates of the atoms, shape=(n_atoms, 3)
+        radii (np.ndarray): radius of each atom (unit: Å), default: None (Voronoi cell without cutoff)
+        chunk_size (int): grid points assigned at once
+        workers (int): number of KD-tree query threads, -1: all CPUs
+
+    Returns:
+        integrals (np.ndarray): integral of each grid over each atom, shape=(n_grids, n_atoms), e.g., the number of
+                                electrons (total density) or the magnetic moment (magnetization density)
+        volumes (np.ndarray): volume of the region of each atom (unit: Å^3), shape=(n_atoms,)
+    """
+    NGrid = grids[0].shape
+    if any(grid.shape != NGrid for grid in grids):
+        raise GridNotEqualError(f'shapes of the grids are not equal: {[grid.shape for grid in grids]}')
+    matrix, frac_coord = lattice.matrix, np.asarray(frac_coord, dtype=float) % 1.
+    natoms = len(frac_coord)
+    radii = None if radii is None else np.broadcast_to(np.asarray(radii, dtype=float), (natoms,))
+
+    images = np.array(np.meshgrid((-1, 0, 1), (-1, 0, 1), (-1, 0, 1), indexing='ij')).reshape(3, -1).T
+    tree = cKDTree(((frac_coord[None, :, :] + images[:, None, :]) @ matrix).reshape(-1, 3))
+    owner = np.tile(np.arange(natoms), len(images))
+
+    NGX, NGY, NGZ = NGrid
+    plane = (np.arange(NGX)[:, None, None] / NGX * matrix[0] + np.arange(NGY)[None, :, None] / NGY * matrix[1])
+    step = max(1, chunk_size // (NGX * NGY))
+    integrals, counts = np.zeros((len(grids), natoms)), np.zeros(natoms)
+    for begin in range(0, NGZ, step):
+        z = np.arange(begin, min(begin + step, NGZ))
+        points = plane[:, :, None, :] + (z[:, None] / NGZ * matrix[2])[None, None, :, :]
+        distance, index = tree.query(points.reshape(-1, 3), workers=workers)
+        atom = owner[index]
+        inside = slice(None) if radii is None else distance <= radii[atom]
+        atom = atom[inside]
+        for integral, grid in zip(integrals, grids):
+            integral += np.bincount(atom, weights=grid[:, :, z[0]:z[-1] + 1].reshape(-1)[inside], minlength=natoms)
+        counts += np.bincount(atom, minlength=natoms)
+    return integrals / np.prod(NGrid), counts * lattice.volume / np.prod(NGrid)
+
+
+def write_grd(name, grid, lattice, DenCut=-1, threads=0, NGrid=None, origin=(0, 0, 0), compress=None):
+    """
+    Write the grid in *.grd format (one value per line, `%12.5E`), the DenCut filter is applied while the values are
+    formatted natively by threads from the array in place (loaded or memory-mapped) and streamed in blocks
+
+    Args:
+        name (str | Path): name of grd file
+        grid (np.ndarray): grid data, shape=(NGX, NGY, NGZ)
+        lattice (Lattice): lattice of the grid
+        DenCut (float): |density| lower than DenCut - 100 will be set to zero (default: -1: disable the DenCut option)
+        threads (int): number of format threads, 0 means decided by the grid size
+        NGrid (Sequence[int]): grid points of the whole cell at the sampling of grid, default: grid.shape
+        origin (Sequence[int]): index of grid[0, 0, 0] in the whole cell, e.g., the offset of a box
+        compress (str): None, 'gzip' or 'xz', the suffix (.gz, .xz) is appended to name
+
+    Returns:
+        name (str): name of grd file
+    """
+    grid = np.asarray(grid)
+    if grid.ndim != 3:
+        raise ValueError(f'grid should be a 3-dimensional array, got shape={grid.shape}')
+    NGX, NGY, NGZ = grid.shape if NGrid is None else NGrid
+    (x0, y0, z0), (nx, ny, nz) = origin, grid.shape
+    head = 'VASP charge density\n(1p,e12.5)\n' + \
+           ''.join(f'  {item:.3f}' for item in (*lattice.length, *lattice.angle)) + '\n' + \
+           f'  {NGX - 1}  {NGY - 1}  {NGZ - 1}\n' + \
+           f'{1:>5}{x0:>5}{x0 + nx - 1:>5}{y0:>5}{y0 + ny - 1:>5}{z0:>5}{z0 + nz - 1:>5}\n'
+    name, cutoff = compressed_name(name, compress), DenCut - 100 if DenCut != -1 else 0.
+    if compress is None:
+        file_bind.to_grd(name, grid, head, cutoff, threads)
+    else:
+        _write_compressed(name, grid, head, compress, grd=True, cutoff=cutoff, threads=threads)
+    return name
+
+
+def grid_box(NGrid, box=None, stride=1):
+    """
+    Normalize the box and stride of a grid to the index ranges
+
+    Args:
+        NGrid (Sequence[int]): (NGX, NGY, NGZ)
+        box (Sequence[Tuple[int, int] | slice | None]): index range [start, stop) along x, y, z (negative index counts
+                                                        from the end), None: whole axis
+        stride (int | Sequence[int]): take every stride-th point along x, y, z
+
+    Returns:
+        lo, hi, step (List[int]): start, stop and step along x, y, z
+    """
+    box = (None, None, None) if box is None else box
+    stride = (stride,) * 3 if np.isscalar(stride) else stride
+    if len(box) != 3 or len(stride) != 3:
+        raise ValueError(f'box and stride should be given along x, y, z, got box={box}, stride={stride}')
+    lo, hi, step = [], [], []
+    for NG, item, every in zip(NGrid, box, stride):
+        item = item if isinstance(item, slice) else slice(*item) if item is not None else slice(None)
+        if item.step not in (None, 1):
+            raise ValueError('the step of box is specified by stride')
+        start, stop, _ = item.indices(NG)
+        if start >= stop or int(every) < 1:
+            raise ValueError(f'empty box {box} or invalid stride {stride} of the grid {tuple(NGrid)}')
+        lo.append(start), hi.append(stop), step.append(int(every))
+    return lo, hi, step
+
+
+class VolumetricIndex:
+    """
+    Byte-offset index of a volumetric file
+
+    Attributes:
+        name (str): file name
+        head (int): offset of the first `NGX NGY NGZ` line, [0, head) is the POSCAR part
+        blocks (List[GridBlock]): grid blocks, 0: total (or potential), 1: magnetization (ISPIN = 2), ...
+        augmentation (List[Tuple[int, int]]): [begin, end) of the augmentation occupancies after each block
+    """
+    _cache = {}
+
+    def __init__(self, name):
+        self.name = name
+        stat = os.stat(name)
+        self._stamp = (stat.st_size, stat.st_mtime_ns)
+
+        index = file_bind.index(str(name))
+        self.head = index.head
+        self.blocks = [GridBlock(*block) for block in index.blocks]
+        self.augmentation = [tuple(section) for section in index.augmentation]
+
+        self._head_strings = None
+        self._structure = None
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __repr__(self):
+        return f"<VolumetricIndex | name='{self.name}', NGrid={self.NGrid}, blocks={len(self)}>"
+
+    @classmethod
+    def from_file(cls, name):
+        """
+        Obtain the index of file, reuse the previous one if the file is not changed (same size && mtime)
+
+        Args:
+            name (str | Path): file name
+
+        Returns:
+            index (VolumetricIndex): index of the file
+        """
+        key = os.path.abspath(name)
+        stat = os.stat(name)
+        index = cls._cache.get(key)
+        if index is None or index._stamp != (stat.st_size, stat.st_mtime_ns):
+            logger.debug(f'Index the {name}')
+            index = cls._cache[key] = cls(name)
+        return index
+
+    @property
+    def head_strings(self):
+        """POSCAR part and the first `NGX NGY NGZ` line"""
+        if self._head_strings is None:
+            with open(self.name, 'rb') as f:
+                self._head_strings = f.read(self.blocks[0].begin).decode().splitlines(keepends=True)
+        return self._head_strings
+
+    @property
+    def structure(self):
+        if self._structure is None:
+            self._structure = Structure.from_string(self.head_strings)
+        return self._structure
+
+    @property
+    def lattice(self):
+        return self.structure.lattice
+
+    @property
+    def NGrid(self):
+        """(NGX, NGY, NGZ) of the first block"""
+        return tuple(self.blocks[0][3:])
+
+    def read(self, block=0, threads=0, dtype=None):
+        """
+        Read one grid block
+
+        Args:
+            block (int): index of the grid block, 0: total (or potential), 1: magnetization (ISPIN = 2)
+            threads (int): number of parse threads, 0 means decided by the block size
+            dtype (np.dtype): float64 (default) or float32
+
+        Returns:
+            grid (np.array[:, :, :]): shape=(NGX, NGY, NGZ)
+        """
+        return self.read_blocks(blocks=(block,), threads=threads, dtype=dtype)[0]
+
+    def read_blocks(self, blocks=None, threads=0, dtype=None):
+        """
+        Read several grid blocks in one pass, the blocks are parsed concurrently from one mapping of the file
+
+        Args:
+            blocks (Sequence[int]): indices of the grid blocks, default: all blocks
+            threads (int): number of parse threads, 0 means decided by the blocks size
+            dtype (np.dtype): float64 (default) or float32, float32 values are stored directly by the parser (no
+                              float64 intermediate)
+
+        Returns:
+            grids (List[np.array[:, :, :]]): shape=(NGX, NGY, NGZ) of each block
+        """
+        blocks = range(len(self)) if blocks is None else blocks
+        for block in blocks:
+            if not -len(self) <= block < len(self):
+                raise IndexError(f'{self.name} has {len(self)} grid block(s), block {block} is out of range')
+        selected = [self.blocks[block] for block in blocks]
+        grids = file_bind.read_blocks(str(self.name), [(begin, end, NGX, NGY, NGZ) for _, begin, end, NGX, NGY, NGZ in
+                                                      selected], threads, grid_dtype(dtype) == np.float32)
+        return [grid.reshape(block[3:], order='F') for grid, block in zip(grids, selected)]
+
+    def read_box(self, block=0, box=None, stride=1, threads=0, dtype=None):
+        """
+        Read the strided box of one grid block, the values outside the box are skipped by the native reader (only the
+        lines holding the selected rows are parsed)
+
+        Args:
+            block (int): index of the grid block, 0: total (or potential), 1: magnetization (ISPIN = 2)
+            box (Sequence[Tuple[int, int] | slice | None]): index range [start, stop) along x, y, z, None: whole axis,
+                                                            e.g., (None, None, (40, 80)) for a z-range
+            stride (int | Sequence[int]): take every stride-th point along x, y, z
+            threads (int): number of parse threads, 0 means decided by the box size
+            dtype (np.dtype): float64 (default) or float32
+
+        Returns:
+            grid (np.array[:, :, :]): subgrid, shape=(nx, ny, nz)
+            offset (Tuple[int]): index of grid[0, 0, 0] in the block
+        """
+        if not -len(self) <= block < len(self):
+            raise IndexError(f'{self.name} has {len(self)} grid block(s), block {block} is out of range')
+        _, begin, end, NGX, NGY, NGZ = self.blocks[block]
+        lo, hi, step = grid_box((NGX, NGY, NGZ), box, stride)
+        grid = file_bind.read_box(str(self.name), (begin, end, NGX, NGY, NGZ), lo, hi, step, threads,
+                                  grid_dtype(dtype) == np.float32)
+        shape = [len(range(*item)) for item in zip(lo, hi, step)]
+        return grid.reshape(shape, order='F'), tuple(lo)
+
+    def read_into(self, out, block=0, threads=0):
+        """
+        Parse one grid block straight into a preallocated array, e.g., np.memmap of a raw binary file for the grids
+        larger than memory (no intermediate array)
+
+        Args:
+            out (np.ndarray): float64 or float32 array, shape=(NGX, NGY, NGZ) in Fortran order
+            block (int): index of the grid block, 0: total (or potential), 1: magnetization (ISPIN = 2)
+            threads (int): number of parse threads, 0 means decided by the block size
+
+        Returns:
+            out (np.ndarray): the filled array
+        """
+        if not -len(self) <= block < len(self):
+            raise IndexError(f'{self.name} has {len(self)} grid block(s), block {block} is out of range')
+        _, begin, end, NGX, NGY, NGZ = self.blocks[block]
+        if out.shape != (NGX, NGY, NGZ) or not out.flags.f_contiguous:
+            raise ValueError(f'out should be a Fortran-order array of shape={(NGX, NGY, NGZ)}, got {out.shape}')
+        file_bind.read_into(str(self.name), (begin, end, NGX, NGY, NGZ), out.reshape(-1, order='F'), threads)
+        return out
+
+    def split(self, names, blocks=None):
+        """
+        Write each grid block with the POSCAR head to its own file, the byte ranges are copied without decoding
+
+        Args:
+            names (Sequence[str]): output file names
+            blocks (Sequence[int]): indices of the grid blocks, default: the first len(names) blocks
+        """
+        blocks = range(len(names)) if blocks is None else blocks
+        for name, block in zip(names, blocks):
+            _, begin, end, *_ = self.blocks[block]
+            file_bind.copy_ranges(str(self.name), str(name), [(0, self.blocks[0].begin), (begin, end)])
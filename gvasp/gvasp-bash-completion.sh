@@ -346,9 +346,9 @@ _gvasp_plot_normal() { # gvasp plot [opt, band, op, dos, PES, neb]
   elif [[ "$pre" =~ "-" ]]; then
     opts=""
   elif [[ "$ppre" =~ "-j" || "$ppre" =~ "--json" ]]; then
-    opts="--save --show"
+    opts="--save --show --follow --interval"
   else
-    opts="-h --help -j --json --show --save"
+    opts="-h --help -j --json --show --save --follow --interval"
   fi
   COMPREPLY=($(compgen $fileshow -W "$opts" -- $cur))
 }
@@ -390,29 +390,107 @@ _gvasp_split() {
   COMPREPLY=($(compgen -W "$opts" -- $cur))
 }
 
+_gvasp_diff() { # gvasp diff completion
+  local pre cur opts
+
+  COMPREPLY=()
+  pre=${COMP_WORDS[COMP_CWORD - 1]}
+  cur=${COMP_WORDS[COMP_CWORD]}
+
+  if [[ "$pre" =~ "-o" || "$pre" =~ "--output" ]]; then
+    COMPREPLY=($(compgen -f -- $cur))
+    return
+  elif [[ "$pre" =~ "-a" || "$pre" =~ "--average" ]]; then
+    opts="x y z xyz"
+  elif [[ "$pre" =~ "-c" || "$pre" =~ "--coefficients" ]]; then
+    opts=""
+  else
+    opts="-h --help -c --coefficients -o --output -a --average -r --resample"
+    COMPREPLY=($(compgen -f -W "$opts" -- $cur))
+    return
+  fi
+
+  COMPREPLY=($(compgen -W "$opts" -- $cur))
+}
+
+_gvasp_integrate() { # gvasp integrate completion
+  local pre cur opts
+
+  COMPREPLY=()
+  pre=${COMP_WORDS[COMP_CWORD - 1]}
+  cur=${COMP_WORDS[COMP_CWORD]}
+
+  if [[ "$pre" == "-i" || "$pre" == "--input" || "$pre" == "-o" || "$pre" == "--output" ]]; then
+    COMPREPLY=($(compgen -f -- $cur))
+    return
+  elif [[ "$pre" == "-r" || "$pre" == "--radius" ]]; then
+    opts=""
+  else
+    opts="-h --help -i --input -r --radius -o --output"
+  fi
+
+  COMPREPLY=($(compgen -W "$opts" -- $cur))
+}
+
+_gvasp_isosurface() { # gvasp isosurface completion
+  local pre cur opts
+
+  COMPREPLY=()
+  pre=${COMP_WORDS[COMP_CWORD - 1]}
+  cur=${COMP_WORDS[COMP_CWORD]}
+
+  if [[ "$pre" == "-i" || "$pre" == "--input" ]]; then
+    COMPREPLY=($(compgen -f -- $cur))
+    return
+  elif [[ "$pre" == "-f" || "$pre" == "--format" ]]; then
+    opts="ply obj"
+  elif [[ "$pre" == "-v" || "$pre" == "--isovalues" || "$pre" == "-b" || "$pre" == "--block" || "$pre" == "-s" ||
+    "$pre" == "--scale" ]]; then
+    opts=""
+  else
+    opts="-h --help -i --input -v --isovalues -b --block -f --format -s --scale"
+  fi
+
+  COMPREPLY=($(compgen -W "$opts" -- $cur))
+}
+
 _gvasp_grd() { # gvasp grd completion
   local pre cur opts
 
   COMPREPLY=()
   pre=${COMP_WORDS[COMP_CWORD - 1]}
-  ppre=${COMP_WORDS[COMP_CWORD - 2]}
   cur=${COMP_WORDS[COMP_CWORD]}
 
-  if [[ $COMP_CWORD -ge 6 ]]; then
-    echo -e "\n${RED}Two arguments maximum!${RESET}"
+  if [[ "$pre" =~ "-i" || "$pre" =~ "--input" ]]; then
+    COMPREPLY=($(compgen -f -- $cur))
+    return
+  elif [[ "$pre" == "-z" || "$pre" == "--compress" ]]; then
+    opts="gzip xz"
   elif [[ "$pre" =~ "-" ]]; then
     opts=""
-  elif [[ "$ppre" =~ "-d" || "$ppre" =~ "--DenCut" ]]; then
-    opts="-n --name"
-  elif [[ "$ppre" =~ "-n" || "$ppre" =~ "--name" ]]; then
-    opts="-d --DenCut"
   else
-    opts="-h --help -n --name -d --DenCut"
+    opts="-h --help -n --name -d --DenCut -i --input -b --block -s --stride -z --compress"
   fi
 
   COMPREPLY=($(compgen -W "$opts" -- $cur))
 }
 
+_gvasp_cache() { # gvasp cache completion
+  local pre cur opts
+
+  COMPREPLY=()
+  pre=${COMP_WORDS[COMP_CWORD - 1]}
+  cur=${COMP_WORDS[COMP_CWORD]}
+
+  if [[ "$pre" =~ "-D" || "$pre" =~ "--directory" ]]; then
+    opts=""
+    COMPREPLY=($(compgen -o dirnames -W "$opts" -- $cur))
+  else
+    opts="-h --help -D --directory -c --clear"
+    COMPREPLY=($(compgen -W "$opts" -- $cur))
+  fi
+}
+
 _gvasp_output() {
   local pre cur opts
 
@@ -476,7 +554,7 @@ _gvasp() {
   if [ -z "$command" ]; then # gvasp command completion
     COMPREPLY=()
     cur=${COMP_WORDS[COMP_CWORD]}
-    opts="config submit output movie sort plot sum split grd -h --help -v --version -l --list -d"
+    opts="config submit output movie sort plot sum diff integrate isosurface split grd cache -h --help -v --version -l --list -d"
     COMPREPLY=($(compgen -W "$opts" -- $cur))
   else
     case "$command" in # gvasp subcommand completion
@@ -495,7 +573,11 @@ _gvasp() {
     movie-*) _gvasp_movie_normal ;;
     sort) _gvasp_sort ;;
     sum | split) _gvasp_split ;;
+    diff) _gvasp_diff ;;
+    integrate) _gvasp_integrate ;;
+    isosurface) _gvasp_isosurface ;;
     grd) _gvasp_grd ;;
+    cache) _gvasp_cache ;;
     plot) _gvasp_plot ;;
     plot-*) _gvasp_plot_normal ;;
     esac
@@ -12,6 +12,7 @@ from typing import Iterable
 from toolsy.logger import init_root_logger
 
 from gvasp.common.error import ArgsNotRegisteredError
+from gvasp.common.cache import GridCache
 from gvasp.common.calculator import surface_energy, electrostatic_energy, thermo_adsorbent
 from gvasp.common.constant import RED, RESET, Version, Platform, GREEN, YELLOW, LOGO, BOLD
 from gvasp.common.figure import Figure
@@ -107,6 +108,9 @@ def main_parser() -> argparse.ArgumentParser:
     display_plot_group = plot_parser.add_mutually_exclusive_group()
     display_plot_group.add_argument('--show', action='store_true', help='show figure')
     display_plot_group.add_argument('--save', action='store_true', help='save figure')
+    plot_parser.add_argument('--follow', action='store_true',
+                             help='follow the running job and re-plot for new ionic steps (only for opt task)')
+    plot_parser.add_argument('--interval', type=float, default=10., help='poll interval (unit: s) of follow mode')
     plot_parser.set_defaults(which='plot')
 
     # band-center parser
@@ -118,16 +122,69 @@ def main_parser() -> argparse.ArgumentParser:
     sum_parser = subparsers.add_parser(name='sum', help='sum AECCAR0 and AECCAR2 to CHGCAR_sum')
     sum_parser.set_defaults(which='sum')
 
+    # diff parser
+    diff_parser = subparsers.add_parser(name='diff', help='linear combination of grid files, e.g., AB - A - B')
+    diff_parser.add_argument('files', nargs='+', type=str, help='specify the grid files, e.g., CHGCAR_AB CHGCAR_A CHGCAR_B')
+    diff_parser.add_argument('-c', '--coefficients', nargs='+', type=float,
+                             help='specify the coefficient of each file, default: 1 -1 -1 ...')
+    diff_parser.add_argument('-o', '--output', default='CHGCAR_diff', type=str, help='specify the output name')
+    diff_parser.add_argument('-a', '--average', type=str,
+                             help='save the planar averages along the directions, e.g., z or xyz')
+    diff_parser.add_argument('-r', '--resample', action='store_true',
+                             help='resample the grids of different NGrid (e.g., ENCUT) onto NGrid of the first file')
+    diff_parser.set_defaults(which='diff')
+
+    # integrate parser
+    integrate_parser = subparsers.add_parser(name='integrate', help='integrate the charge (and spin) of each atom')
+    integrate_parser.add_argument('-i', '--input', default='CHGCAR', type=str,
+                                  help='specify the grid file, e.g., CHGCAR, CHGCAR_tot, CHGCAR_mag')
+    integrate_parser.add_argument('-r', '--radius', nargs='+', type=str,
+                                  help='cutoff radius (unit: Å) of all atoms (e.g., 1.2) or of elements '
+                                       '(e.g., Ce:1.5 O:0.8), default: periodic Voronoi cell')
+    integrate_parser.add_argument('-o', '--output', default='ACF_integrate.dat', type=str,
+                                  help='specify the output name')
+    integrate_parser.set_defaults(which='integrate')
+
+    # isosurface parser
+    isosurface_parser = subparsers.add_parser(name='isosurface', help='export the isosurfaces of grid file to meshes')
+    isosurface_parser.add_argument('-i', '--input', default='CHGCAR_mag', type=str,
+                                   help='specify the grid file, e.g., CHGCAR_mag, CHGCAR_diff, CHGCAR')
+    isosurface_parser.add_argument('-v', '--isovalues', nargs='+', default=[0.01], type=float,
+                                   help='isovalues (unit: e/Å^3 for density, eV for LOCPOT), a negative one encloses '
+                                        'the region below it, e.g., 0.01 -0.01')
+    isosurface_parser.add_argument('-b', '--block', default=0, type=int,
+                                   help='specify the grid block, 0: total (or potential), 1: magnetization')
+    isosurface_parser.add_argument('-f', '--format', default='ply', choices=['ply', 'obj'],
+                                   help='mesh format, ply (binary) or obj')
+    isosurface_parser.add_argument('-s', '--scale', default=None, type=float,
+                                   help='factor from isovalues to the grid unit, default: cell volume for density '
+                                        '(grid = rho * V), 1 for LOCPOT')
+    isosurface_parser.set_defaults(which='isosurface')
+
     # split parser
     split_parser = subparsers.add_parser(name='split', help='split CHGCAR to CHGCAR_mag and CHGCAR_tot')
     split_parser.set_defaults(which='split')
 
     # grd parser
-    grd_parser = subparsers.add_parser(name='grd', help='transform CHGCAR_mag to *.grd file')
+    grd_parser = subparsers.add_parser(name='grd', help='transform CHGCAR_mag (or other grid file) to *.grd file')
     grd_parser.add_argument('-n', '--name', default='vasp.grd', type=str, help='specify the name of *.grd')
     grd_parser.add_argument('-d', '--DenCut', default=250, type=int, help='specify the cutoff density')
+    grd_parser.add_argument('-i', '--input', default='CHGCAR_mag', type=str,
+                            help='specify the grid file, e.g., CHGCAR_mag, CHGCAR, CHGCAR_sum, LOCPOT')
+    grd_parser.add_argument('-b', '--block', default=0, type=int,
+                            help='specify the grid block, 0: total (or potential), 1: magnetization')
+    grd_parser.add_argument('-s', '--stride', default=1, type=int,
+                            help='take every stride-th grid point, e.g., 2 for a quick look of a large cell')
+    grd_parser.add_argument('-z', '--compress', default=None, choices=['gzip', 'xz'],
+                            help='compress the *.grd file (vasp.grd.gz or vasp.grd.xz)')
     grd_parser.set_defaults(which='grd')
 
+    # cache parser
+    cache_parser = subparsers.add_parser(name='cache', help='inspect or clear the sidecar cache of parsed grids')
+    cache_parser.add_argument('-D', '--directory', default='.', type=str, help='specify the directory of grid files')
+    cache_parser.add_argument('-c', '--clear', action='store_true', help='clear the cache')
+    cache_parser.set_defaults(which='cache')
+
     # calc parser
     calc_parser = subparsers.add_parser(name='calc', help='various calculation utils')
     calc_parser.add_argument('task', type=int,
@@ -371,7 +428,10 @@ def main(argv=None):
                 plotter = PlotOpt(**arguments)
                 if color_lack:
                     colors = ('#ed0345', '#009734')
-                plotter.plot(color=colors)
+                if args.follow:
+                    plotter.follow(color=colors, interval=args.interval, name=args.name if args.save else None)
+                else:
+                    plotter.plot(color=colors)
             elif args.task == 'ep':
                 plotter = PlotEPotential(**arguments)
                 plotter.plot()
@@ -429,7 +489,7 @@ def main(argv=None):
                 if 'linux' in Platform.lower():
                     logger.warning(f'Linux platform may not support figure `show`, if fail, use `save` substitute')
                 Figure.show()
-            if args.save:
+            if args.save and not (args.task == 'opt' and args.follow):  # follow mode saves after every re-plot
                 Figure.save(name=args.name)
                 logger.info(f'Figure has been saved as `{args.name}`, please check')
 
@@ -461,11 +521,31 @@ def main(argv=None):
         elif args.which == 'sum':  # sum task
             ChargeTask.sum()
 
+        elif args.which == 'diff':  # diff task
+            ChargeTask.diff(files=args.files, coefficients=args.coefficients, output=args.output, average=args.average,
+                            resample=args.resample)
+
+        elif args.which == 'integrate':  # integrate task
+            ChargeTask.integrate(source=args.input, radius=args.radius, output=args.output)
+
+        elif args.which == 'isosurface':  # isosurface task
+            ChargeTask.isosurface(source=args.input, isovalues=args.isovalues, block=args.block, format=args.format,
+                                  scale=args.scale)
+
         elif args.which == 'split':  # split task
             ChargeTask.split()
 
         elif args.which == 'grd':  # grd task
-            ChargeTask.to_grd(name=args.name, Dencut=args.DenCut)
+            ChargeTask.to_grd(name=args.name, Dencut=args.DenCut, source=args.input, block=args.block,
+                              stride=args.stride, compress=args.compress)
+
+        elif args.which == 'cache':  # sidecar cache task
+            if args.clear:
+                GridCache.clear_all(directory=args.directory)
+                print(f'Cache of {Path(args.directory).resolve()} has been cleared')
+            else:
+                GridCache.report(directory=args.directory)
+                print(f"Cache is {'on' if Config.cache else 'off'}, capacity: {Config.cache_size} MB")
 
         elif args.which == 'calc':  # calculation utils task
             if args.task == 0:
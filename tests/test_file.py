@@ -1,17 +1,25 @@
+import gzip
 import logging
+import lzma
 import os
 import shutil
 from pathlib import Path
 
+import numpy as np
 import pytest
 
+from gvasp.common.cache import GridCache, CacheDir
 from gvasp.common.error import PotDirNotExistError, ParameterError, AnimationError, FrequencyError, \
     AttributeNotRegisteredError
 from gvasp.common.file import EIGENVAL, OUTCAR, DOSCAR
 from gvasp.common.file import MODECAR
+from gvasp.common.isosurface import isosurface
 from gvasp.common.file import MetaFile, XDATCAR, StructInfoFile, CellFile, POSCAR, SubmitFile, XSDFile, INCAR, POTCAR, \
-    CHGBase, AECCAR0, AECCAR2
+    CHGBase, AECCAR0, AECCAR2, CHGCAR, CHGCAR_sum, CHGCAR_tot, CHGCAR_diff, LOCPOT, ARCFile, load_grids, GridFile, \
+    CHGGrid
+from gvasp.common.scanner import MarkerScanner, reverse_lines, tail_lines
 from gvasp.common.setting import RootDir
+from gvasp.common.volumetric import combine, macroscopic_average, resample_grid
 from tests.utils import change_dir
 
 logger = logging.getLogger('TestLogger')
@@ -38,6 +46,51 @@ class TestMetaFile:
         logger.info(self.file.type)
 
 
+class TestXDATCAR:
+    def test_trajectory(self):
+        xdatcar = XDATCAR('XDATCAR')
+        trajectory = xdatcar.trajectory
+        assert trajectory.frac_coord.shape == (75, 38, 3) and trajectory.lattices is None
+        assert len(trajectory[::2]) == 38 and len(xdatcar) == 75
+        structure = trajectory[-1]
+        assert structure.lattice is xdatcar.lattice and structure.atoms.formula == xdatcar.element
+        with open('XDATCAR') as f:
+            lines = f.readlines()
+        assert np.allclose(trajectory.frac_coord[-1], [list(map(float, line.split())) for line in lines[-38:]])
+
+    def test_index(self, tmp_path):
+        shutil.copy('XDATCAR', tmp_path / 'XDATCAR')
+        trajectory = XDATCAR('XDATCAR').trajectory
+        xdatcar = XDATCAR(tmp_path / 'XDATCAR')
+        assert len(xdatcar) == 75 and (tmp_path / CacheDir / 'XDATCAR.frames.npz').exists()
+        assert (xdatcar[-1].atoms.frac_coord == trajectory[-1].atoms.frac_coord).all()
+        assert (xdatcar[::10].frac_coord == trajectory.frac_coord[::10]).all() and xdatcar.lattices is None
+        assert (XDATCAR(tmp_path / 'XDATCAR')[[3, 1]].frac_coord == trajectory.frac_coord[[3, 1]]).all()
+
+        with open('XDATCAR') as f:  # variable cell: every frame has its own lattice header
+            lines = f.readlines()
+        with open(tmp_path / 'XDATCAR_ISIF3', 'w') as f:
+            for frame in range(75):
+                lattice = np.array([line.split() for line in lines[2:5]], dtype=float) * [[1 + frame / 100], [1], [1]]
+                f.writelines(lines[:2] + [''.join(f'{value:12.6f}' for value in vector) + '\n' for vector in lattice])
+                f.writelines(lines[5:7] + lines[7 + frame * 39:7 + (frame + 1) * 39])
+        xdatcar = XDATCAR(tmp_path / 'XDATCAR_ISIF3')
+        assert len(xdatcar) == 75 and xdatcar.lattices.shape == (75, 3, 3)
+        assert xdatcar[50].lattice.matrix[0, 0] == pytest.approx(7.707464 * 1.5)
+        assert (xdatcar[50:].frac_coord == trajectory.frac_coord[50:]).all()
+        assert np.allclose(xdatcar.trajectory.lattices, xdatcar.lattices)
+
+    def test_movie(self, tmp_path):
+        xdatcar = XDATCAR('XDATCAR')
+        xdatcar.movie(name=tmp_path / 'movie.arc')
+        ARCFile.write(name=tmp_path / 'reference.arc', structure=list(xdatcar.trajectory[:5]), lattice=xdatcar.lattice)
+        with open(tmp_path / 'movie.arc') as f1, open(tmp_path / 'reference.arc') as f2:
+            movie, reference = f1.readlines(), f2.readlines()
+        assert len(movie) == 2 + 75 * (38 + 5)
+        assert [line for line in movie[:len(reference)] if '!DATE' not in line] == \
+               [line for line in reference if '!DATE' not in line]
+
+
 class TestStructInfoFile:
     def test_new(self):
         with pytest.raises(TypeError):
@@ -139,6 +192,12 @@ class TestCHGBase:
         with pytest.raises(TypeError):
             CHGBase(name='AECCAR0')
 
+    def test_from_file(self):
+        assert type(GridFile.from_file('AECCAR0')) is AECCAR0 and type(GridFile.from_file('LOCPOT')) is LOCPOT
+        assert type(GridFile.from_file('CHGCAR_diff_AB')) is CHGCAR_diff
+        chgcar = GridFile.from_file('CHGCAR').load()
+        assert type(chgcar) is CHGGrid and (chgcar.density == CHGCAR('CHGCAR').read_grid(block=0)).all()
+
     def test_add(self):
         aeccar0 = AECCAR0('AECCAR0')
         aeccar2 = AECCAR2('AECCAR2')
@@ -148,12 +207,302 @@ class TestCHGBase:
         aeccar2.density = None
         aeccar2 + aeccar0
 
+    def test_write(self):
+        chgcar_sum = AECCAR0('AECCAR0') + AECCAR2('AECCAR2')
+        chgcar_sum.write()
+        with open('CHGCAR_sum') as f:
+            lines = f.readlines()
+        assert lines[-2].count('E') == 5 and lines[-1].count('E') == chgcar_sum.density.size % 5  # residue
+        assert np.allclose(CHGCAR_sum('CHGCAR_sum').load(cache=False).density, chgcar_sum.density, rtol=1E-11)
+        assert CHGCAR_sum('CHGCAR_sum').structure == chgcar_sum.structure
+        os.remove('CHGCAR_sum')
+
+    def test_write_compress(self):
+        chgcar_sum = AECCAR0('AECCAR0') + AECCAR2('AECCAR2')
+        plain = Path(chgcar_sum.write()).read_bytes()
+        assert chgcar_sum.write(compress='gzip') == 'CHGCAR_sum.gz'
+        assert chgcar_sum.write(compress='xz') == 'CHGCAR_sum.xz'
+        assert gzip.decompress(Path('CHGCAR_sum.gz').read_bytes()) == plain
+        assert lzma.decompress(Path('CHGCAR_sum.xz').read_bytes()) == plain
+        chgcar_sum.density = chgcar_sum.density.astype(np.float32)  # float32 is formatted in place
+        chgcar_sum.write()
+        assert np.allclose(CHGCAR_sum('CHGCAR_sum').load(cache=False).density, chgcar_sum.density, rtol=1E-6)
+        with pytest.raises(ValueError):
+            chgcar_sum.write(compress='zip')
+        for name in ('CHGCAR_sum', 'CHGCAR_sum.gz', 'CHGCAR_sum.xz'):
+            os.remove(name)
+
+    def test_memmap(self):
+        aeccar0, aeccar2 = AECCAR0('AECCAR0').load(), AECCAR2('AECCAR2').load()
+        mapped0, mapped2 = AECCAR0('AECCAR0').load(backend='memmap'), AECCAR2('AECCAR2').load(backend='memmap')
+        assert isinstance(mapped0.density, np.memmap) and (mapped0.density == aeccar0.density).all()
+        assert len(GridCache.entries()) == 2
+
+        chgcar_sum, chgcar_diff = mapped0 + mapped2, mapped2 - mapped0
+        assert isinstance(chgcar_sum.density, np.memmap) and isinstance(chgcar_diff, CHGCAR_diff)
+        assert (chgcar_sum.density == (aeccar0 + aeccar2).density).all()
+        assert (chgcar_diff.density == (aeccar2 - aeccar0).density).all()
+        for direction in ('x', 'y', 'z'):
+            assert (chgcar_diff.line_potential(direction)[1] == (aeccar2 - aeccar0).line_potential(direction)[1]).all()
+        chgcar_diff.write()
+        mapped = Path('CHGCAR_diff').read_bytes()
+        (aeccar2 - aeccar0).write()
+        assert Path('CHGCAR_diff').read_bytes() == mapped
+        assert AECCAR0('AECCAR0').load(backend='memmap', dtype=np.float32).density.dtype == np.float32
+        with pytest.raises(ValueError):
+            AECCAR0('AECCAR0').load(backend='disk')
+        os.remove('CHGCAR_diff')
+        GridCache.clear_all()
+
+    def test_resample(self):
+        density = CHGCAR('CHGCAR').load().density_mag
+        fine = resample_grid(density, (36, 36, 26))
+        assert np.allclose(fine[::2, ::2, ::2], density, atol=1E-10)  # values on the common points are kept
+        assert np.allclose(resample_grid(fine, density.shape), density, atol=1E-10)
+        assert resample_grid(density.astype(np.float32), (17, 19, 13)).dtype == np.float32
+
+        CHGCAR('CHGCAR').split()
+        chgcar_diff = CHGCAR_tot('CHGCAR_tot') - AECCAR0('AECCAR0')  # (64, 64, 48) is resampled to (18, 18, 13)
+        expect = CHGCAR('CHGCAR').load().density_tot - resample_grid(AECCAR0('AECCAR0').load().density, (18, 18, 13))
+        assert np.allclose(chgcar_diff.density, expect)
+        combine(names=('CHGCAR_tot', 'AECCAR0'), coefficients=(1., -1.), output='CHGCAR_stream', resample=True)
+        assert np.allclose(CHGCAR_diff('CHGCAR_stream').load(cache=False).density, expect, rtol=1E-10)
+        for name in ('CHGCAR_tot', 'CHGCAR_mag', 'CHGCAR_stream'):
+            os.remove(name)
+
+    def test_load_grids(self):
+        files = load_grids([AECCAR0('AECCAR0'), AECCAR2('AECCAR2'), CHGCAR('CHGCAR'), LOCPOT('LOCPOT')], cache=False)
+        assert (files[0].density == AECCAR0('AECCAR0').load().density).all()
+        assert (files[1].density == AECCAR2('AECCAR2').load().density).all()
+        assert (files[2].density_mag == CHGCAR('CHGCAR').load().density_mag).all()
+        assert files[3].potential.shape == (18, 18, 13)
+        assert load_grids([]) == []
+
+    def test_combine(self):
+        chgcar_sum = AECCAR0('AECCAR0') + AECCAR2('AECCAR2')
+        chgcar_sum.write()
+        combine(names=('AECCAR0', 'AECCAR2'), coefficients=(1., 1.), output='CHGCAR_stream')
+        assert Path('CHGCAR_stream').read_bytes() == Path('CHGCAR_sum').read_bytes()
+        combine(names=('AECCAR2', 'AECCAR0'), coefficients=(1., -0.5), output='CHGCAR_stream')
+        assert np.allclose(CHGCAR_sum('CHGCAR_stream').load(cache=False).density,
+                           AECCAR2('AECCAR2').load().density - 0.5 * AECCAR0('AECCAR0').load().density, rtol=1E-10)
+        with pytest.raises(ValueError):
+            combine(names=('AECCAR0', 'CHGCAR'), coefficients=(1., 1.), output='CHGCAR_stream')
+        os.remove('CHGCAR_sum')
+        os.remove('CHGCAR_stream')
+
+    def test_diff(self):
+        chgcar_diff = CHGBase.combine(('AECCAR2', AECCAR0('AECCAR0')), (1., -1.), output='CHGCAR_diff', average=True)
+        density = AECCAR2('AECCAR2').load().density - AECCAR0('AECCAR0').load().density
+        assert np.allclose(CHGCAR_diff('CHGCAR_diff').load(cache=False).density, density, rtol=1E-10)
+        for axis, average in enumerate(chgcar_diff.averages):
+            assert np.allclose(average, np.mean(np.moveaxis(density, axis, -1), axis=(0, 1)))
+        assert np.allclose(chgcar_diff.line_potential('z')[1], CHGCAR_diff('CHGCAR_diff').line_potential('z')[1])
+        with pytest.raises(IndexError):
+            CHGBase.combine(('AECCAR2', 'AECCAR0'), (1., -1.), blocks=(0, 1))
+        os.remove('CHGCAR_diff')
+
+
+class TestCHGCAR:
+    def test_load(self):
+        chgcar = CHGCAR('CHGCAR').load()
+        assert chgcar.density_tot.shape == chgcar.density_mag.shape == (18, 18, 13)
+        assert chgcar.density_tot[0, 0, 0] == pytest.approx(1.00187221260E+03)
+        assert chgcar.density_mag[-1, -1, -1] == pytest.approx(-7.37391795813E+00)
+
+    def test_split(self):
+        CHGCAR('CHGCAR').split()
+        assert (AECCAR0('CHGCAR_mag').load().density == CHGCAR('CHGCAR').load().density_mag).all()
+        os.remove('CHGCAR_tot')
+        os.remove('CHGCAR_mag')
+
+    def test_index(self):
+        index = CHGCAR('CHGCAR').index
+        assert len(index) == 2
+        assert index.NGrid == (18, 18, 13)
+        assert len(index.structure.atoms) == 6
+        assert all(begin < end for begin, end in index.augmentation)
+        assert index.augmentation[0][1] < index.blocks[1].header
+        assert CHGCAR('CHGCAR').index is index
+        assert (index.read(block=1) == CHGCAR('CHGCAR').load().density_mag).all()
+
+        with pytest.raises(IndexError):
+            index.read(block=2)
+
+    def test_to_grd(self):
+        chgcar = CHGCAR('CHGCAR').load()
+        chgcar.to_grd(name='vasp.grd', block=1)
+        with open('vasp.grd') as f:
+            lines = f.readlines()
+        assert lines[3].split() == ['17', '17', '12'] and len(lines) == 5 + chgcar.NGrid
+        assert np.allclose(np.array(lines[5:], dtype=float), chgcar.density_mag.reshape(-1, order='F'), rtol=1E-5,
+                           atol=1E-5)
+        CHGCAR('CHGCAR').to_grd(name='cut.grd', DenCut=101, block=1)  # |density| < 1 is cut
+        with open('cut.grd') as f:
+            cut = np.array(f.readlines()[5:], dtype=float)
+        assert (cut[np.abs(chgcar.density_mag.reshape(-1, order='F')) < 1] == 0).all() and cut.any()
+        assert CHGCAR('CHGCAR').to_grd(name='cut.grd', DenCut=101, block=1, compress='gzip') == 'cut.grd.gz'
+        with gzip.open('cut.grd.gz', 'rt') as f:
+            assert (np.array(f.readlines()[5:], dtype=float) == cut).all()
+        os.remove('vasp.grd')
+        os.remove('cut.grd')
+        os.remove('cut.grd.gz')
+
+    def test_load_box(self):
+        chgcar = CHGCAR('CHGCAR').load(cache=False)
+        box = CHGCAR('CHGCAR').load(box=((1, -1), None, (3, 9)), stride=(3, 1, 2), cache=False)
+        assert box.offset == (1, 0, 3) and box.stride == (3, 1, 2) and box.density_tot.shape == (6, 18, 3)
+        assert (box.density_tot == chgcar.density_tot[1:-1:3, :, 3:9:2]).all()
+        assert (box.density_mag == chgcar.density_mag[1:-1:3, :, 3:9:2]).all()
+        box.to_grd(name='box.grd', block=1, stride=2)
+        with open('box.grd') as f:
+            lines = f.readlines()
+        assert lines[3].split() == ['8', '8', '6'] and len(lines) == 5 + 9 * 9 * 7
+        with pytest.raises(ValueError):
+            CHGCAR('CHGCAR').load(box=(None, None, (9, 3)))
+        os.remove('box.grd')
+
+    def test_integrate(self):
+        chgcar = CHGCAR('CHGCAR').load()
+        (charge, magnetization), volume = chgcar.integrate()
+        assert charge.sum() == pytest.approx(chgcar.density_tot.mean())
+        assert magnetization.sum() == pytest.approx(chgcar.density_mag.mean())
+        assert volume.sum() == pytest.approx(chgcar.structure.lattice.volume)
+        assert (CHGCAR('CHGCAR').integrate(blocks=(1,))[0][0] == magnetization).all()  # read without load
+
+        (cut, _), cut_volume = chgcar.integrate(radii={'Sn': 1.4, 'O': 0.9})
+        assert (cut < charge).all() and (cut_volume < volume).all()
+        assert cut_volume[0] == pytest.approx(4 / 3 * np.pi * 0.9 ** 3, rel=0.2)
+        assert (chgcar.integrate(radii=100.)[0] == chgcar.integrate()[0]).all()
+
+    def test_isosurface(self):
+        chgcar = CHGCAR('CHGCAR').load()
+        lattice, grid = chgcar.structure.lattice, chgcar.density_mag
+        isovalues = (grid.max() / 2, grid.min() / 2)
+        for vertices, faces in isosurface(grid, lattice, isovalues):
+            edges = np.concatenate((faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]))
+            pairs = set(map(tuple, edges))
+            assert len(pairs) == len(edges)  # consistently oriented
+            frac_coord = vertices @ np.linalg.inv(lattice.matrix)
+            for a, b in pairs - {(b, a) for a, b in pairs}:  # open only on the cell faces
+                face = (np.isclose(frac_coord[a], frac_coord[b]) & (np.isclose(frac_coord[a], 0) |
+                                                                     np.isclose(frac_coord[a], 1)))
+                assert face.any()
+        shifted = isosurface(np.roll(grid, (5, 7, 3), axis=(0, 1, 2)), lattice, isovalues)  # periodic wrap
+        assert [len(faces) for _, faces in shifted] == [len(faces) for _, faces in isosurface(grid, lattice, isovalues)]
+        assert len(isosurface(grid, lattice, grid.max() + 1)[0][1]) == 0
+
+        names = CHGCAR('CHGCAR').isosurface(isovalues, block=1)
+        assert names == [f'CHGCAR_{isovalue:g}.ply' for isovalue in isovalues]
+        (vertices, faces), _ = isosurface(grid, lattice, isovalues)
+        with open(names[0], 'rb') as f:
+            header = b''.join(iter(f.readline, b'end_header\n')).decode()
+            mesh = np.frombuffer(f.read(), dtype=np.uint8)
+        assert f'element vertex {len(vertices)}' in header and f'element face {len(faces)}' in header
+        assert len(mesh) == len(vertices) * 12 + len(faces) * 13
+        obj = chgcar.isosurface(isovalues[0], block=1, name='mag', format='obj')[0]
+        with open(obj) as f:
+            lines = [line.split()[0] for line in f]
+        assert lines.count('v') == len(vertices) and lines.count('f') == len(faces)
+        with pytest.raises(ValueError):
+            chgcar.isosurface(isovalues[0], block=1, format='stl')
+        for name in names + [obj]:
+            os.remove(name)
+
+    def test_read_blocks(self):
+        index = CHGCAR('CHGCAR').index
+        total, mag = index.read_blocks()
+        assert (total == index.read(block=0)).all() and (mag == index.read(block=1)).all()
+        assert (index.read_blocks(blocks=(1,))[0] == mag).all()
+        with pytest.raises(IndexError):
+            index.read_blocks(blocks=(0, 2))
+
+    def test_cache(self):
+        chgcar = CHGCAR('CHGCAR').load(cache=True)
+        cached = CHGCAR('CHGCAR').load(cache=True)
+        assert isinstance(cached.density_mag, np.memmap)
+        assert (cached.density_tot == chgcar.density_tot).all() and (cached.density_mag == chgcar.density_mag).all()
+        assert len(GridCache.entries()) == 2
+
+        os.utime('CHGCAR')  # content is not changed, keep the cache
+        assert GridCache('CHGCAR').load(block=0) is not None
+        GridCache.evict(CacheDir, capacity=0)
+        assert GridCache('CHGCAR').load(block=0) is None
+        GridCache.clear_all()
+
+    def test_precision(self):
+        chgcar = CHGCAR('CHGCAR').load(cache=False)
+        single = CHGCAR('CHGCAR').load(cache=True, dtype=np.float32)
+        assert single.density_tot.dtype == single.density_mag.dtype == np.float32
+        assert (single.density_mag == chgcar.density_mag.astype(np.float32)).all()
+        assert GridCache('CHGCAR').load(block=1, dtype=np.float64) is None  # float32 cache is not upcasted
+        assert CHGCAR('CHGCAR').load(cache=True).density_mag.dtype == np.float64
+        assert (CHGCAR('CHGCAR').load(cache=True, dtype='float32').density_mag == single.density_mag).all()
+        box = CHGCAR('CHGCAR').load(box=(None, None, (3, 9)), cache=False, dtype=np.float32)
+        assert box.density_tot.dtype == np.float32 and (box.density_tot == single.density_tot[:, :, 3:9]).all()
+        with pytest.raises(ValueError):
+            CHGCAR('CHGCAR').load(dtype=np.int32)
+        GridCache.clear_all()
+
+
+class TestLOCPOT:
+    def test_load(self):
+        locpot = LOCPOT('LOCPOT').load()
+        assert locpot.potential.shape == (18, 18, 13)
+        assert locpot.potential[0, 0, 0] == pytest.approx(-8.0)
+
+    def test_index(self):
+        index = LOCPOT('LOCPOT').index
+        assert len(index) == 1 and index.augmentation[0][0] == index.augmentation[0][1]
+        assert index.NGrid == (18, 18, 13)
+        assert index.lattice.length == pytest.approx(LOCPOT('LOCPOT').load().lattice.length)
+
+    def test_line_potential(self):
+        position, potential = LOCPOT('LOCPOT').line_potential(direction='z')
+        assert position.shape == potential.shape == (13,)
+
+    def test_load_box(self):
+        potential = LOCPOT('LOCPOT').load(cache=False).potential
+        locpot = LOCPOT('LOCPOT').load(box=(None, None, (-5, None)), stride=2, cache=False)
+        assert locpot.offset == (0, 0, 8) and (locpot.potential == potential[::2, ::2, 8::2]).all()
+        assert np.allclose(locpot.line_potential('z')[1], potential.mean(axis=(0, 1)))  # whole grid is averaged
+
+    def test_planar_average(self):
+        locpot = LOCPOT('LOCPOT')
+        grid = locpot.read_grid(cache=False)
+        for axis, direction in enumerate('xyz'):
+            average = np.mean(np.moveaxis(grid, axis, -1), axis=(0, 1))
+            assert np.allclose(locpot.planar_average(direction)[1], average)
+        assert locpot.potential is None
+        distance, average = locpot.planar_average((0, 0, 2))
+        assert np.allclose(average, np.mean(grid, axis=(0, 1))) and distance[1] == pytest.approx(3.186383 / 13)
+        distance, average = locpot.planar_average((1, 1, 0))
+        assert len(average) == 18 and distance[-1] < locpot.period((1, 1, 0)) == pytest.approx(4.73727 / 2 ** 0.5)
+        with pytest.raises(ValueError):
+            locpot.planar_average((0, 0, 0))
+
+    def test_macroscopic_average(self):
+        position = np.linspace(0, 20, 200, endpoint=False)
+        average = 3 + np.sin(2 * np.pi * position / 2.5) + np.where(position < 10, 1., -1.)
+        assert np.allclose(macroscopic_average(average, 20, 2.5).mean(), average.mean())
+        smooth = macroscopic_average(3 + np.sin(2 * np.pi * position / 2.5), 20, (2.5, 4.))
+        assert np.allclose(smooth, 3.)
+
 
 class TestEIGENVAL:
     def test_band_write(self):
-        EIGENVAL('EIGENVAL').write()
+        eigenval = EIGENVAL('EIGENVAL')
+        eigenval.write()
+        data = np.loadtxt('band_data/band.dat')
+        assert data.shape == (63, 1 + 12 * 2) and np.allclose(data[:, 1:], eigenval.energy.reshape((63, -1)), atol=1E-6)
         shutil.rmtree('band_data')
 
+    def test_parse(self):
+        eigenval = EIGENVAL('EIGENVAL')
+        assert eigenval.energy.shape == (63, 12, 2) and eigenval.energy[0, 0, 0] == pytest.approx(-14.484942)
+        assert eigenval.KPoint_dist[0] == 0. and np.all(np.diff(eigenval.KPoint_dist) >= 0)
+        assert eigenval.KPoint_label[0] == 'G' and len(eigenval.KPoint_label) == 63
+
 
 class TestOUTCAR:
     def test_animation_freq(self):
@@ -171,6 +520,56 @@ class TestOUTCAR:
     def test_bandgap(self):
         OUTCAR('OUTCAR').bandgap()
 
+    def test_scan(self):
+        outcar = OUTCAR('OUTCAR')
+        assert outcar.finish and outcar.spin == 2 and (outcar.bands, outcar.kpoints) == (32, 8)
+        assert len(outcar.energy) == outcar.steps.ionic[-1] == 14
+        assert outcar.last_energy == pytest.approx(-71.51620853) and outcar.fermi == pytest.approx(-5.3131)
+        assert outcar.band_info.up.shape == (32, 8)
+
+        index = []
+        scanner = MarkerScanner(chunk_size=256)  # markers cross the chunk boundary
+        scanner.register('Iteration', lambda line, s: index.append(s.line_number))
+        scanner.scan('OUTCAR')
+        assert tuple(index) == outcar.steps.index
+        assert tail_lines('OUTCAR', 30) == outcar.strings[-30:]
+
+    def test_status(self):
+        status = OUTCAR.status('OUTCAR')
+        outcar = OUTCAR('OUTCAR')
+        assert status.finish and status.tangent == 0.
+        assert (status.energy, status.force, status.mag, status.fermi) == \
+               (outcar.energy[-1], outcar.force[-1], outcar.mag[-1], outcar.fermi)
+        assert OUTCAR.status('entropy/OUTCAR').mag is None
+        assert list(reverse_lines('OUTCAR', block_size=100))[::-1] == outcar.strings
+
+    def test_lazy(self):
+        outcar = OUTCAR('freq/OUTCAR')
+        assert outcar.spin is not None and len(outcar.element) == 110
+        assert not outcar._steps_scanned and outcar._frequency_info is None
+        assert outcar.last_energy is not None and outcar._frequency_info is None
+        assert outcar.frequency.vibration.shape == (len(outcar._frequency), 110, 3)
+
+    def test_update(self, tmp_path):
+        full = OUTCAR('OUTCAR')
+        with open('OUTCAR', 'rb') as f:
+            data = f.read()
+        name = tmp_path / 'OUTCAR'
+        name.write_bytes(data[:len(data) // 3])
+        outcar = OUTCAR(name)
+        energy, steps = outcar.energy, len(outcar.energy)
+        assert 0 < steps < len(full.energy) and not outcar.finish
+
+        for cut in (len(data) // 2 + 17, len(data)):  # cut in the middle of a line
+            name.write_bytes(data[:cut])
+            outcar.update()
+        assert outcar.energy is energy and energy == full.energy
+        assert outcar.force == full.force and outcar.mag == full.mag and outcar.steps == full.steps
+        assert outcar.finish and outcar.band_info.up.shape == (32, 8)
+
+        name.write_bytes(data[:len(data) // 3])  # truncated, e.g., job restarted
+        assert len(outcar.update().energy) == steps
+
 
 class TestMODECAR:
 
@@ -188,3 +587,28 @@ class TestDOSCAR:
         with pytest.raises(SystemExit) as exit_info:
             doscar = DOSCAR('DOSCAR_dos', LORBIT=11)
         assert exit_info.value.code == 1
+
+    def test_load(self):
+        doscar = DOSCAR('DOSCAR_dos').load()
+        assert doscar.pdos.shape == (5, 2000, 18) and doscar.tdos.shape == (2000, 4) and len(doscar.blocks) == 6
+        assert doscar.energy[0] == pytest.approx(-17.857 + 9.10149619)
+        assert doscar.channels['p_up'] == [2, 4, 6] and doscar.channels['down'] == list(range(1, 18, 2))
+
+        up = doscar.dos([0, 4], ['up'])
+        assert np.allclose(up, doscar.pdos[[0, 4]][:, :, ::2].sum(axis=(0, 2)))
+        assert np.allclose(doscar.dos([1], ['s_down', 'd_down']), -doscar.pdos[1][:, [1, 9, 11, 13, 15, 17]].sum(axis=1))
+
+        ldos = doscar.LDOS  # DataFrame compatibility
+        assert len(ldos) == 6 and list(ldos[1].columns[-6:]) == ['up', 'down', 'p_up', 'p_down', 'd_up', 'd_down']
+        assert np.allclose(ldos[1]['up'] + ldos[5]['up'], up) and np.allclose(ldos[2]['py_down'], -doscar.pdos[1, :, 3])
+        assert np.allclose(doscar.TDOS['tot_down'], -doscar.tdos[:, 1])
+
+    def test_lazy(self):
+        eager = DOSCAR('DOSCAR_dos').load()
+        doscar = DOSCAR('DOSCAR_dos', cache_size=2).load(lazy=True)
+        assert np.allclose(doscar.dos([0, 4], ['up']), eager.dos([0, 4], ['up']))
+        assert doscar._pdos is None and list(doscar._atoms) == [0, 4]
+        assert np.allclose(doscar.atom(2), eager.pdos[2]) and list(doscar._atoms) == [4, 2]  # LRU eviction
+        with pytest.raises(IndexError):
+            doscar.atom(5)
+        assert np.allclose(doscar.pdos, eager.pdos)
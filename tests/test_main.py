@@ -122,14 +122,38 @@ class TestMain:
         main(['sum'])
         os.remove('CHGCAR_sum')
 
+    def test_diff(self):
+        main(['diff', 'AECCAR2', 'AECCAR0', '-a', 'z'])
+        os.remove('CHGCAR_diff')
+        os.remove('CHGCAR_diff_z.dat')
+
+    def test_integrate(self):
+        main(['integrate'])
+        main(['integrate', '-r', 'Sn:1.4', 'O:0.9', '-o', 'ACF_radius.dat'])
+        os.remove('ACF_integrate.dat')
+        os.remove('ACF_radius.dat')
+
+    def test_isosurface(self):
+        main(['isosurface', '-i', 'CHGCAR', '-b', '1', '-v', '0.1', '-0.1'])
+        main(['isosurface', '-i', 'CHGCAR', '-v', '1', '-f', 'obj'])
+        main(['isosurface', '-i', 'LOCPOT', '-v', '-5', '-s', '1'])
+        for name in ('CHGCAR_0.1.ply', 'CHGCAR_-0.1.ply', 'CHGCAR_1.obj', 'LOCPOT_-5.ply'):
+            os.remove(name)
+
     def test_split(self):
         main(['split'])
         os.remove('CHGCAR_tot')
 
     def test_grd(self):
         main(['grd'])
+        main(['grd', '-i', 'LOCPOT', '-n', 'locpot.grd'])
         os.remove('CHGCAR_mag')
         os.remove('vasp.grd')
+        os.remove('locpot.grd')
+
+    def test_cache(self):
+        main(['cache'])
+        main(['cache', '-c'])
 
     @change_dir(directory='electrostatic')
     def test_electrostatic(self):
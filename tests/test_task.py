@@ -1,9 +1,14 @@
 import logging
+import os
 import shutil
 from pathlib import Path
 
+import numpy as np
 import pytest
 
+from gvasp.common.error import ParameterError
+from gvasp.common.file import ACFFile, CHGCAR, GridFile
+from gvasp.common.isosurface import isosurface
 from gvasp.common.setting import RootDir
 from gvasp.common.task import OptTask, XDATMovie, NormalTask, ConTSTask, ChargeTask, WorkFuncTask, DOSTask, NEBTask
 from tests.utils import change_dir
@@ -64,6 +69,46 @@ class TestChargeTask:
         task = ChargeTask()
         task.generate(continuous=True, analysis=True)
 
+    def test_integrate(self, change_test_dir):
+        (charge, magnetization), volume = ChargeTask.integrate(source='CHGCAR', radius=['Sn:1.4', 'O:0.9'])
+        acf = ACFFile('ACF_integrate.dat')
+        assert np.allclose(acf.charge, charge, atol=1E-4)
+        assert np.allclose(acf.charge, CHGCAR('CHGCAR').integrate(radii={'Sn': 1.4, 'O': 0.9})[0][0], atol=1E-4)
+        with open('ACF_integrate.dat') as f:
+            lines = f.readlines()
+        assert 'MAGNETIZATION' in lines[0] and float(lines[-1].split()[-1]) == pytest.approx(charge.sum() +
+                                                                                             float(lines[-3].split()[-1]))
+        assert ChargeTask.integrate(source='CHGCAR', radius=['1.2'])[1].max() <= 4 / 3 * np.pi * 1.2 ** 3 * 1.2
+        os.remove('ACF_integrate.dat')
+        for radius in (['O:0.9', '1.2'], ['1.2', 'O:0.9'], ['O:x'], [':0.9'], ['1.2', '0.9']):
+            with pytest.raises(ParameterError, match='Invalid radius'):
+                ChargeTask.integrate(source='CHGCAR', radius=radius)
+
+    def test_integrate_mag(self, change_test_dir):
+        CHGCAR('CHGCAR').split()
+        (moment,), _ = ChargeTask.integrate(source='CHGCAR_mag', output='ACF_mag.dat')
+        with open('ACF_mag.dat') as f:
+            lines = f.readlines()
+        assert lines[0].split()[4] == 'MAGNETIZATION' and 'CHARGE' not in lines[0]
+        assert lines[-1].split(':')[0].strip() == 'TOTAL MAGNETIZATION' and 'VACUUM MAGNETIZATION' in lines[-3]
+        assert float(lines[-1].split()[-1]) == pytest.approx(CHGCAR('CHGCAR').read_grid(block=1).mean(), abs=1E-4)
+        assert np.allclose(ACFFile('ACF_mag.dat').charge, CHGCAR('CHGCAR').integrate(blocks=(1,))[0][0], atol=1E-4)
+        with pytest.raises(ParameterError, match='not a charge density'):
+            ChargeTask.integrate(source='LOCPOT')
+        for name in ('ACF_mag.dat', 'CHGCAR_tot', 'CHGCAR_mag'):
+            os.remove(name)
+
+    def test_isosurface(self, change_test_dir):
+        for source, isovalue, block, scale in (('LOCPOT', -5., 0, 1.), ('CHGCAR', 0.1, 1, None)):
+            grid_file = GridFile.from_file(source)
+            grid, lattice = grid_file.read_grid(block=block), grid_file.structure.lattice
+            name, = ChargeTask.isosurface(source=source, isovalues=(isovalue,), block=block)
+            assert name == f'{source}_{isovalue:g}.ply'
+            (_, faces), = isosurface(grid, lattice, isovalue * (lattice.volume if scale is None else scale))
+            with open(name, 'rb') as f:
+                assert f'element face {len(faces)}\n'.encode() in f.read(512) and len(faces)
+            os.remove(name)
+
 
 class TestWorkFuncTask:
 